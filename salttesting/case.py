@@ -28,8 +28,8 @@ from datetime import datetime, timedelta
 
 # Import salt testing libs
 from salttesting.unit import TestCase
-from salttesting.helpers import RedirectStdStreams
-from salttesting.runtests import RUNTIME_VARS
+from salttesting.helpers import RedirectStdStreams, invalidate_salt_functions_index
+from salttesting.runtests import RUNTIME_VARS, get_salt_config
 from salttesting.mixins import AdaptedConfigurationTestCaseMixIn, SaltClientTestCaseMixIn
 
 # Try to import salt: needed for __salt_system_encoding__ reference
@@ -157,14 +157,11 @@ class ShellTestCase(TestCase, AdaptedConfigurationTestCaseMixIn):
         ret = {'fun': fun}
 
         # Late import
-        import salt.config
         import salt.output
         import salt.runner
         from salt.ext.six.moves import cStringIO
 
-        opts = salt.config.master_config(
-            self.get_config_file_path('master')
-        )
+        opts = get_salt_config(self.get_config_file_path('master'))
 
         opts_arg = list(arg)
         if kwargs:
@@ -430,17 +427,87 @@ class ModuleCase(TestCase, SaltClientTestCaseMixIn):
         Run a single salt function and condition the return down to match the
         behavior of the raw function call
         '''
-        know_to_return_none = (
-            'file.chown', 'file.chgrp', 'ssh.recv_known_host'
+        orig = self.client.cmd(
+            minion_tgt, function, arg, timeout=timeout,
+            kwarg=self._function_kwargs(kwargs)
+        )
+        return self._condition_function_return(orig, function, minion_tgt)
+
+    def run_function_async(self, function, arg=(), minion_tgt='minion',
+                           timeout=25, **kwargs):
+        '''
+        Publish a single salt function, without waiting for it to return.
+
+        Returns an :class:`AsyncFunctionCall` whose ``result()`` method waits
+        for the function return and conditions it like :meth:`run_function`
+        does.
+        '''
+        pub_data = self.client.run_job(
+            minion_tgt, function, arg, timeout=timeout,
+            kwarg=self._function_kwargs(kwargs)
+        )
+        if not pub_data or not pub_data.get('jid'):
+            self.skipTest(
+                'WARNING(SHOULD NOT HAPPEN #1935): Failed to publish \'{0}\' '
+                'to the minion \'{1}\'. Publish output: {2}'.format(
+                    function, minion_tgt, pub_data
+                )
+            )
+        return AsyncFunctionCall(
+            self, pub_data['jid'], function, minion_tgt, timeout
         )
+
+    def run_functions_batch(self, calls, minion_tgt='minion', timeout=25):
+        '''
+        Run several salt functions at once and return the list of their
+        conditioned returns, in the same order.
+
+        ``calls`` is a list of ``(function, arg, kwargs)`` tuples, where
+        ``arg`` and ``kwargs`` are optional. All the jobs are published before
+        any of the returns is gathered, so the functions run concurrently on
+        the minion and ``timeout`` applies to the whole batch.
+
+        .. code-block:: python
+
+            grains, pong = self.run_functions_batch([
+                ('grains.item', ['os']),
+                ('test.ping',),
+            ])
+        '''
+        pending = []
+        for call in calls:
+            call = tuple(call)
+            pending.append(
+                self.run_function_async(
+                    call[0],
+                    len(call) > 1 and call[1] or (),
+                    minion_tgt=minion_tgt,
+                    timeout=timeout,
+                    **(len(call) > 2 and call[2] or {})
+                )
+            )
+        return [call.result() for call in pending]
+
+    def _function_kwargs(self, kwargs):
+        '''
+        Translate the keyword arguments which would clash with the ones of
+        :meth:`run_function` to the ones the salt function expects
+        '''
+        kwargs = dict(kwargs)
         if 'f_arg' in kwargs:
             kwargs['arg'] = kwargs.pop('f_arg')
         if 'f_timeout' in kwargs:
             kwargs['timeout'] = kwargs.pop('f_timeout')
-        orig = self.client.cmd(
-            minion_tgt, function, arg, timeout=timeout, kwarg=kwargs
-        )
+        return kwargs
 
+    def _condition_function_return(self, orig, function, minion_tgt):
+        if function.startswith('saltutil.sync_') or \
+                function == 'saltutil.refresh_modules':
+            # The functions available on the minion might have changed
+            invalidate_salt_functions_index()
+        know_to_return_none = (
+            'file.chown', 'file.chgrp', 'ssh.recv_known_host'
+        )
         if minion_tgt not in orig:
             self.skipTest(
                 'WARNING(SHOULD NOT HAPPEN #1935): Failed to get a reply '
@@ -510,6 +577,50 @@ class ModuleCase(TestCase, SaltClientTestCaseMixIn):
         return ret
 
 
+class AsyncFunctionCall(object):
+    '''
+    A salt function published by :meth:`ModuleCase.run_function_async`
+    '''
+
+    def __init__(self, case, jid, function, minion_tgt, timeout):
+        self.case = case
+        self.jid = jid
+        self.function = function
+        self.minion_tgt = minion_tgt
+        self.deadline = time.time() + timeout
+        self._done = False
+        self._result = None
+
+    def done(self):
+        '''
+        Return ``True`` once the return was gathered
+        '''
+        return self._done
+
+    def result(self):
+        '''
+        Wait for the function return, until the timeout passed when it was
+        published expires, and return it conditioned like
+        :meth:`ModuleCase.run_function` does
+        '''
+        if not self._done:
+            # The returns of the jobs published together are gathered one
+            # after the other, the ones which already arrived are read from the
+            # job cache, so each one only waits for what's left of its timeout
+            timeout = max(int(self.deadline - time.time()), 1)
+            returns = self.case.client.get_full_returns(
+                self.jid, [self.minion_tgt], timeout
+            )
+            orig = {}
+            for minion_id, ret in returns.items():
+                orig[minion_id] = ret.get('ret') if isinstance(ret, dict) else ret
+            self._result = self.case._condition_function_return(  # pylint: disable=protected-access
+                orig, self.function, self.minion_tgt
+            )
+            self._done = True
+        return self._result
+
+
 class SyndicCase(TestCase, SaltClientTestCaseMixIn):
     '''
     Execute a syndic based execution test
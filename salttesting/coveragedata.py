@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+'''
+    :copyright: © 2014 by the SaltStack Team, see AUTHORS for more details.
+    :license: Apache 2.0, see LICENSE for more details.
+
+
+    salttesting.coveragedata
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Code coverage data files combining and reporting helpers
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import re
+import sys
+import glob
+import json
+import site
+import time
+import pkgutil
+import logging
+import sysconfig
+import subprocess
+
+# Import 3rd-party libs
+import psutil
+
+# Import salt testing libs
+from salttesting.scheduling import JSONFileStore
+from salttesting.unit import add_result_listener, remove_result_listener
+
+log = logging.getLogger(__name__)
+
+# 'full' measures what the coverage options ask for, branches usually, 'lines' only measures lines and 'fast' only
+# measures the lines of the code under test with the fastest tracer available
+COVERAGE_MODES = ('full', 'lines', 'fast')
+
+# The data files of the measured processes are named '<data file>.<hostname>.<pid>.<random>', or
+# '<data file>.<hostname>.pid<pid>.X<random>x' with recent coverage versions
+DATA_FILE_PID_RE = re.compile(r'\.(?:pid)?(?P<pid>\d+)\.[^.]+$')
+PARTIAL_SUFFIX = 'partial'
+
+
+def site_packages_dirs():
+    '''
+    Return the set of the directories the third-party packages are installed to
+    '''
+    dirs = set()
+    paths = sysconfig.get_paths()
+    for name in ('purelib', 'platlib'):
+        if paths.get(name):
+            dirs.add(paths[name])
+    if hasattr(site, 'getsitepackages'):
+        # Not available on the virtualenvs created by old virtualenv versions
+        dirs.update(site.getsitepackages())
+    if hasattr(site, 'getusersitepackages'):
+        dirs.add(site.getusersitepackages())
+    return set([os.path.realpath(directory) for directory in dirs])
+
+
+def source_dirs(sources):
+    '''
+    Return the directories of the coverage ``sources``, which are either paths or importable package names
+    '''
+    dirs = set()
+    for source in sources or ():
+        if os.path.exists(source):
+            dirs.add(os.path.realpath(source))
+            continue
+        try:
+            loader = pkgutil.get_loader(source)
+        except ImportError:
+            loader = None
+        if loader is not None and hasattr(loader, 'get_filename'):
+            dirs.add(os.path.realpath(os.path.dirname(loader.get_filename())))
+    return dirs
+
+
+def coverage_mode_options(mode, coverage_options, omit_dirs=()):
+    '''
+    Return a copy of ``coverage_options`` updated for the coverage ``mode``, see :data:`COVERAGE_MODES`. With the
+    ``fast`` mode, the files under ``omit_dirs``, for example, the tests directories, and the third-party packages
+    are not measured. The code measured by the ``source`` option stays measured even when it's installed as a
+    third-party package.
+    '''
+    coverage_options = dict(coverage_options)
+    if mode == 'full':
+        return coverage_options
+    coverage_options['branch'] = False
+    if mode == 'fast':
+        coverage_options['cover_pylib'] = False
+        omit = list(coverage_options.get('omit') or [])
+        sources = source_dirs(coverage_options.get('source'))
+        for directory in sorted(site_packages_dirs()):
+            if any([(source + os.sep).startswith(directory + os.sep) for source in sources]):
+                # The omit patterns take precedence over the sources
+                continue
+            omit.append(os.path.join(directory, '*'))
+        omit.extend([os.path.join(os.path.abspath(directory), '*') for directory in omit_dirs])
+        coverage_options['omit'] = omit
+    return coverage_options
+
+
+def select_fast_tracer():
+    '''
+    Make coverage use the fastest tracer available and return its name. The ``sys.monitoring`` based tracer,
+    available with coverage>=7.4 on Python>=3.12, is selected through the ``COVERAGE_CORE`` environment variable, so
+    that the measured sub-processes use it too.
+    '''
+    # Late import
+    import coverage  # pylint: disable=import-error
+    version = tuple([int(part) for part in re.findall(r'\d+', coverage.__version__)[:2]])
+    if sys.version_info >= (3, 12) and version >= (7, 4):
+        os.environ.setdefault('COVERAGE_CORE', 'sysmon')
+        return os.environ['COVERAGE_CORE']
+    try:
+        from coverage.tracer import CTracer  # pylint: disable=import-error,no-name-in-module
+    except ImportError:
+        try:
+            from coverage.collector import CTracer  # pylint: disable=import-error,no-name-in-module
+        except ImportError:
+            CTracer = None
+    if CTracer is None:
+        log.warning('The coverage C tracer is not available, the Python tracer is a lot slower')
+        return 'pytrace'
+    return 'ctrace'
+
+
+class CoverageOverheadStore(JSONFileStore):
+    '''
+    Persistent store of the tests durations recorded with each coverage mode, and without coverage, ``none``, to
+    measure the overhead of each mode
+    '''
+
+    def update(self, mode, durations):
+        '''
+        Record the tests ``durations``, a dictionary mapping test ids to seconds, measured with the coverage ``mode``
+        '''
+        recorded = self.data.setdefault(mode, {})
+        for test_id, duration in durations.items():
+            recorded[test_id] = round(duration, 4)
+
+    def overhead(self, mode, baseline='none'):
+        '''
+        Return a tuple with the overhead of the coverage ``mode``, compared to ``baseline``, as a ratio, and the
+        number of tests it was measured on. Only the tests recorded with both modes are compared. The overhead is
+        ``None`` when there are no such tests.
+        '''
+        measured = self.data.get(mode, {})
+        reference = self.data.get(baseline, {})
+        common = set(measured).intersection(reference)
+        reference_total = sum([reference[test_id] for test_id in common])
+        if not common or not reference_total:
+            return None, 0
+        return sum([measured[test_id] for test_id in common]) / reference_total - 1, len(common)
+
+    def summary(self, baseline='none'):
+        '''
+        Return a human readable summary of the overhead of each of the recorded coverage modes
+        '''
+        lines = []
+        for mode in COVERAGE_MODES:
+            overhead, count = self.overhead(mode, baseline)
+            if overhead is None:
+                continue
+            lines.append(
+                'Coverage mode {0!r}: {1:+.1%} tests run time, measured on {2} tests'.format(mode, overhead, count)
+            )
+        return lines
+
+
+def finished_data_files(data_file):
+    '''
+    Return the data files, written by the processes measured with the ``data_file`` base name, whose process has
+    exited. The data files of the running processes might still be written to.
+    '''
+    paths = []
+    for path in glob.glob('{0}.*'.format(data_file)):
+        match = DATA_FILE_PID_RE.search(path)
+        if match is None:
+            continue
+        if not psutil.pid_exists(int(match.group('pid'))):
+            paths.append(path)
+    return sorted(paths)
+
+
+def combine_data_files(paths, partial_path, coverage_options):
+    '''
+    Combine the ``paths`` data files into ``partial_path``, removing them. Runs on the combining processes.
+    '''
+    # Late import
+    import coverage  # pylint: disable=import-error
+    coverage_options = dict(coverage_options, data_file=partial_path)
+    coverage_options.pop('data_suffix', None)
+    partial = coverage.coverage(**coverage_options)
+    # Only coverage>=4.2 combines a list of files
+    partial.combine(data_paths=paths)
+    partial.save()
+    return len(paths)
+
+
+# Run by the combining processes, see IncrementalCoverageCombiner
+COMBINE_SCRIPT = (
+    'import sys, json; '
+    'from salttesting.coveragedata import combine_data_files; '
+    'combine_data_files(*json.loads(sys.argv[1]))'
+)
+# The environment variables which would have the combining processes measured
+COVERAGE_ENVIRON_VARS = ('COVERAGE_PROCESS_START', 'COVERAGE_OPTIONS', 'SALT_RUNTESTS_COVERAGE_OPTIONS')
+
+
+class IncrementalCoverageCombiner(object):
+    '''
+    Combine, on at most ``processes`` processes at once, the data files of the measured processes as soon as they
+    exit, in batches of at most ``batch_size`` files, into partial data files. The partial data files, and any data
+    files left, are merged by the final ``combine()`` call of the coverage instance, which is now a lot faster and
+    needs a lot less memory.
+
+    The combiner is a tests results listener, see :func:`salttesting.unit.add_result_listener`, which looks for new
+    data files, at most every ``interval`` seconds, when a test finishes. When the tests run on forked workers, the
+    process which created the combiner calls :meth:`maybe_poll` itself instead. It runs no threads on the tests runner,
+    which forks the Salt daemons and the tests workers, and the combining processes are new interpreters, not forks
+    of the tests runner, started without the coverage environment variables so that they are not measured.
+    '''
+
+    def __init__(self, data_file, coverage_options, processes=2, batch_size=200, interval=15):
+        self.data_file = os.path.abspath(data_file)
+        self.coverage_options = coverage_options
+        self.processes = processes
+        self.batch_size = batch_size
+        self.interval = interval
+        self.submitted = set()
+        self.combined = 0
+        self.pid = os.getpid()
+        self._running = []
+        self._batches = 0
+        self._last_poll = 0
+
+    def start(self):
+        '''
+        Periodically combine the finished data files, as the tests finish
+        '''
+        self._last_poll = time.time()
+        add_result_listener(self)
+
+    def startTest(self, result, test):
+        pass
+
+    def stopTest(self, result, test, outcome, message):
+        self.maybe_poll()
+
+    def maybe_poll(self):
+        '''
+        :meth:`poll` if it was not called for the last ``interval`` seconds
+        '''
+        # The forked tests workers inherit the listener
+        if os.getpid() != self.pid or time.time() - self._last_poll < self.interval:
+            return
+        self.poll()
+
+    def _reap(self):
+        running = []
+        for proc, paths in self._running:
+            if proc.poll() is None:
+                running.append((proc, paths))
+                continue
+            stderr = proc.communicate()[1]
+            if proc.returncode == 0:
+                self.combined += len(paths)
+            else:
+                # The data files left are merged by the final combine
+                log.warning(
+                    'Failed to combine a batch of coverage data files: {0}'.format(
+                        stderr.decode('utf-8', 'replace').strip()
+                    )
+                )
+        self._running = running
+
+    def poll(self):
+        '''
+        Start combining the finished data files not yet submitted, as long as there are less than ``processes``
+        combining processes running
+        '''
+        self._last_poll = time.time()
+        self._reap()
+        paths = [path for path in finished_data_files(self.data_file) if path not in self.submitted]
+        environ = dict([(key, value) for (key, value) in os.environ.items() if key not in COVERAGE_ENVIRON_VARS])
+        pythonpath = [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+        if environ.get('PYTHONPATH'):
+            pythonpath.append(environ['PYTHONPATH'])
+        environ['PYTHONPATH'] = os.pathsep.join(pythonpath)
+        for idx in range(0, len(paths), self.batch_size):
+            if len(self._running) >= self.processes:
+                break
+            batch = paths[idx:idx + self.batch_size]
+            self.submitted.update(batch)
+            self._batches += 1
+            partial_path = '{0}.{1}-{2}-{3}'.format(self.data_file, PARTIAL_SUFFIX, os.getpid(), self._batches)
+            proc = subprocess.Popen(
+                [sys.executable, '-c', COMBINE_SCRIPT, json.dumps([batch, partial_path, self.coverage_options])],
+                env=environ,
+                stderr=subprocess.PIPE,
+                close_fds=True
+            )
+            self._running.append((proc, batch))
+
+    def finish(self):
+        '''
+        Combine the remaining finished data files and wait for the combining processes. Returns the number of data
+        files combined.
+        '''
+        remove_result_listener(self)
+        while True:
+            self.poll()
+            if not self._running:
+                break
+            # Only a traceback is written to stderr, it fits on the pipe buffer
+            self._running[0][0].wait()
+        return self.combined
+
+
+def write_reports_in_background(coverage_object, xml_output=None, html_output=None):
+    '''
+    Write the XML and HTML reports of the combined ``coverage_object`` on a detached process so that the tests
+    suite exit code is not delayed by them
+    '''
+    pid = os.fork()
+    if pid == 0:
+        # Double fork so that the reports are not waited for, nor terminated along with the tests suite children
+        exit_code = 0
+        try:
+            os.setsid()
+            if os.fork() == 0:
+                if xml_output is not None:
+                    coverage_object.xml_report(outfile=xml_output)
+                if html_output is not None:
+                    coverage_object.html_report(directory=html_output)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Failed to write the coverage reports')
+            exit_code = 1
+        finally:
+            os._exit(exit_code)  # pylint: disable=protected-access
+    os.waitpid(pid, 0)
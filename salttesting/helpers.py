@@ -27,6 +27,7 @@ from functools import wraps
 # Import Salt Testing libs
 from salttesting import __version_info__
 from salttesting.unit import skip, _id
+from salttesting.scheduling import JSONFileStore
 
 # Import 3rd-party libs
 import six
@@ -997,9 +998,82 @@ def requires_system_grains(func):
     return decorator
 
 
+# The salt functions index, see salt_functions_index(), loaded by this process
+SALT_FUNCTIONS_INDEX_CACHE = {}
+SALT_FUNCTIONS_INDEX_NAME = 'salt-functions-index.json'
+
+
+def salt_functions_index(case):
+    '''
+    Return the names of the salt functions, and of their modules, available
+    on the ``minion``.
+
+    The index is built once, from ``sys.list_functions`` using the
+    ``run_function`` method of ``case``, and stored under
+    ``RUNTIME_VARS.TMP`` so that it's shared by all the processes of the
+    tests run until :func:`invalidate_salt_functions_index` is called, when
+    the minions sync their modules.
+    '''
+    # Late import, salttesting.runtests imports this module
+    from salttesting.runtests import RUNTIME_VARS
+
+    path = os.path.join(RUNTIME_VARS.TMP, SALT_FUNCTIONS_INDEX_NAME)
+    try:
+        fstat = os.stat(path)
+        key = (fstat.st_ino, fstat.st_mtime)
+    except OSError:
+        key = None
+    if key is not None and path in SALT_FUNCTIONS_INDEX_CACHE:
+        if SALT_FUNCTIONS_INDEX_CACHE[path][0] == key:
+            return SALT_FUNCTIONS_INDEX_CACHE[path][1]
+
+    store = JSONFileStore(path)
+    functions = store.data.get('functions')
+    if key is None or not isinstance(functions, list):
+        functions = case.run_function('sys.list_functions')
+        if not isinstance(functions, list):
+            log.warning(
+                'Failed to list the salt functions available on the '
+                'minion: {0}'.format(functions)
+            )
+            return frozenset()
+        store.data = {'functions': sorted(functions)}
+        store.save()
+        try:
+            fstat = os.stat(path)
+            key = (fstat.st_ino, fstat.st_mtime)
+        except OSError:
+            key = None
+
+    index = frozenset(functions).union(
+        [function.split('.', 1)[0] for function in functions]
+    )
+    if key is not None:
+        SALT_FUNCTIONS_INDEX_CACHE[path] = (key, index)
+    return index
+
+
+def invalidate_salt_functions_index():
+    '''
+    Discard the salt functions index, see :func:`salt_functions_index`, it
+    needs to be built again once the minions sync or reload their modules
+    '''
+    # Late import, salttesting.runtests imports this module
+    from salttesting.runtests import RUNTIME_VARS
+
+    SALT_FUNCTIONS_INDEX_CACHE.clear()
+    try:
+        os.unlink(os.path.join(RUNTIME_VARS.TMP, SALT_FUNCTIONS_INDEX_NAME))
+    except OSError as exc:
+        if exc.errno != errno.ENOENT:
+            raise
+
+
 def requires_salt_modules(*names):
     '''
-    Makes sure the passed salt module is available. Skips the test if not
+    Makes sure the passed salt module, or function, is available. Skips the
+    test if not. The available modules are looked up on the salt functions
+    index, see :func:`salt_functions_index`.
 
     .. versionadded:: 0.5.2
     '''
@@ -1021,11 +1095,9 @@ def requires_salt_modules(*names):
                         )
                     )
 
+                available = salt_functions_index(self)
                 for name in names:
-                    if not hasattr(self, '__salt_sys_docs__'):
-                        # cache salts documentation
-                        self.__salt_sys_docs__ = self.run_function('sys.doc')
-                    if name not in self.__salt_sys_docs__:
+                    if name not in available:
                         self.skipTest('Salt module {0!r} is not available'.format(name))
             caller.setUp = setUp
             return caller
@@ -1042,8 +1114,9 @@ def requires_salt_modules(*names):
                     )
                 )
 
+            available = salt_functions_index(cls)
             for name in names:
-                if name not in cls.run_function('sys.doc'):
+                if name not in available:
                     cls.skipTest(
                         'Salt module {0!r} is not available'.format(name)
                     )
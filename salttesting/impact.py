@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+'''
+    :copyright: © 2014 by the SaltStack Team, see AUTHORS for more details.
+    :license: Apache 2.0, see LICENSE for more details.
+
+
+    salttesting.impact
+    ~~~~~~~~~~~~~~~~~~
+
+    Change impact tests selection, based on a per test code coverage map
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import re
+import inspect
+import logging
+import subprocess
+
+# Import salt testing libs
+from salttesting.scheduling import JSONFileStore
+
+log = logging.getLogger(__name__)
+
+DIFF_HUNK_RE = re.compile(r'^@@ -(?P<start>\d+)(?:,(?P<count>\d+))? \+\d+(?:,\d+)? @@')
+
+
+def git_output(args, cwd):
+    '''
+    Run ``git`` with ``args`` on ``cwd`` and return its output, or ``None`` if it fails
+    '''
+    try:
+        proc = subprocess.Popen(
+            ['git'] + list(args), cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stdout, stderr = proc.communicate()
+    except OSError as exc:
+        log.warning('Failed to run git: {0}'.format(exc))
+        return None
+    if proc.returncode != 0:
+        log.warning('\'git {0}\' failed: {1}'.format(' '.join(args), stderr.decode('utf-8', 'replace').strip()))
+        return None
+    return stdout.decode('utf-8', 'replace')
+
+
+def git_toplevel(path):
+    '''
+    Return the top level directory of the git checkout ``path`` belongs to
+    '''
+    output = git_output(['rev-parse', '--show-toplevel'], path)
+    return output and output.strip() or None
+
+
+def git_commit(ref, cwd):
+    '''
+    Return the commit ``ref`` points to
+    '''
+    output = git_output(['rev-parse', '--verify', '{0}^{{commit}}'.format(ref)], cwd)
+    return output and output.strip() or None
+
+
+def parse_diff(diff):
+    '''
+    Parse a ``git diff --unified=0`` output and return a dictionary mapping each changed file path, relative to the
+    checkout top level directory, to the set of changed line numbers on the original file. The lines are ``None``
+    when the whole file changed, for example, an added file.
+    '''
+    changes = {}
+    path = None
+    # The '---' and '+++' file headers only come before the first hunk of each file, afterwards, they're removed or
+    # added lines whose content starts with '--' or '++'
+    in_header = False
+    for line in diff.splitlines():
+        if line.startswith('diff --git '):
+            # Binary files and mode changes have no hunks, the whole file is considered changed unless hunks follow
+            path = None
+            in_header = True
+            changes[line.split(' b/', 1)[-1]] = None
+        elif in_header and line.startswith('--- '):
+            path = line[4:].strip()
+            path = path != '/dev/null' and path[2:] or None
+            if path is not None:
+                changes[path] = set()
+        elif in_header and line.startswith('+++ '):
+            continue
+        else:
+            match = DIFF_HUNK_RE.match(line)
+            if match is None:
+                continue
+            in_header = False
+            if path is None:
+                continue
+            start = int(match.group('start'))
+            count = match.group('count')
+            count = count is None and 1 or int(count)
+            if count == 0:
+                # Lines were only added, after the line ``start``, match the lines around them
+                changes[path].update([start, start + 1])
+            else:
+                changes[path].update(range(start, start + count))
+    return changes
+
+
+def changed_lines(ref, cwd):
+    '''
+    Return the changes, see :func:`parse_diff`, between ``ref`` and the working tree, or ``None`` if they could not
+    be computed
+    '''
+    diff = git_output(['diff', '--no-color', '--no-renames', '--unified=0', ref, '--'], cwd)
+    if diff is None:
+        return None
+    return parse_diff(diff)
+
+
+def test_module_file(test):
+    '''
+    Return the path of the module which defines ``test``, or ``None``
+    '''
+    try:
+        return inspect.getsourcefile(test.__class__)
+    except TypeError:
+        return None
+
+
+def test_modules_map(test_files, root):
+    '''
+    Return a dictionary mapping the test module paths, relative to ``root``, to the ids of the tests they define.
+    ``test_files`` is an iterable of ``(test_id, path)`` tuples.
+    '''
+    modules = {}
+    for test_id, path in test_files:
+        if path is None:
+            continue
+        modules.setdefault(os.path.relpath(os.path.abspath(path), root), set()).add(test_id)
+    return modules
+
+
+class CoverageContextRecorder(object):
+    '''
+    Tests results listener, see :func:`salttesting.unit.add_result_listener`, which switches the coverage context of
+    ``coverage_object`` to the id of the running test. Requires coverage>=5.0.
+
+    Only the code executed on the process which created the recorder is attributed to the tests, the code executed
+    by the Salt daemons, or any other process, is not. The tests for which ``needs_daemons``, a callable taking the
+    test, returns ``True`` exercise most of their code on the Salt daemons, they're not recorded and end up on
+    ``unmapped``, so that they're always selected.
+    '''
+
+    def __init__(self, coverage_object, needs_daemons=None):
+        self.coverage_object = coverage_object
+        self.needs_daemons = needs_daemons
+        self.pid = os.getpid()
+        self.tests = set()
+        self.unmapped = set()
+
+    def startTest(self, result, test):
+        if os.getpid() != self.pid:
+            return
+        if self.needs_daemons is not None and self.needs_daemons(test):
+            self.unmapped.add(test.id())
+            return
+        self.tests.add(test.id())
+        self.coverage_object.switch_context(test.id())
+
+    def stopTest(self, result, test, outcome, message):
+        if os.getpid() != self.pid:
+            return
+        self.coverage_object.switch_context('')
+
+
+def coverage_contexts_map(coverage_data, root):
+    '''
+    Return a dictionary mapping each file measured by ``coverage_data``, relative to ``root``, to a dictionary
+    mapping the ids of the tests which executed it to the executed line numbers
+    '''
+    files = {}
+    for filename in coverage_data.measured_files():
+        relpath = os.path.relpath(filename, root)
+        if relpath.startswith(os.pardir):
+            continue
+        tests = {}
+        for lineno, contexts in coverage_data.contexts_by_lineno(filename).items():
+            for context in contexts:
+                if context:
+                    tests.setdefault(context, []).append(lineno)
+        if tests:
+            files[relpath] = dict([(test_id, sorted(lines)) for (test_id, lines) in tests.items()])
+    return files
+
+
+class CoverageMapStore(JSONFileStore):
+    '''
+    Persistent map of the source lines executed by each test, see :class:`CoverageContextRecorder`
+    '''
+
+    @property
+    def commits(self):
+        '''
+        Dictionary mapping each test id to the commit its recorded line numbers refer to
+        '''
+        return self.data.get('commits', {})
+
+    @property
+    def tests(self):
+        return set(self.data.get('tests', []))
+
+    @property
+    def files(self):
+        return self.data.get('files', {})
+
+    def update(self, commit, tests, files, unmapped=()):
+        '''
+        Replace the recorded lines of ``tests``, the ids of the tests which ran on ``commit``, with ``files``, as
+        returned by :func:`coverage_contexts_map`. The ``unmapped`` tests are removed from the map, they're always
+        selected. The tests which did not run keep the commit their lines were recorded on.
+        '''
+        unmapped = set(unmapped)
+        commits = self.commits
+        for test_id in unmapped:
+            commits.pop(test_id, None)
+        for test_id in set(tests) - unmapped:
+            commits[test_id] = commit
+        recorded = self.files
+        for path in list(recorded):
+            for test_id in (tests | unmapped).intersection(recorded[path]):
+                recorded[path].pop(test_id)
+            if not recorded[path]:
+                recorded.pop(path)
+        for path, entries in files.items():
+            recorded.setdefault(path, {}).update(entries)
+        self.data.pop('commit', None)
+        self.data['commits'] = commits
+        self.data['tests'] = sorted((self.tests | set(tests)) - unmapped)
+        self.data['files'] = recorded
+
+    def select(self, test_ids, changes, test_modules=None, commit=None):
+        '''
+        Return the set of test ids, out of ``test_ids``, impacted by ``changes``, as returned by
+        :func:`changed_lines`, or ``None`` when the whole tests suite needs to run because some of the changed files
+        are not mapped.
+
+        The tests never recorded are always selected. ``test_modules`` maps test module paths to the ids of the tests
+        they define, so that changed test modules select their own tests. ``commit`` is the commit the changes are
+        computed against, only the tests whose lines were recorded on that commit are matched line by line, any
+        change to a file selects all the other tests which executed it, since their line numbers may have moved.
+        '''
+        if test_modules is None:
+            test_modules = {}
+        test_ids = set(test_ids)
+        recorded = self.files
+        commits = self.commits
+        selected = test_ids - self.tests
+        for path, lines in changes.items():
+            if path in test_modules:
+                selected.update(test_modules[path])
+            if path not in recorded:
+                if path in test_modules:
+                    continue
+                log.info('{0} is not on the coverage map, running the whole tests suite'.format(path))
+                return None
+            for test_id, test_lines in recorded[path].items():
+                line_level = commit is not None and commits.get(test_id) == commit
+                if lines is None or not line_level or lines.intersection(test_lines):
+                    selected.add(test_id)
+        return selected & test_ids
@@ -20,7 +20,7 @@ import subprocess
 
 # Import Salt Testing Libs
 from salttesting.mock import NO_MOCK, NO_MOCK_REASON, patch
-from salttesting.runtests import RUNTIME_VARS
+from salttesting.runtests import RUNTIME_VARS, get_local_client, get_salt_config
 
 # Import 3rd-party libs
 import six
@@ -236,9 +236,6 @@ class AdaptedConfigurationTestCaseMixIn(object):
 
     @property
     def master_opts(self):
-        # Late import
-        import salt.config
-
         warnings.warn(
             'Please stop using the \'master_opts\' attribute in \'{0}.{1}\' and instead '
             'import \'RUNTIME_VARS\' from {2!r} and instantiate the master configuration like '
@@ -249,18 +246,13 @@ class AdaptedConfigurationTestCaseMixIn(object):
             ),
             DeprecationWarning,
         )
-        return salt.config.master_config(
-            self.get_config_file_path('master')
-        )
+        return get_salt_config(self.get_config_file_path('master'), 'master')
 
     @property
     def minion_opts(self):
         '''
         Return the options used for the minion
         '''
-        # Late import
-        import salt.config
-
         warnings.warn(
             'Please stop using the \'minion_opts\' attribute in \'{0}.{1}\' and instead '
             'import \'RUNTIME_VARS\' from {2!r} and instantiate the minion configuration like '
@@ -271,18 +263,13 @@ class AdaptedConfigurationTestCaseMixIn(object):
             ),
             DeprecationWarning,
         )
-        return salt.config.minion_config(
-            self.get_config_file_path('minion')
-        )
+        return get_salt_config(self.get_config_file_path('minion'), 'minion')
 
     @property
     def sub_minion_opts(self):
         '''
         Return the options used for the sub-minion
         '''
-        # Late import
-        import salt.config
-
         warnings.warn(
             'Please stop using the \'sub_minion_opts\' attribute in \'{0}.{1}\' and instead '
             'import \'RUNTIME_VARS\' from {2!r} and instantiate the sub-minion configuration like '
@@ -293,16 +280,16 @@ class AdaptedConfigurationTestCaseMixIn(object):
             ),
             DeprecationWarning,
         )
-        return salt.config.minion_config(
-            self.get_config_file_path('sub_minion')
-        )
+        return get_salt_config(self.get_config_file_path('sub_minion'), 'minion')
 
 
 
 class SaltClientTestCaseMixIn(AdaptedConfigurationTestCaseMixIn):
     '''
     Mix-in class that provides a ``client`` attribute which returns a Salt
-    :class:`LocalClient<salt:salt.client.LocalClient>`.
+    :class:`LocalClient<salt:salt.client.LocalClient>`. The client is shared
+    by all the tests running on the same process, see
+    :func:`salttesting.runtests.get_local_client`.
 
     .. code-block:: python
 
@@ -328,9 +315,7 @@ class SaltClientTestCaseMixIn(AdaptedConfigurationTestCaseMixIn):
 
     @property
     def client(self):
-        # Late import
-        import salt.client
-        return salt.client.get_local_client(
+        return get_local_client(
             self.get_config_file_path(self._salt_client_config_file_name_)
         )
 
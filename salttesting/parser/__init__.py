@@ -12,7 +12,9 @@
 
 from __future__ import absolute_import, print_function
 import os
+import re
 import sys
+import atexit
 import time
 import signal
 import shutil
@@ -27,8 +29,26 @@ from functools import partial
 from contextlib import closing
 
 import six
-from salttesting import TestLoader, TextTestRunner
+from salttesting import TestLoader, TextTestRunner, TestSuite
 from salttesting import helpers
+from salttesting.profiling import (
+    ResourceProfiler,
+    TestsProfiler,
+    aggregate_profiles,
+    collect_test_resources,
+    format_resources,
+    heaviest_tests,
+    prepare_profiles_dir,
+    write_resources_report
+)
+from salttesting.reports import JSONLinesReporter, write_json_report
+from salttesting.scheduling import (
+    TestDurationsStore,
+    flatten_testsuite,
+    select_shard,
+    shard_name
+)
+from salttesting.unit import add_result_listener, remove_result_listener
 from salttesting.version import __version_info__
 from salttesting.xmlunit import HAS_XMLRUNNER, XMLTestRunner
 try:
@@ -154,6 +174,10 @@ class SaltTestingParser(optparse.OptionParser):
         optparse.OptionParser.__init__(self, *args, **kwargs)
         self.testsuite_directory = testsuite_directory
         self.testsuite_results = []
+        self.testsuite_durations = None
+        # The time the tests profiling started at, see --profile-tests
+        self.profiles_since = None
+        self.json_lines_reporter = None
 
         self.test_selection_group = optparse.OptionGroup(
             self,
@@ -195,6 +219,30 @@ class SaltTestingParser(optparse.OptionParser):
             help=('The location of a newline delimited file of test names to '
                   'run')
         )
+        self.test_selection_group.add_option(
+            '--shard-count',
+            default=1,
+            type=int,
+            help=('Split the tests of each suite in this number of shards, '
+                  'for example, one per CI node. The tests are assigned by a '
+                  'stable hash of their id, or balanced with '
+                  '\'--shard-durations-file\'. The recorded tests durations '
+                  'are not updated when running a shard. Default: %default')
+        )
+        self.test_selection_group.add_option(
+            '--shard-index',
+            default=None,
+            type=int,
+            help=('Only run the tests of this shard, counting from 0. '
+                  'Requires \'--shard-count\'.')
+        )
+        self.test_selection_group.add_option(
+            '--shard-durations-file',
+            default=None,
+            help=('Balance the shards with the tests durations recorded on '
+                  'this file, see \'--durations-file\'. All the nodes need '
+                  'to use the same file, which is only read.')
+        )
         self.add_option_group(self.test_selection_group)
 
         if self.support_docker_execution is True:
@@ -277,6 +325,71 @@ class SaltTestingParser(optparse.OptionParser):
             action='store_true',
             help='Do NOT show the overall tests result'
         )
+        self.output_options_group.add_option(
+            '--durations-file',
+            default=os.path.join(
+                tempfile.gettempdir() if platform.system() != 'Darwin' else '/tmp',
+                'salt-testing-durations.json'
+            ),
+            help=('The path to the file where the duration of each test is '
+                  'recorded. Default: %default')
+        )
+        self.output_options_group.add_option(
+            '--json-out',
+            dest='json_out',
+            default=None,
+            help=('Write a JSON report of the tests results to this path. '
+                  'When running a shard, the shard name is added to the file '
+                  'name, for example, \'report.shard-0-of-4.json\'.')
+        )
+        self.output_options_group.add_option(
+            '--json-lines-out',
+            metavar='DESTINATION',
+            default=None,
+            help=('Stream the tests events, as they happen, one JSON '
+                  'document per line, to this file, which is appended to, '
+                  'or to the UNIX socket at \'unix:<path>\'.')
+        )
+        self.output_options_group.add_option(
+            '--profile-resources',
+            default=False,
+            action='store_true',
+            help=('Record the CPU time, peak memory, file descriptors and '
+                  'child processes of each test. The heaviest tests are '
+                  'shown on the overall tests report.')
+        )
+        self.output_options_group.add_option(
+            '--profile-resources-out',
+            default=os.path.join(
+                tempfile.gettempdir() if platform.system() != 'Darwin' else '/tmp',
+                'salt-testing-resources.json'
+            ),
+            help=('The path to the JSON report of the resources used by each '
+                  'test. Default: %default')
+        )
+        self.output_options_group.add_option(
+            '--profile-tests',
+            metavar='PATTERN',
+            default=None,
+            help=('Run the tests whose id matches this regular expression '
+                  'under cProfile and dump a \'.pstats\' file per test.')
+        )
+        self.output_options_group.add_option(
+            '--profile-tests-dir',
+            default=os.path.join(
+                tempfile.gettempdir() if platform.system() != 'Darwin' else '/tmp',
+                'salt-testing-profiles'
+            ),
+            help=('The directory where the tests profiles are dumped. '
+                  'Default: %default')
+        )
+        self.output_options_group.add_option(
+            '--profile-tests-top',
+            type='int',
+            default=20,
+            help=('The number of functions shown on the aggregated profiles '
+                  'report. Default: %default')
+        )
         self.add_option_group(self.output_options_group)
 
         self.fs_cleanup_options_group = optparse.OptionGroup(
@@ -404,6 +517,32 @@ class SaltTestingParser(optparse.OptionParser):
             # Override any environment setting with the passed value
             self.xml_output_dir = self.options.xml_out
 
+        if self.options.shard_count < 1:
+            self.error('\'--shard-count\' needs to be a positive number')
+        if self.options.shard_count > 1:
+            if self.options.shard_index is None:
+                self.error('\'--shard-count\' requires \'--shard-index\'')
+            if not 0 <= self.options.shard_index < self.options.shard_count:
+                self.error(
+                    '\'--shard-index\' needs to be between 0 and {0}'.format(
+                        self.options.shard_count - 1
+                    )
+                )
+            shard = shard_name(
+                self.options.shard_index, self.options.shard_count
+            )
+            # Each shard writes its own reports so that they can be merged
+            # afterwards
+            if self.xml_output_dir is not None:
+                self.xml_output_dir = os.path.join(self.xml_output_dir, shard)
+            if self.options.json_out is not None:
+                root, ext = os.path.splitext(self.options.json_out)
+                self.options.json_out = '{0}.{1}{2}'.format(
+                    root, shard, ext or '.json'
+                )
+        elif self.options.shard_index not in (None, 0):
+            self.error('\'--shard-index\' requires \'--shard-count\'')
+
         if self.xml_output_dir is not None and self.options.xml_out:
             if not os.path.isdir(self.xml_output_dir):
                 os.makedirs(self.xml_output_dir)
@@ -412,6 +551,45 @@ class SaltTestingParser(optparse.OptionParser):
                 'at {0!r}'.format(self.xml_output_dir)
             )
 
+        self.testsuite_durations = TestDurationsStore(
+            self.options.durations_file
+        )
+
+        if self.options.profile_resources:
+            add_result_listener(ResourceProfiler())
+
+        if self.options.json_lines_out is not None:
+            self.json_lines_reporter = JSONLinesReporter(
+                self.options.json_lines_out,
+                shard=self.options.shard_count > 1 and shard_name(
+                    self.options.shard_index, self.options.shard_count
+                ) or None
+            )
+            add_result_listener(self.json_lines_reporter)
+            # The tests runner scripts call finalize(), unless they abort
+            atexit.register(self.finish_json_lines_reporter)
+
+        if self.options.profile_tests is not None:
+            try:
+                add_result_listener(
+                    TestsProfiler(
+                        self.options.profile_tests,
+                        self.options.profile_tests_dir
+                    )
+                )
+            except re.error as exc:
+                self.error(
+                    '\'--profile-tests\' is not a valid regular '
+                    'expression: {0}'.format(exc)
+                )
+            if self.options.profile_tests_top < 1:
+                self.error(
+                    '\'--profile-tests-top\' needs to be a positive number'
+                )
+            self.profiles_since = prepare_profiles_dir(
+                self.options.profile_tests_dir
+            )
+
         self.validate_options()
 
         if self.support_destructive_tests_selection:
@@ -520,9 +698,15 @@ class SaltTestingParser(optparse.OptionParser):
                 additional_tests = loader.discover(test_dir, suffix, test_dir)
                 tests.addTests(additional_tests)
 
+        tests = self.select_tests(tests)
+
         header = '{0} Tests'.format(display_name)
         print_header('Starting {0}'.format(header),
                      width=self.options.output_columns)
+        if self.json_lines_reporter is not None:
+            self.json_lines_reporter.emit(
+                'suite-start', suite=header, tests=tests.countTestCases()
+            )
 
         if self.options.xml_out:
             runner = XMLTestRunner(
@@ -536,8 +720,47 @@ class SaltTestingParser(optparse.OptionParser):
                 stream=sys.stdout,
                 verbosity=self.options.verbosity).run(tests)
             self.testsuite_results.append((header, runner))
+        self.testsuite_durations.update(
+            getattr(runner, 'test_durations', {})
+        )
+        if self.json_lines_reporter is not None:
+            self.json_lines_reporter.emit(
+                'suite-stop', suite=header, tests=runner.testsRun,
+                successful=runner.wasSuccessful()
+            )
         return runner.wasSuccessful()
 
+    def select_tests(self, tests):
+        '''
+        Narrow the tests of a suite down to the ones which should run. By
+        default, only the tests of the shard being executed are kept.
+        Subclasses can extend the selection in this overridden method.
+        '''
+        if self.options.shard_count > 1:
+            tests = self.select_shard_tests(tests)
+        return tests
+
+    def select_shard_tests(self, tests):
+        '''
+        Only keep the tests which belong to the shard being executed. Each
+        tests suite is split on its own.
+        '''
+        tests = list(flatten_testsuite(tests))
+        # The shards only depend on the tests ids and, optionally, on a
+        # durations file shared by all the nodes
+        durations = None
+        if self.options.shard_durations_file is not None:
+            durations = TestDurationsStore(
+                self.options.shard_durations_file
+            ).data
+        selected = select_shard(
+            [test.id() for test in tests],
+            self.options.shard_index,
+            self.options.shard_count,
+            durations
+        )
+        return TestSuite([test for test in tests if test.id() in selected])
+
     def print_overall_testsuite_report(self):
         '''
         Print a nicely formatted report about the test suite results
@@ -619,6 +842,28 @@ class SaltTestingParser(optparse.OptionParser):
                 print_header(u' ', sep='-', inline=True,
                              width=self.options.output_columns)
 
+        heaviest = heaviest_tests(
+            collect_test_resources(
+                [results for (name, results) in self.testsuite_results]
+            )
+        )
+        if heaviest:
+            print_header(
+                u' --------  Top {0} Heaviest Tests  '.format(len(heaviest)),
+                sep='-', inline=True, width=self.options.output_columns
+            )
+            maxlen = len(
+                max([test_id for (test_id, measurements) in heaviest],
+                    key=len)
+            )
+            fmt = u'   -> {0: <{maxlen}}  ->  {1}'
+            for test_id, measurements in heaviest:
+                print(fmt.format(
+                    test_id, format_resources(measurements), maxlen=maxlen
+                ))
+            print_header(u' ', sep='-', inline=True,
+                         width=self.options.output_columns)
+
         if no_problems_found:
             print_header(
                 u'***  No Problems Found While Running Tests  ',
@@ -647,12 +892,69 @@ class SaltTestingParser(optparse.OptionParser):
         method.
         '''
 
+    def finish_json_lines_reporter(self, exit_code=None):
+        '''
+        Emit the last, ``run-stop``, tests event and close the JSON lines
+        reporter. ``exit_code`` is ``None`` when the tests run was aborted.
+        '''
+        if self.json_lines_reporter is None:
+            return
+        remove_result_listener(self.json_lines_reporter)
+        self.json_lines_reporter.finish(
+            [results for (header, results) in self.testsuite_results],
+            exit_code
+        )
+        self.json_lines_reporter = None
+
     def finalize(self, exit_code=0):
         '''
         Run the finalization procedures. Show report, clean-up file-system, etc
         '''
-        if self.options.no_report is False:
-            self.print_overall_testsuite_report()
+        try:
+            if self.options.no_report is False:
+                self.print_overall_testsuite_report()
+            if self.testsuite_durations is not None and \
+                    self.options.shard_count == 1:
+                # Each node would record different durations and, when shared,
+                # would split the shards differently
+                self.testsuite_durations.save()
+            if self.options.json_out is not None:
+                write_json_report(
+                    self.options.json_out,
+                    [results for (header, results) in self.testsuite_results],
+                    shard=self.options.shard_count > 1 and {
+                        'index': self.options.shard_index,
+                        'count': self.options.shard_count
+                    } or None
+                )
+            if self.options.profile_resources:
+                write_resources_report(
+                    self.options.profile_resources_out,
+                    collect_test_resources([
+                        results for (header, results) in self.testsuite_results
+                    ])
+                )
+            if self.options.profile_tests is not None:
+                report = aggregate_profiles(
+                    self.options.profile_tests_dir,
+                    self.options.profile_tests_top,
+                    since=self.profiles_since
+                )
+                if report is not None:
+                    print_header(
+                        u'  Tests Profiles, Top {0} by Cumulative '
+                        u'Time  '.format(self.options.profile_tests_top),
+                        sep=u'-', inline=True,
+                        width=self.options.output_columns
+                    )
+                    print(report.rstrip())
+                print(
+                    ' * Tests profiles written to {0}'.format(
+                        self.options.profile_tests_dir
+                    )
+                )
+        finally:
+            self.finish_json_lines_reporter(exit_code)
         self.post_execution_cleanup()
         # Brute force approach to terminate this process and it's children
         logging.getLogger(__name__).info('Terminating test suite child processes.')
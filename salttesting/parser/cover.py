@@ -17,10 +17,33 @@ import re
 import sys
 import json
 import shutil
+import logging
+import tempfile
+import platform
 import warnings
 
 # Import salt testing libs
+from salttesting.coveragedata import (
+    COVERAGE_MODES,
+    CoverageOverheadStore,
+    IncrementalCoverageCombiner,
+    coverage_mode_options,
+    select_fast_tracer,
+    write_reports_in_background
+)
+from salttesting.impact import (
+    CoverageContextRecorder,
+    CoverageMapStore,
+    changed_lines,
+    coverage_contexts_map,
+    git_commit,
+    git_toplevel,
+    test_module_file,
+    test_modules_map
+)
 from salttesting.parser import SaltTestingParser
+from salttesting.scheduling import flatten_testsuite
+from salttesting.unit import TestSuite, add_result_listener
 
 # Import coverage libs
 try:
@@ -29,6 +52,8 @@ try:
 except ImportError:
     COVERAGE_AVAILABLE = False
 
+log = logging.getLogger(__name__)
+
 try:
     import multiprocessing.util
     # Force forked multiprocessing processes to be measured as well
@@ -71,6 +96,20 @@ if COVERAGE_AVAILABLE:
     coverage.process_startup()
 
 
+def test_needs_daemons(test):
+    '''
+    Tell if ``test`` exercises the Salt daemons. The code it runs there is not
+    attributed to it on the coverage map.
+    '''
+    # Late import, salttesting.case imports salttesting.runtests
+    from salttesting.case import ShellTestCase
+    from salttesting.mixins import SaltClientTestCaseMixIn
+    if isinstance(test, (ShellTestCase, SaltClientTestCaseMixIn)):
+        return True
+    # Salt's own integration tests cases don't subclass the above
+    return test.__class__.__module__.split('.')[0] == 'integration'
+
+
 class SaltCoverageTestingParser(SaltTestingParser):
     '''
     Code coverage aware testing option parser
@@ -88,6 +127,8 @@ class SaltCoverageTestingParser(SaltTestingParser):
 
         SaltTestingParser.__init__(self, *args, **kwargs)
         self.code_coverage = None
+        self.coverage_recorder = None
+        self.coverage_combiner = None
 
         # Add the coverage related options
         self.output_options_group.add_option(
@@ -115,10 +156,74 @@ class SaltCoverageTestingParser(SaltTestingParser):
                   'will be saved to. The directory, if existing, will be '
                   'deleted before the report is generated.')
         )
+        self.output_options_group.add_option(
+            '--coverage-mode',
+            type='choice',
+            choices=COVERAGE_MODES,
+            default='full',
+            help=('\'full\' measures what the coverage options passed to '
+                  '\'start_coverage()\' ask for. \'lines\' only measures '
+                  'lines. \'fast\' only measures the lines of the code under '
+                  'test, not the tests nor the site-packages, with the '
+                  'fastest tracer available. Default: %default')
+        )
+        self.output_options_group.add_option(
+            '--coverage-overhead-file',
+            default=os.path.join(
+                tempfile.gettempdir() if platform.system() != 'Darwin' else '/tmp',
+                'salt-testing-coverage-overhead.json'
+            ),
+            help=('The path to the file where the tests durations measured '
+                  'with each coverage mode, and without coverage, are '
+                  'recorded to log the overhead of each mode. '
+                  'Default: %default')
+        )
+        self.output_options_group.add_option(
+            '--coverage-combine-workers',
+            type='int',
+            default=0,
+            help=('The number of processes combining, while the tests run, '
+                  'the coverage data files of the processes which exited. '
+                  '0 combines all the data files at the end of the run. '
+                  'Default: %default')
+        )
+        self.output_options_group.add_option(
+            '--coverage-reports-in-background',
+            default=False,
+            action='store_true',
+            help=('Write the XML and HTML coverage reports on a detached '
+                  'process, the tests suite exits without waiting for them.')
+        )
+        self.output_options_group.add_option(
+            '--coverage-map',
+            default=False,
+            action='store_true',
+            help=('Record the source lines executed by each test on the '
+                  'coverage map used by \'--changed-since\'. Requires '
+                  'coverage>=5.0.')
+        )
+        self.output_options_group.add_option(
+            '--coverage-map-file',
+            default=os.path.join(
+                tempfile.gettempdir() if platform.system() != 'Darwin' else '/tmp',
+                'salt-testing-coverage-map.json'
+            ),
+            help='The path to the coverage map. Default: %default'
+        )
+        self.test_selection_group.add_option(
+            '--changed-since',
+            default=None,
+            metavar='REF',
+            help=('Only run the tests which, according to the coverage map, '
+                  'see \'--coverage-map\', execute the files or lines '
+                  'changed since the git REF, and the tests missing from the '
+                  'map. The whole tests suite runs when a changed file is '
+                  'not on the map.')
+        )
 
     def _validate_options(self):
-        if (self.options.coverage_xml or self.options.coverage_html) and \
-                not self.options.coverage:
+        if (self.options.coverage_xml or self.options.coverage_html or
+                self.options.coverage_map) and not self.options.coverage:
             self.options.coverage = True
 
         if self.options.coverage is True and COVERAGE_AVAILABLE is False:
@@ -139,6 +244,14 @@ class SaltCoverageTestingParser(SaltTestingParser):
                     'know to produce incorrect results. Please consider '
                     'upgrading...'
                 )
+            if self.options.coverage_combine_workers < 0:
+                self.error(
+                    '\'--coverage-combine-workers\' needs to be a positive '
+                    'number'
+                )
+            if self.options.coverage_map and \
+                    not hasattr(coverage.coverage, 'switch_context'):
+                self.error('\'--coverage-map\' requires coverage>=5.0')
         SaltTestingParser._validate_options(self)
 
     def pre_execution_cleanup(self):
@@ -170,7 +283,26 @@ class SaltCoverageTestingParser(SaltTestingParser):
             )
         print(' * Starting Coverage')
 
+        coverage_options = coverage_mode_options(
+            self.options.coverage_mode,
+            coverage_options,
+            omit_dirs=[self.testsuite_directory]
+        )
+        if self.options.coverage_mode == 'fast':
+            print(
+                ' * Using the {0!r} coverage tracer'.format(
+                    select_fast_tracer()
+                )
+            )
+
         if self.options.no_processes_coverage is False:
+            if self.options.coverage_combine_workers:
+                self.coverage_combiner = IncrementalCoverageCombiner(
+                    coverage_options.get('data_file', '.coverage'),
+                    coverage_options,
+                    processes=self.options.coverage_combine_workers
+                )
+                self.coverage_combiner.start()
             # Update environ so that any subprocess started on tests are also
             # included in the report
             coverage_options['data_suffix'] = True
@@ -181,6 +313,12 @@ class SaltCoverageTestingParser(SaltTestingParser):
         self.code_coverage = coverage.coverage(**coverage_options)
         self.code_coverage.start()
 
+        if self.options.coverage_map:
+            self.coverage_recorder = CoverageContextRecorder(
+                self.code_coverage, needs_daemons=test_needs_daemons
+            )
+            add_result_listener(self.coverage_recorder)
+
     def stop_coverage(self, save_coverage=True):
         '''
         Stop code coverage.
@@ -198,12 +336,45 @@ class SaltCoverageTestingParser(SaltTestingParser):
             print(' * Saving coverage info')
             self.code_coverage.save()
 
+        if self.coverage_combiner is not None:
+            print(' * Waiting for the coverage info files being combined')
+            self.coverage_combiner.finish()
+            self.coverage_combiner = None
+
         if self.options.no_processes_coverage is False:
             # Combine any multiprocessing coverage data files
             print(' * Combining multiple coverage info files ... '),
             self.code_coverage.combine()
             print('Done.')
 
+        if self.coverage_recorder is not None:
+            print(
+                ' * Updating the coverage map at {0!r}'.format(
+                    self.options.coverage_map_file
+                )
+            )
+            root = git_toplevel(self.testsuite_directory) or \
+                self.testsuite_directory
+            coverage_map = CoverageMapStore(self.options.coverage_map_file)
+            coverage_map.update(
+                git_commit('HEAD', root),
+                self.coverage_recorder.tests,
+                coverage_contexts_map(self.code_coverage.get_data(), root),
+                unmapped=self.coverage_recorder.unmapped
+            )
+            coverage_map.save()
+
+        if self.options.coverage_reports_in_background and \
+                (self.options.coverage_xml is not None or
+                 self.options.coverage_html is not None):
+            print(' * Generating the coverage reports in the background')
+            write_reports_in_background(
+                self.code_coverage,
+                xml_output=self.options.coverage_xml,
+                html_output=self.options.coverage_html
+            )
+            return
+
         if self.options.coverage_xml is not None:
             print(
                 ' * Generating Coverage XML Report At {0!r} ... '.format(
@@ -228,7 +399,73 @@ class SaltCoverageTestingParser(SaltTestingParser):
             )
             print('Done.')
 
+    def select_tests(self, tests):
+        '''
+        Only keep the tests impacted by the changes since
+        ``--changed-since``, then narrow them down as the parent class does
+        '''
+        if self.options.changed_since is not None:
+            tests = self.select_changed_tests(tests)
+        return SaltTestingParser.select_tests(self, tests)
+
+    def select_changed_tests(self, tests):
+        '''
+        Only keep the tests impacted by the changes since ``--changed-since``
+        '''
+        root = git_toplevel(self.testsuite_directory)
+        changes = root and changed_lines(self.options.changed_since, root)
+        if changes is None:
+            print(
+                ' * Unable to find the changes since {0!r}, running all the '
+                'tests'.format(self.options.changed_since)
+            )
+            return tests
+
+        tests = list(flatten_testsuite(tests))
+        coverage_map = CoverageMapStore(self.options.coverage_map_file)
+        selected = coverage_map.select(
+            [test.id() for test in tests],
+            changes,
+            test_modules_map(
+                [(test.id(), test_module_file(test)) for test in tests], root
+            ),
+            # The recorded line numbers only match the changed lines when
+            # they were recorded on the commit the changes are computed against
+            commit=git_commit(self.options.changed_since, root)
+        )
+        if selected is None:
+            print(
+                ' * Some of the changed files are not on the coverage map, '
+                'running all the tests'
+            )
+            return TestSuite(tests)
+        print(
+            ' * Running {0} out of {1} tests, impacted by the changes since '
+            '{2!r}'.format(len(selected), len(tests), self.options.changed_since)
+        )
+        return TestSuite([test for test in tests if test.id() in selected])
+
+    def save_coverage_overhead(self):
+        '''
+        Record the tests durations measured with the current coverage mode
+        and log the overhead of each mode
+        '''
+        durations = {}
+        for (header, results) in self.testsuite_results:
+            durations.update(getattr(results, 'test_durations', {}))
+        store = CoverageOverheadStore(self.options.coverage_overhead_file)
+        store.update(
+            self.options.coverage and self.options.coverage_mode or 'none',
+            durations
+        )
+        store.save()
+        for line in store.summary():
+            log.info(line)
+            if self.options.coverage:
+                print(' * {0}'.format(line))
+
     def finalize(self, exit_code=0):
+        self.save_coverage_overhead()
         if self.options.coverage is True:
             self.stop_coverage(save_coverage=True)
         SaltTestingParser.finalize(self, exit_code)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+'''
+    :copyright: © 2014 by the SaltStack Team, see AUTHORS for more details.
+    :license: Apache 2.0, see LICENSE for more details.
+
+
+    salttesting.ports
+    ~~~~~~~~~~~~~~~~~
+
+    Free TCP ports allocation and short unix sockets directories
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import socket
+import hashlib
+import logging
+import tempfile
+import contextlib
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# Import 3rd-party libs
+import psutil
+
+# Import salt testing libs
+from salttesting.scheduling import JSONFileStore
+
+log = logging.getLogger(__name__)
+
+# The unix sockets paths can't be longer than 104 bytes on MacOS and 108 bytes on Linux, the sockets directories are
+# created right under this directory, when it exists, which has a short path on every platform
+SHORT_SOCKETS_ROOT = '/tmp'
+
+
+def short_socket_dir(key):
+    '''
+    Return a short directory path, unique to ``key``, to hold unix sockets. The ``key`` is usually the long directory
+    the sockets would otherwise live under.
+    '''
+    root = SHORT_SOCKETS_ROOT if os.path.isdir(SHORT_SOCKETS_ROOT) else tempfile.gettempdir()
+    return os.path.join(root, 'salt-{0}'.format(hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]))
+
+
+def bind_localhost_port(port=0):
+    '''
+    Return a socket bound to ``port``, on localhost, or to a free port chosen by the kernel when ``port`` is ``0``.
+    Raises :py:exc:`socket.error` if the port is in use.
+    '''
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # The socket is never listening, once closed the port can be immediately bound by the daemon it's handed over to
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind(('127.0.0.1', port))
+    except socket.error:
+        sock.close()
+        raise
+    return sock
+
+
+class PortAllocator(object):
+    '''
+    Allocate free TCP ports on localhost.
+
+    Each allocated port stays bound, so that nothing else on the system gets it, until :meth:`release` hands the ports
+    over to the processes which will use them. The allocated ports are also recorded, along with the PID of the
+    allocating process, on the ``registry_path`` JSON file, updated under an exclusive lock, so that the tests suites
+    running side by side don't allocate the ports handed over by one another. The ports recorded by processes which
+    are no longer running are freed.
+    '''
+
+    def __init__(self, registry_path):
+        self.registry_path = registry_path
+        self._sockets = {}
+
+    @property
+    def ports(self):
+        '''
+        The ports held by the allocator
+        '''
+        return sorted(self._sockets)
+
+    @contextlib.contextmanager
+    def _registry(self):
+        dirname = os.path.dirname(self.registry_path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with open('{0}.lock'.format(self.registry_path), 'a') as lock_fh:
+            if HAS_FCNTL:
+                fcntl.flock(lock_fh.fileno(), fcntl.LOCK_EX)
+            try:
+                registry = JSONFileStore(self.registry_path)
+                for port, pid in list(registry.data.items()):
+                    if pid != os.getpid() and not psutil.pid_exists(pid):
+                        registry.data.pop(port)
+                yield registry.data
+                registry.save()
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(lock_fh.fileno(), fcntl.LOCK_UN)
+
+    def allocate(self, count=1):
+        '''
+        Allocate ``count`` free ports and return them
+        '''
+        allocated = []
+        skipped = []
+        with self._registry() as registry:
+            while len(allocated) < count:
+                sock = bind_localhost_port()
+                port = sock.getsockname()[1]
+                if str(port) in registry:
+                    # Handed over to another tests suite, which is not yet using it. Keep it bound, so that the
+                    # kernel doesn't choose it again, until we're done
+                    skipped.append(sock)
+                    continue
+                registry[str(port)] = os.getpid()
+                self._sockets[port] = sock
+                allocated.append(port)
+        for sock in skipped:
+            sock.close()
+        log.debug('Allocated the ports {0}'.format(', '.join([str(port) for port in allocated])))
+        return allocated
+
+    def claim(self, ports, bind=True):
+        '''
+        Allocate the specific ``ports``, previously allocated by another execution, for example. When ``bind`` is
+        ``False`` the ports are only recorded, because they're known to be used by processes we own, daemons left
+        running by a previous execution for example.
+
+        Returns ``False``, without allocating any of them, if any of the ports is in use or allocated by another
+        running process.
+        '''
+        claimed = {}
+        with self._registry() as registry:
+            for port in ports:
+                owner = registry.get(str(port))
+                if owner is not None and owner != os.getpid():
+                    log.debug('Port {0} is allocated by the process {1}'.format(port, owner))
+                    break
+                if not bind:
+                    claimed[port] = None
+                    continue
+                try:
+                    claimed[port] = bind_localhost_port(port)
+                except socket.error as exc:
+                    log.debug('Port {0} is in use: {1}'.format(port, exc))
+                    break
+            else:
+                for port in claimed:
+                    registry[str(port)] = os.getpid()
+                for port, sock in claimed.items():
+                    if sock is not None:
+                        self._sockets[port] = sock
+                return True
+        for sock in claimed.values():
+            if sock is not None:
+                sock.close()
+        return False
+
+    def release(self):
+        '''
+        Close the sockets holding the allocated ports so that they can be bound by the processes they're handed over
+        to. The ports stay recorded as ours until this process exits.
+        '''
+        for sock in self._sockets.values():
+            sock.close()
+        self._sockets = {}
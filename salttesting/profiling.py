@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+'''
+    :copyright: © 2014 by the SaltStack Team, see AUTHORS for more details.
+    :license: Apache 2.0, see LICENSE for more details.
+
+
+    salttesting.profiling
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tests resources profiling
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import re
+import sys
+import glob
+import json
+import time
+import atexit
+import signal
+import pstats
+import cProfile
+import logging
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+# Import 3rd-party libs
+import psutil
+from six import StringIO
+
+log = logging.getLogger(__name__)
+
+# The processes started with this environment variable set, for example, the Salt daemons, are profiled and dump
+# their profile to the directory it points to
+PROFILE_DAEMONS_DIR_ENV = 'SALTTESTING_PROFILE_DAEMONS_DIR'
+DAEMON_PROFILE_PREFIX = 'daemon-'
+
+
+class ResourceProfiler(object):
+    '''
+    Tests results listener, see :func:`salttesting.unit.add_result_listener`, which records the resources each test
+    consumes. The measurements are stored, keyed by the test id, on the ``test_resources`` attribute of the test
+    results:
+
+    ``cpu_time``
+        CPU time, in seconds, used by the tests runner process
+    ``peak_rss_delta``
+        Growth, in bytes, of the tests runner peak resident memory
+    ``rss_delta``
+        Change, in bytes, of the tests runner resident memory
+    ``fds_delta``
+        Change in the number of file descriptors opened by the tests runner
+    ``children_cpu_time``
+        CPU time, in seconds, used by the child processes, the Salt daemons for example
+    ``children_rss_delta``
+        Change, in bytes, of the child processes resident memory
+    ``children_peak_rss``
+        Highest resident memory, in bytes, of the child processes, all together, sampled when the test started and
+        when it finished
+    ``leaked_children``
+        The child processes started by the test and still running once it finished
+
+    ``extra_pids`` are the PIDs of additional processes, and their children, to account as child processes, for
+    example, the Salt daemons when they're not children of the tests runner.
+    '''
+
+    def __init__(self, extra_pids=()):
+        self.extra_pids = list(extra_pids)
+        self._process = None
+        self._snapshots = {}
+
+    @property
+    def process(self):
+        # The profiler is inherited by the forked workers running tests in parallel, each profiles itself
+        if self._process is None or self._process.pid != os.getpid():
+            self._process = psutil.Process(os.getpid())
+        return self._process
+
+    def _children(self):
+        children = self.process.children(recursive=True)
+        for pid in self.extra_pids:
+            try:
+                process = psutil.Process(pid)
+                children.append(process)
+                children.extend(process.children(recursive=True))
+            except psutil.NoSuchProcess:
+                continue
+        return children
+
+    def snapshot(self):
+        cpu_times = self.process.cpu_times()
+        snapshot = {
+            'cpu_time': cpu_times.user + cpu_times.system,
+            'rss': self.process.memory_info().rss,
+            'fds': self.process.num_fds() if hasattr(self.process, 'num_fds') else 0,
+            'peak_rss': 0,
+            'children': {},
+        }
+        if HAS_RESOURCE:
+            snapshot['peak_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if sys.platform != 'darwin':
+                # In kilobytes, except on MacOS
+                snapshot['peak_rss'] *= 1024
+        for child in self._children():
+            try:
+                child_cpu_times = child.cpu_times()
+                snapshot['children'][child.pid] = (
+                    child_cpu_times.user + child_cpu_times.system,
+                    child.memory_info().rss,
+                    child.name()
+                )
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return snapshot
+
+    def startTest(self, result, test):
+        self._snapshots[test.id()] = self.snapshot()
+
+    def stopTest(self, result, test, outcome, message):
+        before = self._snapshots.pop(test.id(), None)
+        if before is None:
+            return
+        after = self.snapshot()
+        children_cpu_time = children_rss_delta = 0
+        leaked_children = []
+        for pid, (cpu_time, rss, name) in after['children'].items():
+            if pid in before['children']:
+                children_cpu_time += cpu_time - before['children'][pid][0]
+                children_rss_delta += rss - before['children'][pid][1]
+            else:
+                children_cpu_time += cpu_time
+                leaked_children.append({'pid': pid, 'name': name})
+        if not hasattr(result, 'test_resources'):
+            result.test_resources = {}
+        result.test_resources[test.id()] = {
+            'cpu_time': round(after['cpu_time'] - before['cpu_time'], 4),
+            'peak_rss_delta': after['peak_rss'] - before['peak_rss'],
+            'rss_delta': after['rss'] - before['rss'],
+            'fds_delta': after['fds'] - before['fds'],
+            'children_cpu_time': round(children_cpu_time, 4),
+            'children_rss_delta': children_rss_delta,
+            'children_peak_rss': max(
+                sum([rss for (cpu_time, rss, name) in before['children'].values()]),
+                sum([rss for (cpu_time, rss, name) in after['children'].values()])
+            ),
+            'leaked_children': leaked_children,
+        }
+
+
+def collect_test_resources(results):
+    '''
+    Merge the resources recorded on the passed list of test results
+    '''
+    resources = {}
+    for result in results:
+        resources.update(getattr(result, 'test_resources', {}))
+    return resources
+
+
+def heaviest_tests(resources, count=20):
+    '''
+    Return the ``count`` tests which used the most CPU time, their own and the one of the child processes, as a list
+    of ``(test_id, measurements)`` tuples
+    '''
+    return sorted(
+        resources.items(),
+        key=lambda item: (-(item[1]['cpu_time'] + item[1]['children_cpu_time']), item[0])
+    )[:count]
+
+
+def format_resources(measurements):
+    '''
+    Return a short, human readable, summary of the measurements of a test
+    '''
+    return (
+        'cpu={0:.2f}s children-cpu={1:.2f}s peak-rss={2:+.1f}MB children-peak-rss={3:.1f}MB fds={4:+d} '
+        'leaked-children={5}'.format(
+            measurements['cpu_time'],
+            measurements['children_cpu_time'],
+            measurements['peak_rss_delta'] / 1048576.0,
+            measurements.get('children_peak_rss', 0) / 1048576.0,
+            measurements['fds_delta'],
+            len(measurements['leaked_children'])
+        )
+    )
+
+
+def write_resources_report(path, resources):
+    '''
+    Write the recorded resources as a JSON report to ``path``
+    '''
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    with open(path, 'w') as wfh:
+        json.dump(resources, wfh, indent=1, sort_keys=True)
+    log.info('Wrote the tests resources report to {0}'.format(path))
+
+
+def profile_path(directory, name):
+    '''
+    Return the path of the ``.pstats`` file of ``name``, a test id for example, under ``directory``
+    '''
+    return os.path.join(directory, '{0}.pstats'.format(re.sub(r'[^\w.-]', '_', name)))
+
+
+def prepare_profiles_dir(directory):
+    '''
+    Create ``directory`` and remove the daemons profiles left over by a previous run. Returns the time the run started
+    at, the profiles written before are ignored by :func:`aggregate_profiles`.
+    '''
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for path in glob.glob(os.path.join(directory, '{0}*.pstats'.format(DAEMON_PROFILE_PREFIX))):
+        os.unlink(path)
+    # Truncated, the filesystems might store the modification times with a one second resolution
+    return int(time.time())
+
+
+class TestsProfiler(object):
+    '''
+    Tests results listener, see :func:`salttesting.unit.add_result_listener`, which runs each test whose id matches
+    the ``pattern`` regular expression under :mod:`cProfile` and dumps its profile to ``<directory>/<test id>.pstats``
+    '''
+
+    def __init__(self, pattern, directory):
+        self.pattern = re.compile(pattern)
+        self.directory = directory
+        self._profiles = {}
+
+    def startTest(self, result, test):
+        if not self.pattern.search(test.id()):
+            return
+        profile = cProfile.Profile()
+        self._profiles[test.id()] = profile
+        profile.enable()
+
+    def stopTest(self, result, test, outcome, message):
+        profile = self._profiles.pop(test.id(), None)
+        if profile is None:
+            return
+        profile.disable()
+        try:
+            profile.dump_stats(profile_path(self.directory, test.id()))
+        except (IOError, OSError) as exc:
+            log.warning('Failed to dump the profile of {0}: {1}'.format(test.id(), exc))
+
+
+def run_profiled(name, func, *args, **kwargs):
+    '''
+    Run ``func`` under :mod:`cProfile` when the :data:`PROFILE_DAEMONS_DIR_ENV` environment variable is set, and
+    dump the profile to ``<directory>/daemon-<name>-<pid>.pstats`` once it returns, the process exits or gets
+    terminated. Otherwise, just run ``func``.
+
+    The daemons install their own ``SIGTERM`` and ``SIGINT`` handlers, while ``func`` runs those are wrapped so that
+    the profile is dumped before they're called. Without a handler, the profile is dumped and the signal delivered
+    again with its default action. ``signal.signal`` is patched while ``func`` runs and stays patched on the processes
+    the daemon forks, those install their handlers unwrapped and never dump the profile.
+    '''
+    directory = os.environ.get(PROFILE_DAEMONS_DIR_ENV)
+    if not directory:
+        return func(*args, **kwargs)
+
+    profile = cProfile.Profile()
+    dumped = []
+    pid = os.getpid()
+
+    def dump_profile():
+        if dumped or os.getpid() != pid:
+            # Already dumped, or on a forked process
+            return
+        dumped.append(True)
+        profile.disable()
+        try:
+            profile.dump_stats(
+                profile_path(directory, '{0}{1}-{2}'.format(DAEMON_PROFILE_PREFIX, name, os.getpid()))
+            )
+        except (IOError, OSError) as exc:
+            log.warning('Failed to dump the profile of {0}: {1}'.format(name, exc))
+
+    def wrap_handler(handler):
+        def on_signal(signum, frame):
+            dump_profile()
+            if callable(handler):
+                return handler(signum, frame)
+            if handler != signal.SIG_IGN:
+                # The default action, terminate by the signal
+                install_handler(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
+        return on_signal
+
+    install_handler = signal.signal
+
+    def install_wrapped_handler(signum, handler):
+        if signum in (signal.SIGTERM, signal.SIGINT) and os.getpid() == pid:
+            handler = wrap_handler(handler)
+        return install_handler(signum, handler)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        install_handler(signum, wrap_handler(signal.getsignal(signum)))
+    signal.signal = install_wrapped_handler
+    # Not run by the multiprocessing processes, they exit with os._exit(), but by the daemons started with
+    # --keep-daemons
+    atexit.register(dump_profile)
+    profile.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        signal.signal = install_handler
+        dump_profile()
+
+
+def aggregate_profiles(directory, count=20, daemons=False, since=None):
+    '''
+    Merge the tests profiles found under ``directory``, or the daemons profiles when ``daemons`` is ``True``, and
+    return the report of the ``count`` functions with the highest cumulative time, or ``None`` when there are no
+    profiles. The profiles written before ``since``, a timestamp, are ignored. The merged profile is also dumped to
+    ``<directory>/aggregated-tests.pstats``, or ``aggregated-daemons.pstats``.
+    '''
+    paths = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.pstats'))):
+        basename = os.path.basename(path)
+        if basename.startswith('aggregated-'):
+            continue
+        if since is not None and os.path.getmtime(path) < since:
+            continue
+        if basename.startswith(DAEMON_PROFILE_PREFIX) is daemons:
+            paths.append(path)
+    if not paths:
+        return None
+
+    stream = StringIO()
+    stats = pstats.Stats(paths[0], stream=stream)
+    for path in paths[1:]:
+        stats.add(path)
+    stats.dump_stats(os.path.join(directory, 'aggregated-{0}.pstats'.format(daemons and 'daemons' or 'tests')))
+    stats.sort_stats('cumulative').print_stats(count)
+    return stream.getvalue()
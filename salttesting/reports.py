@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+'''
+    :copyright: © 2014 by the SaltStack Team, see AUTHORS for more details.
+    :license: Apache 2.0, see LICENSE for more details.
+
+
+    salttesting.reports
+    ~~~~~~~~~~~~~~~~~~~
+
+    Machine readable tests results reports
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import json
+import time
+import socket
+import logging
+
+log = logging.getLogger(__name__)
+
+REPORT_VERSION = 1
+UNIX_SOCKET_PREFIX = 'unix:'
+OUTCOMES = ('passed', 'failure', 'error', 'skipped', 'expected-failure', 'unexpected-success')
+
+
+def results_to_dict(results):
+    '''
+    Return a dictionary, keyed by test id, with the outcome, duration and message of each test found in the passed
+    list of test results
+    '''
+    tests = {}
+    for result in results:
+        durations = getattr(result, 'test_durations', {})
+        outcomes = {}
+        for outcome, entries in (('failure', result.failures),
+                                 ('error', result.errors),
+                                 ('skipped', result.skipped),
+                                 ('expected-failure', getattr(result, 'expectedFailures', []))):
+            for test, message in entries:
+                outcomes[test.id()] = (outcome, message)
+        for test in getattr(result, 'unexpectedSuccesses', []):
+            outcomes[test.id()] = ('unexpected-success', None)
+        # Passed tests are not tracked by the results, only their durations are
+        for test_id in durations:
+            outcomes.setdefault(test_id, ('passed', None))
+        for test_id, (outcome, message) in outcomes.items():
+            tests[test_id] = {
+                'outcome': outcome,
+                'duration': durations.get(test_id),
+                'message': message,
+            }
+    return tests
+
+
+def write_json_report(path, results, **extra):
+    '''
+    Write a JSON report of the passed list of test results to ``path``. Any additional keyword arguments are stored
+    at the top level of the report.
+    '''
+    tests = results_to_dict(results)
+    totals = dict([(outcome, 0) for outcome in OUTCOMES])
+    for entry in tests.values():
+        totals[entry['outcome']] += 1
+    report = {
+        'version': REPORT_VERSION,
+        'created': time.time(),
+        'tests': tests,
+        'totals': totals,
+        'testsRun': sum([result.testsRun for result in results]),
+    }
+    report.update(extra)
+
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    with open(path, 'w') as wfh:
+        json.dump(report, wfh, indent=1, sort_keys=True)
+    log.info('Wrote JSON tests report to {0}'.format(path))
+
+
+def merge_json_reports(paths):
+    '''
+    Merge the JSON reports found at ``paths``, for example the reports written by each shard, into a single report
+    '''
+    merged = {
+        'version': REPORT_VERSION,
+        'created': time.time(),
+        'tests': {},
+        'totals': dict([(outcome, 0) for outcome in OUTCOMES]),
+        'testsRun': 0,
+        'shards': [],
+    }
+    for path in paths:
+        with open(path, 'r') as rfh:
+            report = json.load(rfh)
+        merged['tests'].update(report['tests'])
+        merged['testsRun'] += report['testsRun']
+        if report.get('shard') is not None:
+            merged['shards'].append(report['shard'])
+    for entry in merged['tests'].values():
+        merged['totals'][entry['outcome']] += 1
+    return merged
+
+
+class JSONLinesReporter(object):
+    '''
+    Tests results listener, see :func:`salttesting.unit.add_result_listener`, which streams the tests events, as they
+    happen, one JSON document per line, to ``destination``. ``destination`` is either a file path, which is appended
+    to, or ``unix:<path>`` to connect to a UNIX socket. Any additional keyword arguments are added to every event.
+
+    Each event has the ``event``, ``time`` and ``worker``, the PID of the process running the tests, keys. The
+    ``start`` and ``stop`` events also have the ``test`` id and the ``stop`` event the ``outcome``, ``duration`` and
+    ``message`` of the test. The tests runners also emit ``suite-start`` and ``suite-stop`` events and, last, once the
+    tests run is over, a ``run-stop`` event, see :meth:`finish`. A stream without it belongs to a truncated run.
+    '''
+
+    def __init__(self, destination, **extra):
+        self.destination = destination
+        self.extra = extra
+        self._owner = os.getpid()
+        self._finished = False
+        self._pid = None
+        self._fd = None
+        self._sock = None
+        self._broken = False
+
+    def _connect(self):
+        if self._pid == os.getpid():
+            return
+        # The forked workers, running tests in parallel, open their own file descriptor or connection. Each line is
+        # written at once so that the lines of several workers are never mixed.
+        self._pid = os.getpid()
+        self._fd = self._sock = None
+        self._broken = False
+        if self.destination.startswith(UNIX_SOCKET_PREFIX):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(self.destination[len(UNIX_SOCKET_PREFIX):])
+        else:
+            dirname = os.path.dirname(self.destination)
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            self._fd = os.open(self.destination, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def emit(self, event, **fields):
+        '''
+        Write an ``event`` line, with the passed ``fields``
+        '''
+        entry = {'event': event, 'time': time.time(), 'worker': os.getpid()}
+        entry.update(self.extra)
+        entry.update(fields)
+        line = '{0}\n'.format(json.dumps(entry, sort_keys=True)).encode('utf-8')
+        try:
+            self._connect()
+            if self._broken:
+                return
+            if self._sock is not None:
+                self._sock.sendall(line)
+            else:
+                while line:
+                    line = line[os.write(self._fd, line):]
+        except (IOError, OSError, socket.error) as exc:
+            # Do not fail, nor flood the logs, when the reader goes away
+            log.warning('Failed to write the tests events to {0}: {1}'.format(self.destination, exc))
+            self._broken = True
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        if self._sock is not None:
+            self._sock.close()
+        elif self._fd is not None:
+            os.close(self._fd)
+        self._pid = self._fd = self._sock = None
+
+    def finish(self, results=(), exit_code=None):
+        '''
+        Emit the ``run-stop`` event, with the totals of the tests ``results``, and close the reporter. ``exit_code``
+        is ``None`` when the tests run was aborted. Only the first call, on the process which created the reporter,
+        has any effect.
+        '''
+        if self._finished or os.getpid() != self._owner:
+            return
+        self._finished = True
+        totals = {'tests': 0, 'failures': 0, 'errors': 0, 'skipped': 0}
+        for result in results:
+            totals['tests'] += result.testsRun
+            totals['failures'] += len(result.failures)
+            totals['errors'] += len(result.errors)
+            totals['skipped'] += len(getattr(result, 'skipped', ()))
+        self.emit('run-stop', exit_code=exit_code, aborted=exit_code is None, **totals)
+        self.close()
+
+    def startTest(self, result, test):
+        self.emit('start', test=test.id())
+
+    def stopTest(self, result, test, outcome, message):
+        duration = getattr(result, 'test_durations', {}).get(test.id())
+        self.emit(
+            'stop',
+            test=test.id(),
+            outcome=outcome,
+            duration=round(duration, 4) if duration is not None else None,
+            message=message
+        )
@@ -44,6 +44,14 @@
         salt-runtests --no-salt-daemons
 
 
+    The tests which do not require the Salt daemons can also be executed in parallel, grouped by test case class, on a
+    pool of worker processes. The remaining tests are still executed serially against the shared daemons:
+
+    .. code-block:: bash
+
+        salt-runtests --workers 8
+
+
     :command:`salt-runtests` is packed with a myriad of options so please check them out by passing ``--help``:
 
     .. code-block:: bash
@@ -311,7 +319,10 @@ import imp
 import sys
 import json
 import time
+import stat
+import errno
 import shutil
+import hashlib
 import fnmatch
 import logging
 import platform
@@ -319,17 +330,70 @@ import argparse
 import tempfile
 import multiprocessing
 from copy import deepcopy
-from datetime import datetime, timedelta
+from datetime import timedelta
 try:
     import pwd
 except ImportError:
     pass
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
 
 
 # Import Salt Testing libs
 from salttesting import helpers
 from salttesting import version
-from salttesting.unit import TestLoader, TestSuite, TextTestRunner
+from salttesting.coveragedata import (
+    COVERAGE_MODES,
+    CoverageOverheadStore,
+    IncrementalCoverageCombiner,
+    coverage_mode_options,
+    select_fast_tracer,
+    write_reports_in_background
+)
+from salttesting.impact import (
+    CoverageContextRecorder,
+    CoverageMapStore,
+    changed_lines,
+    coverage_contexts_map,
+    git_commit,
+    git_toplevel,
+    test_module_file,
+    test_modules_map
+)
+from salttesting.ports import PortAllocator, short_socket_dir
+from salttesting.profiling import (
+    PROFILE_DAEMONS_DIR_ENV,
+    ResourceProfiler,
+    TestsProfiler,
+    aggregate_profiles,
+    collect_test_resources,
+    format_resources,
+    heaviest_tests,
+    prepare_profiles_dir,
+    run_profiled,
+    write_resources_report
+)
+from salttesting.reports import JSONLinesReporter, write_json_report
+from salttesting.scheduling import (
+    FailFastListener,
+    JSONFileStore,
+    LastFailedStore,
+    TestDurationsStore,
+    sort_by_duration,
+    select_shard,
+    shard_name
+)
+from salttesting.unit import (
+    TestLoader,
+    TestSuite,
+    TestResult,
+    TextTestRunner,
+    add_result_listener,
+    remove_result_listener
+)
 from salttesting.xmlunit import HAS_XMLRUNNER, XMLTestRunner
 try:
     from salttesting.ext import console
@@ -339,6 +403,8 @@ except Exception:  # pylint: disable=broad-except
 
 # Import 3rd-party libs
 import yaml
+import psutil
+from six import StringIO
 
 try:
     import coverage  # pylint: disable=import-error
@@ -517,6 +583,307 @@ def recursive_copytree(source, destination, overwrite=False):
                 shutil.copy2(src_path, dst_path)
 
 
+def rmtree_except(path, keep=()):
+    '''
+    Remove the ``path`` directory tree, except for the ``keep`` paths which are among its sub-directories
+    '''
+    keep = [item for item in keep if item.startswith(path + os.sep)]
+    if not keep:
+        shutil.rmtree(path)
+        return
+    for entry in os.listdir(path):
+        entry_path = os.path.join(path, entry)
+        if entry_path in keep:
+            continue
+        if [item for item in keep if item.startswith(entry_path + os.sep)]:
+            rmtree_except(entry_path, keep)
+        elif os.path.isdir(entry_path) and not os.path.islink(entry_path):
+            shutil.rmtree(entry_path)
+        else:
+            os.unlink(entry_path)
+
+
+# The '<timestamp>-<pid>' prefix of the directory trees discarded by each process, see discard_tree()
+DISCARDED_RUNS_PREFIXES = {}
+
+
+def discard_tree(path, keep=()):
+    '''
+    Atomically move the ``path`` directory tree out of the way, to :data:`OLD_RUNS_DIR`, from where it's later removed
+    by :func:`remove_old_runs`. The ``keep`` paths which are among the sub-directories of ``path`` are moved back in
+    place.
+
+    All the trees discarded by a process share the same ``<timestamp>-<pid>`` prefix, they belong to the same run.
+    Each of them is moved to its own directory, the same path can be discarded several times during a run.
+    '''
+    if not os.path.isdir(OLD_RUNS_DIR):
+        os.makedirs(OLD_RUNS_DIR)
+    prefix = DISCARDED_RUNS_PREFIXES.setdefault(
+        os.getpid(), '{0}-{1}'.format(time.strftime('%Y%m%d%H%M%S'), os.getpid())
+    )
+    discarded_dir = tempfile.mkdtemp(prefix='{0}-'.format(prefix), dir=OLD_RUNS_DIR)
+    discarded = os.path.join(discarded_dir, os.path.basename(path))
+    try:
+        os.rename(path, discarded)
+    except OSError as exc:
+        try:
+            os.rmdir(discarded_dir)
+        except OSError as rmdir_exc:
+            log.debug('Unable to remove {0}: {1}'.format(discarded_dir, rmdir_exc))
+        if exc.errno != errno.EXDEV:
+            raise
+        # Not on the same filesystem, remove it right away
+        log.debug('Unable to move {0} to {1}: {2}'.format(path, OLD_RUNS_DIR, exc))
+        rmtree_except(path, keep)
+        return
+    for item in keep:
+        if not item.startswith(path + os.sep):
+            continue
+        discarded_keep = os.path.join(discarded, os.path.relpath(item, path))
+        if os.path.isdir(discarded_keep):
+            if not os.path.isdir(os.path.dirname(item)):
+                os.makedirs(os.path.dirname(item))
+            os.rename(discarded_keep, item)
+
+
+def remove_old_runs(keep_last=0):
+    '''
+    Remove, on a detached background process, the directory trees discarded by :func:`discard_tree`, except for the
+    ones of the ``keep_last`` most recent runs
+    '''
+    if not os.path.isdir(OLD_RUNS_DIR):
+        return
+    runs = {}
+    for entry in os.listdir(OLD_RUNS_DIR):
+        runs.setdefault('-'.join(entry.split('-', 2)[:2]), []).append(entry)
+    old_runs = []
+    for prefix in sorted(runs, reverse=True)[keep_last:]:
+        old_runs.extend(runs[prefix])
+    if not old_runs:
+        return
+    log.info('Removing {0} old run directories from {1} in the background'.format(len(old_runs), OLD_RUNS_DIR))
+    pid = os.fork()
+    if pid == 0:
+        # Double fork so that the removal is not waited for, nor terminated along with the tests suite children
+        try:
+            os.setsid()
+            if os.fork() == 0:
+                for entry in old_runs:
+                    shutil.rmtree(os.path.join(OLD_RUNS_DIR, entry), ignore_errors=True)
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+    os.waitpid(pid, 0)
+
+
+# The FICLONE ioctl, which shares the data blocks of two files, copy-on-write, on the filesystems supporting it
+FICLONE = 0x40049409
+TRANSPLANT_MODES = ('auto', 'copy', 'reflink', 'hardlink', 'symlink')
+
+
+def reflink(source, destination):
+    '''
+    Create ``destination`` as a copy-on-write clone of ``source``. Raises ``OSError``/``IOError`` when the platform or
+    the filesystem do not support it.
+    '''
+    if not HAS_FCNTL or not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, 'Reflinks are not supported on this platform')
+    with open(source, 'rb') as rfh:
+        with open(destination, 'wb') as wfh:
+            try:
+                fcntl.ioctl(wfh.fileno(), FICLONE, rfh.fileno())
+            except (IOError, OSError):
+                wfh.close()
+                os.unlink(destination)
+                raise
+    shutil.copystat(source, destination)
+
+
+def transplant_tree(source, destination, mode='auto'):
+    '''
+    Synchronize the ``source`` directory tree into ``destination``. Files which already exist on the destination with
+    the same size and modification time are skipped, getting their permissions back if they were changed, and the
+    files which are not on ``source`` anymore, or were created by the tests, are removed. The remaining files are
+    transplanted according to ``mode``:
+
+    ``copy``
+        Copy the files
+    ``reflink``, ``auto``
+        Clone the files copy-on-write, copying them when the filesystem does not support it
+    ``hardlink``
+        Hard link the files, copying them when on a different filesystem
+    ``symlink``
+        Symlink the files
+
+    Modifying a hard linked or symlinked file also modifies its source. Returns a dictionary with the number of files
+    ``skipped``, ``copied``, ``reflinked``, ``linked``, ``removed``, the ``copied_bytes`` and the ``mode`` actually
+    used, the ``+`` separated ways the files were transplanted.
+    '''
+    stats = {'skipped': 0, 'copied': 0, 'reflinked': 0, 'linked': 0, 'removed': 0, 'copied_bytes': 0}
+    use_reflinks = mode in ('auto', 'reflink')
+    use_hardlinks = True
+    used = []
+    for root, dirs, files in os.walk(source):
+        dst_root = os.path.join(destination, os.path.relpath(root, source))
+        if not os.path.isdir(dst_root):
+            os.makedirs(dst_root)
+        shutil.copymode(root, dst_root)
+        for item in set(os.listdir(dst_root)).difference(files + dirs):
+            dst_path = os.path.join(dst_root, item)
+            if os.path.isdir(dst_path) and not os.path.islink(dst_path):
+                shutil.rmtree(dst_path)
+            else:
+                os.unlink(dst_path)
+            stats['removed'] += 1
+        # Preserve symlinks to directories, like shutil.copytree(symlinks=True)
+        entries = files + [item for item in dirs if os.path.islink(os.path.join(root, item))]
+        for item in entries:
+            src_path = os.path.join(root, item)
+            dst_path = os.path.join(dst_root, item)
+            if os.path.islink(src_path):
+                link_target = os.readlink(src_path)
+                if os.path.islink(dst_path) and os.readlink(dst_path) == link_target:
+                    stats['skipped'] += 1
+                    continue
+                if os.path.lexists(dst_path):
+                    os.unlink(dst_path)
+                os.symlink(link_target, dst_path)
+                stats['linked'] += 1
+                continue
+
+            src_stat = os.stat(src_path)
+            if os.path.lexists(dst_path):
+                dst_stat = os.lstat(dst_path)
+                if mode == 'symlink' and os.path.islink(dst_path) and os.readlink(dst_path) == src_path:
+                    stats['skipped'] += 1
+                    continue
+                if not os.path.islink(dst_path) and dst_stat.st_size == src_stat.st_size and \
+                        int(dst_stat.st_mtime) == int(src_stat.st_mtime):
+                    if mode != 'symlink' and stat.S_IMODE(dst_stat.st_mode) != stat.S_IMODE(src_stat.st_mode):
+                        os.chmod(dst_path, stat.S_IMODE(src_stat.st_mode))
+                    stats['skipped'] += 1
+                    continue
+                os.unlink(dst_path)
+
+            if mode == 'symlink':
+                os.symlink(src_path, dst_path)
+                stats['linked'] += 1
+                used.append('symlink')
+                continue
+            if mode == 'hardlink' and use_hardlinks:
+                try:
+                    os.link(src_path, dst_path)
+                    stats['linked'] += 1
+                    used.append('hardlink')
+                    continue
+                except OSError as exc:
+                    # Don't keep trying across filesystems
+                    log.info('Failed to hard link {0}, not hard linking the files: {1}'.format(src_path, exc))
+                    use_hardlinks = False
+            if use_reflinks:
+                try:
+                    reflink(src_path, dst_path)
+                    stats['reflinked'] += 1
+                    used.append('reflink')
+                    continue
+                except (IOError, OSError) as exc:
+                    # Don't keep trying on a filesystem which does not support reflinks
+                    log.info('Failed to reflink {0}, copying the files instead: {1}'.format(src_path, exc))
+                    use_reflinks = False
+            shutil.copy2(src_path, dst_path)
+            stats['copied'] += 1
+            stats['copied_bytes'] += src_stat.st_size
+            used.append('copy')
+    stats['mode'] = '+'.join([name for name in ('hardlink', 'symlink', 'reflink', 'copy') if name in used]) or 'none'
+    return stats
+
+
+class TestsDiscoveryIndex(object):
+    '''
+    On-disk index of the tests found on each test module.
+
+    Each entry is keyed by the test module path and is only considered valid while the module's modification time
+    and size, as well as the metadata which applied to it, remain unchanged.
+    '''
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._changed = False
+        self.hits = self.misses = 0
+        if not os.path.isfile(path):
+            return
+        try:
+            with open(path, 'r') as rfh:
+                data = json.load(rfh)
+            if data.get('version') == self.VERSION:
+                self._entries = data['files']
+        except (IOError, OSError, ValueError, KeyError) as exc:
+            log.warning('Failed to load the tests discovery index from {0}: {1}'.format(path, exc))
+
+    @staticmethod
+    def _stat(filename):
+        stat = os.stat(filename)
+        return stat.st_mtime, stat.st_size
+
+    def get(self, filename, metadata):
+        '''
+        Return the indexed entry for ``filename`` or ``None`` if it's missing or no longer valid
+        '''
+        entry = self._entries.get(filename)
+        if entry is not None:
+            mtime, size = self._stat(filename)
+            if entry['mtime'] != mtime or entry['size'] != size or \
+                    entry['metadata'] != self.metadata_to_dict(metadata):
+                log.debug('Discovery index entry for {0} is outdated'.format(filename))
+                self.invalidate(filename)
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def set(self, filename, metadata, test_ids):
+        mtime, size = self._stat(filename)
+        self._entries[filename] = {
+            'mtime': mtime,
+            'size': size,
+            'metadata': self.metadata_to_dict(metadata),
+            'needs_daemons': metadata.needs_daemons,
+            'tests': sorted(test_ids)
+        }
+        self._changed = True
+
+    def invalidate(self, filename):
+        if self._entries.pop(filename, None) is not None:
+            self._changed = True
+
+    @staticmethod
+    def metadata_to_dict(metadata):
+        return {
+            'test_module_pattern': getattr(metadata, 'test_module_pattern', None),
+            'needs_daemons': getattr(metadata, 'needs_daemons', True),
+            'top_level_dir': getattr(metadata, 'top_level_dir', None),
+        }
+
+    def save(self):
+        for filename in list(self._entries):
+            if not os.path.isfile(filename):
+                self.invalidate(filename)
+        if not self._changed:
+            return
+        if not os.path.isdir(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+        # Write to a temporary file and then rename it so that concurrent runs never read a partially written index
+        tmp_path = '{0}.{1}'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as wfh:
+            json.dump({'version': self.VERSION, 'files': self._entries}, wfh)
+        os.rename(tmp_path, self.path)
+        self._changed = False
+
+
 class RuntimeVars(object):
 
     __self_attributes__ = ('_vars', '_locked', 'lock')
@@ -556,37 +923,201 @@ class RuntimeVars(object):
 
 # ----- Global Variables -------------------------------------------------------------------------------------------->
 CONF_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), '_saltconf')
-SYS_TMP_DIR = os.path.realpath(
-    # Avoid ${TMPDIR} and gettempdir() on MacOS as they yield a base path too long for unix sockets:
-    # 'error: AF_UNIX path too long'
-    # Gentoo Portage prefers ebuild tests are rooted in ${TMPDIR}
-    os.environ.get('TMPDIR', tempfile.gettempdir()) if platform.system() != 'Darwin' else '/tmp'
-)
-__TMP = os.path.join(SYS_TMP_DIR, 'salt-tests-tmpdir')
-XML_OUTPUT_DIR = os.environ.get('SALT_XML_TEST_REPORTS_DIR', os.path.join(__TMP, 'xml-test-reports'))
+# The unix sockets live on short directories, see RUNTIME_VARS.TMP_SOCK_DIR, so that ${TMPDIR} and gettempdir(), which
+# yield long base paths on MacOS, can be used. Gentoo Portage prefers ebuild tests are rooted in ${TMPDIR}
+SYS_TMP_DIR = os.path.realpath(os.environ.get('TMPDIR', tempfile.gettempdir()))
+# Ports allocated by the tests suites running on this system, see PortAllocator
+PORTS_REGISTRY = os.path.join(SYS_TMP_DIR, 'salt-runtests-ports.json')
+# Several tests suites, each with its own Salt daemons, can run side by side as long as they run in their own
+# namespace, see '--namespace'. The namespace is passed down to the child processes through this environment variable
+NAMESPACE_ENV_VAR = 'SALT_RUNTESTS_NAMESPACE'
+NAMESPACE_RE = re.compile(r'^[\w-]+$')
+
+
+def namespaced_tmp_dir(namespace=None):
+    '''
+    Return the root of the tests temporary directories of ``namespace``
+    '''
+    if not namespace:
+        return os.path.join(SYS_TMP_DIR, 'salt-tests-tmpdir')
+    return os.path.join(SYS_TMP_DIR, 'salt-tests-tmpdir-{0}'.format(namespace))
+
+
+def namespaced_old_runs_dir(namespace=None):
+    '''
+    Return the directory the temporary directories of the previous runs of ``namespace`` are moved to
+    '''
+    if not namespace:
+        return os.path.join(SYS_TMP_DIR, 'salt-tests-old-runs')
+    return os.path.join(SYS_TMP_DIR, 'salt-tests-old-runs-{0}'.format(namespace))
+
+
+__TMP = namespaced_tmp_dir(os.environ.get(NAMESPACE_ENV_VAR))
+# Defaults to RUNTIME_VARS.TMP/xml-test-reports, once the namespace is known
+XML_OUTPUT_DIR = os.environ.get('SALT_XML_TEST_REPORTS_DIR')
+# Where the temporary directories of the previous runs are moved to, before being removed in the background. Each
+# namespace has its own, the runs of one namespace never remove the directories another one is discarding.
+OLD_RUNS_DIR = namespaced_old_runs_dir(os.environ.get(NAMESPACE_ENV_VAR))
+# Data which should persist between test runs can't be stored under the tests temporary directory since it's cleaned
+CACHE_DIR = os.environ.get('SALT_RUNTESTS_CACHE_DIR', os.path.join(SYS_TMP_DIR, 'salt-runtests-cache'))
+# Same rules as unittest's loader to decide if a file is a python module
+VALID_TEST_MODULE_NAME_RE = re.compile(r'[_a-z]\w*\.py$', re.IGNORECASE)
 # <---- Global Variables ---------------------------------------------------------------------------------------------
 
 
 # ----- Tests Runtime Variables ------------------------------------------------------------------------------------->
 
-RUNTIME_VARS = RuntimeVars(
-    TMP=__TMP,
-    TMP_CONF_DIR=os.path.join(__TMP, 'conf'),
-    TMP_CONF_MASTER_INCLUDES=os.path.join(__TMP, 'conf', 'master.d'),
-    TMP_CONF_MINION_INCLUDES=os.path.join(__TMP, 'conf', 'minion.d'),
-    TMP_CONF_CLOUD_INCLUDES=os.path.join(__TMP, 'conf', 'cloud.conf.d'),
-    TMP_CONF_CLOUD_PROFILE_INCLUDES=os.path.join(__TMP, 'conf', 'cloud.profiles.d'),
-    TMP_CONF_CLOUD_PROVIDER_INCLUDES=os.path.join(__TMP, 'conf', 'cloud.providers.d'),
-    TMP_SCRIPT_DIR=os.path.join(__TMP, 'scripts'),
-    TMP_SALT_INTEGRATION_FILES=os.path.join(__TMP, 'integration-files'),
-    TMP_BASEENV_STATE_TREE=os.path.join(__TMP, 'integration-files', 'file', 'base'),
-    TMP_PRODENV_STATE_TREE=os.path.join(__TMP, 'integration-files', 'file', 'prod'),
-    TMP_BASEENV_PILLAR_TREE=os.path.join(__TMP, 'integration-files', 'pillar', 'base'),
-    TMP_PRODENV_PILLAR_TREE=os.path.join(__TMP, 'integration-files', 'pillar', 'prod')
-)
+def runtime_vars_paths(tmp):
+    '''
+    Return the runtime paths rooted at ``tmp``
+    '''
+    return dict(
+        TMP=tmp,
+        TMP_CONF_DIR=os.path.join(tmp, 'conf'),
+        # The unix sockets paths can't be longer than about 100 bytes
+        TMP_SOCK_DIR=short_socket_dir(tmp),
+        TMP_CONF_MASTER_INCLUDES=os.path.join(tmp, 'conf', 'master.d'),
+        TMP_CONF_MINION_INCLUDES=os.path.join(tmp, 'conf', 'minion.d'),
+        TMP_CONF_CLOUD_INCLUDES=os.path.join(tmp, 'conf', 'cloud.conf.d'),
+        TMP_CONF_CLOUD_PROFILE_INCLUDES=os.path.join(tmp, 'conf', 'cloud.profiles.d'),
+        TMP_CONF_CLOUD_PROVIDER_INCLUDES=os.path.join(tmp, 'conf', 'cloud.providers.d'),
+        TMP_SCRIPT_DIR=os.path.join(tmp, 'scripts'),
+        TMP_SALT_INTEGRATION_FILES=os.path.join(tmp, 'integration-files'),
+        TMP_BASEENV_STATE_TREE=os.path.join(tmp, 'integration-files', 'file', 'base'),
+        TMP_PRODENV_STATE_TREE=os.path.join(tmp, 'integration-files', 'file', 'prod'),
+        TMP_BASEENV_PILLAR_TREE=os.path.join(tmp, 'integration-files', 'pillar', 'base'),
+        TMP_PRODENV_PILLAR_TREE=os.path.join(tmp, 'integration-files', 'pillar', 'prod')
+    )
+
+
+RUNTIME_VARS = RuntimeVars(**runtime_vars_paths(__TMP))
+
+
+def set_runtime_namespace(namespace):
+    '''
+    Root the tests temporary directories at the ``namespace`` directory. Needs to be called before
+    :py:attr:`RUNTIME_VARS` is locked.
+    '''
+    global OLD_RUNS_DIR
+    os.environ[NAMESPACE_ENV_VAR] = namespace
+    OLD_RUNS_DIR = namespaced_old_runs_dir(namespace)
+    for name, path in runtime_vars_paths(namespaced_tmp_dir(namespace)).items():
+        setattr(RUNTIME_VARS, name, path)
 # <---- Tests Runtime Variables --------------------------------------------------------------------------------------
 
 
+# ----- Salt Configurations Cache ----------------------------------------------------------------------------------->
+# Name of the file, on RUNTIME_VARS.TMP_CONF_DIR, which describes the transplanted configuration files
+CONFIGS_MANIFEST_NAME = '.transplant-manifest.json'
+SALT_CONFIGS_CACHE = {}
+
+
+def get_salt_config(path, kind='master', minion_config_path=None):
+    '''
+    Return the Salt configuration parsed from ``path``. ``kind`` is either ``master``, ``minion`` or ``syndic``, in
+    which case ``minion_config_path`` is also required.
+
+    The parsed configurations are cached in memory until the configuration file, or its includes directory,
+    changes. Each call returns a copy which can be freely modified.
+    '''
+    # Late import
+    import salt.config
+
+    includes_dir = os.path.join(os.path.dirname(path), '{0}.d'.format(kind == 'master' and 'master' or 'minion'))
+    includes = []
+    if os.path.isdir(includes_dir):
+        for fname in sorted(os.listdir(includes_dir)):
+            fstat = os.stat(os.path.join(includes_dir, fname))
+            includes.append((fname, fstat.st_mtime, fstat.st_size))
+    fstat = os.stat(path)
+    key = (kind, path, minion_config_path, fstat.st_mtime, fstat.st_size, tuple(includes))
+    if key not in SALT_CONFIGS_CACHE:
+        if kind == 'syndic':
+            SALT_CONFIGS_CACHE[key] = salt.config.syndic_config(path, minion_config_path)
+        else:
+            SALT_CONFIGS_CACHE[key] = getattr(salt.config, '{0}_config'.format(kind))(path)
+    return deepcopy(SALT_CONFIGS_CACHE[key])
+# <---- Salt Configurations Cache ------------------------------------------------------------------------------------
+
+
+# ----- Salt Clients Pool ------------------------------------------------------------------------------------------->
+# The Salt LocalClient instances, keyed by process id and master configuration file path
+SALT_CLIENTS_POOL = {}
+SALT_CLIENTS_STATS = {'created': 0, 'reused': 0, 'reconnected': 0}
+
+
+def _local_client_health_key(opts):
+    '''
+    Return the state of what a Salt client needs to stay usable, its configuration file and the master events bus
+    socket, which is created again when the master restarts
+    '''
+    key = []
+    for path in (opts.get('conf_file'), os.path.join(opts.get('sock_dir', ''), 'master_event_pub.ipc')):
+        try:
+            fstat = os.stat(path)
+        except (OSError, TypeError):
+            key.append(None)
+            continue
+        key.append((fstat.st_ino, fstat.st_mtime, fstat.st_size))
+    return tuple(key)
+
+
+def destroy_local_client(client):
+    '''
+    Close the connections of a Salt client
+    '''
+    try:
+        if hasattr(client, 'destroy'):
+            client.destroy()
+        elif hasattr(getattr(client, 'event', None), 'destroy'):
+            client.event.destroy()
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug('Failed to destroy the Salt client: {0}'.format(exc))
+
+
+def get_local_client(config_path):
+    '''
+    Return the Salt LocalClient for the master configuration file at ``config_path``. The client is shared by all the
+    callers on the current process, so that the configuration loading, the events bus connection and the
+    authentication are not paid on each call.
+
+    The client is created again when its configuration file changes or when the master it talks to restarts.
+    '''
+    # Late import
+    import salt.client
+
+    pid = os.getpid()
+    for key in list(SALT_CLIENTS_POOL):
+        if key[0] != pid:
+            # Inherited from the parent process, its connections are not ours to close
+            SALT_CLIENTS_POOL.pop(key)
+
+    key = (pid, config_path)
+    if key in SALT_CLIENTS_POOL:
+        client, health_key = SALT_CLIENTS_POOL[key]
+        if _local_client_health_key(client.opts) == health_key:
+            SALT_CLIENTS_STATS['reused'] += 1
+            return client
+        log.info('The Salt client for {0} is stale, creating a new one'.format(config_path))
+        destroy_local_client(client)
+        SALT_CLIENTS_STATS['reconnected'] += 1
+    client = salt.client.get_local_client(config_path)
+    SALT_CLIENTS_STATS['created'] += 1
+    SALT_CLIENTS_POOL[key] = (client, _local_client_health_key(client.opts))
+    return client
+
+
+def close_local_clients():
+    '''
+    Close the Salt clients created by the current process
+    '''
+    for key in list(SALT_CLIENTS_POOL):
+        client, _ = SALT_CLIENTS_POOL.pop(key)
+        if key[0] == os.getpid():
+            destroy_local_client(client)
+# <---- Salt Clients Pool --------------------------------------------------------------------------------------------
+
+
 # ----- Custom Argument Parser Actions ------------------------------------------------------------------------------>
 class AppendToSearchPathAction(argparse._AppendAction):
     def __call__(self, parser, namespace, values, option_string=None):
@@ -724,6 +1255,105 @@ class CoverageAction(argparse._StoreTrueAction):
 # <---- Custom Argument Parser Actions -------------------------------------------------------------------------------
 
 
+# ----- Parallel Tests Execution ------------------------------------------------------------------------------------>
+# The tests groups and runner settings are stored at module level right before the workers pool is created so that
+# the forked workers inherit them and only the group index needs to be passed around
+PARALLEL_TESTS_CONTEXT = {}
+
+
+class ParallelTestPlaceholder(object):
+    '''
+    Stands in for a test which result was reported by a worker process but which is not known to the parent
+    process, for example, a ``setUpClass`` failure.
+    '''
+
+    def __init__(self, test_id):
+        self.test_id = test_id
+
+    def id(self):
+        return self.test_id
+
+    def __str__(self):
+        return self.test_id
+
+    def shortDescription(self):
+        return None
+
+
+def run_parallel_tests_group(group_idx):
+    '''
+    Run a group of tests on a worker process and return a serializable summary of the results
+    '''
+    tests = PARALLEL_TESTS_CONTEXT['groups'][group_idx]
+    stream = StringIO()
+    failfast = PARALLEL_TESTS_CONTEXT.get('failfast')
+    if failfast is not None and failfast.reached():
+        # The tests run was aborted, do not even start this group
+        tests = []
+    if PARALLEL_TESTS_CONTEXT['xml_out_path'] is not None:
+        runner = XMLTestRunner(
+            stream=stream,
+            output=PARALLEL_TESTS_CONTEXT['xml_out_path'],
+            verbosity=PARALLEL_TESTS_CONTEXT['verbosity']
+        )
+    else:
+        runner = TextTestRunner(
+            stream=stream,
+            verbosity=PARALLEL_TESTS_CONTEXT['verbosity']
+        )
+    try:
+        results = runner.run(TestSuite(tests))
+    except Exception as exc:  # pylint: disable=broad-except
+        log.error('Failed to run tests group {0}: {1}'.format(group_idx, exc), exc_info=True)
+        return {
+            'group': group_idx,
+            'worker': os.getpid(),
+            'output': stream.getvalue(),
+            'testsRun': 0,
+            'failures': [],
+            'errors': [('tests-group-{0}'.format(group_idx), repr(exc))],
+            'skipped': [],
+            'expectedFailures': [],
+            'unexpectedSuccesses': [],
+            'durations': {},
+            'resources': {},
+        }
+    return {
+        'group': group_idx,
+        'worker': os.getpid(),
+        'output': stream.getvalue(),
+        'testsRun': results.testsRun,
+        'failures': [(test.id(), reason) for (test, reason) in results.failures],
+        'errors': [(test.id(), reason) for (test, reason) in results.errors],
+        'skipped': [(test.id(), reason) for (test, reason) in results.skipped],
+        'expectedFailures': [(test.id(), reason) for (test, reason) in results.expectedFailures],
+        'unexpectedSuccesses': [test.id() for test in results.unexpectedSuccesses],
+        'durations': getattr(results, 'test_durations', {}),
+        'resources': getattr(results, 'test_resources', {}),
+    }
+
+
+def merge_parallel_tests_results(results, summary, known_tests):
+    '''
+    Merge a worker summary, as returned by :py:func:`run_parallel_tests_group`, into ``results``
+    '''
+    def get_test(test_id):
+        if test_id not in known_tests:
+            return ParallelTestPlaceholder(test_id)
+        return known_tests[test_id]
+
+    results.testsRun += summary['testsRun']
+    for attr in ('failures', 'errors', 'skipped', 'expectedFailures'):
+        getattr(results, attr).extend(
+            [(get_test(test_id), reason) for (test_id, reason) in summary[attr]]
+        )
+    results.unexpectedSuccesses.extend([get_test(test_id) for test_id in summary['unexpectedSuccesses']])
+    results.test_durations.update(summary['durations'])
+    results.test_resources.update(summary['resources'])
+    return results
+# <---- Parallel Tests Execution -------------------------------------------------------------------------------------
+
+
 class SaltRuntests(argparse.ArgumentParser):
 
     VERSION = version.__version__
@@ -762,10 +1392,35 @@ class SaltRuntests(argparse.ArgumentParser):
         self.__testsuite_status__ = []
         self.__testsuite_results__ = []
         self.__testsuite_searched_paths__ = set()
+        # Tests found through the discovery index which are only imported right before running them
+        self.__testsuite_indexed_paths__ = set()
+        self.__testsuite_lazy_tests__ = {}
+        self.__discovery_index__ = None
+        # Resolved __salttest__.py metadata keyed by directory
+        self.__testsuite_metadata__ = {}
+        self.__testsuite_metadata_cache_hits__ = 0
+        # Recorded tests durations, loaded once the options are parsed
+        self.__testsuite_durations__ = None
+        # Tests which failed on the previous runs and the --failfast-after listener
+        self.__last_failed__ = None
+        self.__failfast__ = None
+        # State of the Salt daemons left running by --keep-daemons
+        self.__daemons_state__ = None
+        self.__reuse_daemons__ = False
+        # Allocates the ports of the transplanted configuration files
+        self.__ports__ = None
+        # Streams the tests events when --json-lines-out is passed
+        self.__json_lines_reporter__ = None
+        # The time the tests profiling started at, see --profile-tests
+        self.__profiles_since__ = None
         # <---- Tests Suite Attributes -------------------------------------------------------------------------------
 
         # ----- Coverage Support Attributes ------------------------------------------------------------------------->
         self.__coverage_instance__ = None
+        # Records the per test coverage contexts when --coverage-map is passed
+        self.__coverage_recorder__ = None
+        # Combines the processes coverage data files while the tests run
+        self.__coverage_combiner__ = None
         # <---- Coverage Support Attributes --------------------------------------------------------------------------
 
         # ----- Let's not use argparse's help action ---------------------------------------------------------------->
@@ -818,6 +1473,42 @@ class SaltRuntests(argparse.ArgumentParser):
             action='store_true',
             help='Don\'t start the Salt testing daemons. Tests requiring them WILL fail'
         )
+        self.operational_options_group.add_argument(
+            '--transplant-mode',
+            default='auto',
+            choices=TRANSPLANT_MODES,
+            help='How to transplant Salt\'s integration files and the extension modules to the tests temporary '
+                 'directory. \'auto\' clones the files, copy-on-write, where the filesystem supports it and '
+                 'copies them otherwise. \'hardlink\' and \'symlink\' share the files with their source, tests '
+                 'modifying them modify the source too. Files which did not change, by size and modification '
+                 'time, are never copied again. Default: %(default)s'
+        )
+        self.operational_options_group.add_argument(
+            '--namespace',
+            default=os.environ.get(NAMESPACE_ENV_VAR) or None,
+            metavar='NAME',
+            help='Run the tests suite in its own namespace: its own temporary directory, dynamically allocated '
+                 'ports for the Salt daemons and its own kept daemons state. Several tests suites, each in its own '
+                 'namespace, can then run side by side on the same host, for example, one per shard or CI job. '
+                 '\'auto\' picks a namespace unique to this execution. Default: the {0} environment '
+                 'variable'.format(NAMESPACE_ENV_VAR)
+        )
+        self.operational_options_group.add_argument(
+            '--keep-daemons',
+            action='store_true',
+            default=False,
+            help='Leave the Salt testing daemons running in the background once the tests suite finishes so that '
+                 'they can be reused, see \'--reuse-daemons\'.'
+        )
+        self.operational_options_group.add_argument(
+            '--reuse-daemons',
+            action='store_true',
+            default=False,
+            help='Attach to the Salt testing daemons left running by a previous execution with '
+                 '\'--keep-daemons\', as long as the configuration did not change. Only the changed extension '
+                 'modules are synced. Implies \'--keep-daemons\'. Any daemons left running are stopped when '
+                 'not passing this option.'
+        )
         self.operational_options_group.add_argument(
             '--test-module-pattern',
             default='test_*.py',
@@ -825,6 +1516,18 @@ class SaltRuntests(argparse.ArgumentParser):
             help='Any found module which matches this pattern is considered by unittest as a test case module '
                  'and there for searched for tests. Default %(default)r'
         )
+        self.operational_options_group.add_argument(
+            '--cache-dir',
+            default=CACHE_DIR,
+            help='Directory where data which persists between test runs is stored. Default: %(default)r'
+        )
+        self.operational_options_group.add_argument(
+            '--no-discovery-cache',
+            action='store_true',
+            default=False,
+            help='Do not use the tests discovery index. Every test module will be imported while discovering tests. '
+                 'Use this if the tests found on a module depend on other modules which have changed.'
+        )
         # <---- Operational Options ----------------------------------------------------------------------------------
 
         # ----- Output Options -------------------------------------------------------------------------------------->
@@ -873,17 +1576,71 @@ class SaltRuntests(argparse.ArgumentParser):
             self.output_options_group.add_argument(
                 '--xml-out-path',
                 default=XML_OUTPUT_DIR,
-                help='XML test runner output directory. Default: %(default)r'
+                help=('XML test runner output directory. Default: ${SALT_XML_TEST_REPORTS_DIR} or '
+                      '\'<tmp-dir>/xml-test-reports\'')
             )
         self.output_options_group.add_argument(
             '--no-report',
             action='store_true',
             help='Do NOT show the overall tests result'
         )
+        self.output_options_group.add_argument(
+            '--profile-resources',
+            action='store_true',
+            default=False,
+            help='Record the CPU time, peak memory, file descriptors and child processes of each test, for the '
+                 'tests runner and the Salt daemons. The heaviest tests are shown on the overall tests report.'
+        )
+        self.output_options_group.add_argument(
+            '--profile-resources-out',
+            default=os.path.join(SYS_TMP_DIR, 'salt-runtests-resources.json'),
+            help='Path to the JSON report of the resources used by each test. Default: %(default)r'
+        )
+        self.output_options_group.add_argument(
+            '--profile-tests',
+            metavar='PATTERN',
+            default=None,
+            help='Run the tests whose id matches this regular expression under cProfile and dump a \'.pstats\' file '
+                 'per test. The Salt daemons started by the tests suite are profiled too.'
+        )
+        self.output_options_group.add_argument(
+            '--profile-tests-dir',
+            default=os.path.join(SYS_TMP_DIR, 'salt-runtests-profiles'),
+            help='Directory where the tests and daemons profiles are dumped. Default: %(default)r'
+        )
+        self.output_options_group.add_argument(
+            '--profile-tests-top',
+            type=int,
+            default=20,
+            help='Number of functions shown on the aggregated profiles report. Default: %(default)r'
+        )
+        self.output_options_group.add_argument(
+            '--json-out-path',
+            default=None,
+            help=('Write a JSON report of the tests results to this path. When running a shard, the shard '
+                  'name is added to the file name, for example, \'report.shard-0-of-4.json\'.')
+        )
+        self.output_options_group.add_argument(
+            '--json-lines-out',
+            metavar='DESTINATION',
+            default=None,
+            help=('Stream the tests events, as they happen, one JSON document per line, to this file, which is '
+                  'appended to, or to the UNIX socket at \'unix:<path>\'.')
+        )
         # <---- Output Options ---------------------------------------------------------------------------------------
 
         # ----- Files-system cleanup options ------------------------------------------------------------------------>
         self.fs_cleanup_options_group = self.add_argument_group('File-system cleanup Options')
+        self.fs_cleanup_options_group.add_argument(
+            '--keep-old-runs',
+            default=0,
+            type=int,
+            metavar='N',
+            help=('The temporary directories of the previous executions are moved to {0!r}, or to '
+                  '{1!r} with --namespace, and removed in the background. Keep the last N of them there for '
+                  'post-mortem debugging. Each namespace keeps its own. Default: %(default)s'.format(
+                      namespaced_old_runs_dir(), namespaced_old_runs_dir('<NAME>')))
+        )
         self.fs_cleanup_options_group.add_argument(
             '--no-clean',
             action='store_true',
@@ -917,6 +1674,49 @@ class SaltRuntests(argparse.ArgumentParser):
                   'which can cost money, for example, the cloud provider tests. '
                   'Default: %(default)s')
         )
+        self.tests_execution_tweaks_group.add_argument(
+            '-j',
+            '--workers',
+            default=1,
+            type=int,
+            metavar='N',
+            help=('Number of processes used to run the tests which do not need the Salt daemons. '
+                  'Tests are distributed among the workers grouped by test case class. Pass 0 to '
+                  'use as many workers as CPUs. Default: %(default)s')
+        )
+        self.tests_execution_tweaks_group.add_argument(
+            '--tests-order',
+            default='name',
+            choices=('name', 'duration'),
+            help=('Order in which the tests are executed, by name or by their last recorded duration, '
+                  'longest first. The tests groups handed to the workers are always ordered by duration. '
+                  'Default: %(default)s')
+        )
+        self.tests_execution_tweaks_group.add_argument(
+            '--durations-file',
+            default=None,
+            help=('Path to the file where the duration of each test is recorded. '
+                  'Default: \'<cache-dir>/test-durations.json\'')
+        )
+        self.tests_execution_tweaks_group.add_argument(
+            '--failed-first',
+            action='store_true',
+            default=False,
+            help='Run the tests which failed, or errored, on the previous runs before all the other tests.'
+        )
+        self.tests_execution_tweaks_group.add_argument(
+            '--failfast-after',
+            metavar='N',
+            type=int,
+            default=0,
+            help='Abort the tests run once N tests failed or errored. Default: never abort'
+        )
+        self.tests_execution_tweaks_group.add_argument(
+            '--last-failed-file',
+            default=None,
+            help=('Path to the file where the tests which failed on the previous runs are recorded. '
+                  'Default: \'<cache-dir>/last-failed.json\'')
+        )
         # <---- Tests Execution Tweaks Group -------------------------------------------------------------------------
 
         # ----- Code Coverage Group --------------------------------------------------------------------------------->
@@ -933,6 +1733,21 @@ class SaltRuntests(argparse.ArgumentParser):
             default=None,
             help='Path to the source code against which coverage will do it\'s measurement. Default: ./'
         )
+        self.code_coverage_group.add_argument(
+            '--coverage-mode',
+            choices=COVERAGE_MODES,
+            default='full',
+            help=('\'full\' measures lines and branches. \'lines\' only measures lines. \'fast\' only measures '
+                  'the lines of the code under test, not the tests nor the site-packages, with the fastest tracer '
+                  'available. Default: %(default)s')
+        )
+        self.code_coverage_group.add_argument(
+            '--coverage-overhead-file',
+            default=None,
+            help=('Path to the file where the tests durations measured with each coverage mode, and without '
+                  'coverage, are recorded to log the overhead of each mode. '
+                  'Default: \'<cache-dir>/coverage-overhead.json\'')
+        )
         self.code_coverage_group.add_argument(
             '--coverage-pylib',
             action='store_true',
@@ -970,6 +1785,34 @@ class SaltRuntests(argparse.ArgumentParser):
                   'will be saved to. The directory, if existing, will be '
                   'deleted before the report is generated.')
         )
+        self.code_coverage_group.add_argument(
+            '--coverage-combine-workers',
+            type=int,
+            default=0,
+            metavar='N',
+            help=('Number of processes combining, while the tests run, the coverage data files of the processes '
+                  'which exited. 0 combines all the data files at the end of the run. Default: %(default)s')
+        )
+        self.code_coverage_group.add_argument(
+            '--coverage-reports-in-background',
+            action='store_true',
+            default=False,
+            help=('Write the XML and HTML coverage reports on a detached process, the tests suite exits without '
+                  'waiting for them.')
+        )
+        self.code_coverage_group.add_argument(
+            '--coverage-map',
+            action='store_true',
+            default=False,
+            help=('Record the source lines executed by each test on the coverage map used by '
+                  '\'--changed-since\'. Requires \'--coverage\' and coverage>=5.0. Only the code executed by the '
+                  'tests runner process is recorded.')
+        )
+        self.code_coverage_group.add_argument(
+            '--coverage-map-file',
+            default=None,
+            help='Path to the coverage map. Default: \'<cache-dir>/coverage-map.json\''
+        )
         # <---- Code Coverage Group ----------------------------------------------------------------------------------
 
         # ----- Tests Filtering Group ------------------------------------------------------------------------------->
@@ -979,6 +1822,37 @@ class SaltRuntests(argparse.ArgumentParser):
             'are cumulative options that filter which tests are to be executed, and, if none '
             'are provided, then all found tests are executed.'
         )
+        self.test_filtering_group.add_argument(
+            '--shard-count',
+            default=1,
+            type=int,
+            metavar='N',
+            help=('Split the selected tests in N shards, for example, one per CI node. The tests are assigned by a '
+                  'stable hash of their id, or balanced with \'--shard-durations-file\'. The recorded tests '
+                  'durations are not updated when running a shard. Default: %(default)s')
+        )
+        self.test_filtering_group.add_argument(
+            '--shard-index',
+            default=None,
+            type=int,
+            metavar='I',
+            help='Only run the tests of the shard I, counting from 0. Requires \'--shard-count\'.'
+        )
+        self.test_filtering_group.add_argument(
+            '--shard-durations-file',
+            default=None,
+            metavar='PATH',
+            help=('Balance the shards with the tests durations recorded on PATH, see \'--durations-file\'. All '
+                  'the nodes need to use the same file, which is only read.')
+        )
+        self.test_filtering_group.add_argument(
+            '--changed-since',
+            default=None,
+            metavar='REF',
+            help=('Only run the tests which, according to the coverage map, see \'--coverage-map\', execute the '
+                  'files or lines changed since the git REF, and the tests missing from the map. The whole tests '
+                  'suite runs when a changed file is not on the map.')
+        )
         self.test_filtering_group.add_argument(
             '-n',
             '--name',
@@ -1130,7 +2004,8 @@ class SaltRuntests(argparse.ArgumentParser):
             log.warning('Failed to import {0} from {1}: {2}'.format(filename, root, exc))
             return argparse.Namespace(
                 needs_daemons=True,
-                test_module_pattern=self.options.test_module_pattern
+                test_module_pattern=self.options.test_module_pattern,
+                top_level_dir=os.path.dirname(root)
             )
 
         # ----- Allow the discovered salt tests to tweak the parser ------------------------------------->
@@ -1180,6 +2055,24 @@ class SaltRuntests(argparse.ArgumentParser):
         return metadata
         # <---- Return defined metadata ------------------------------------------------------------------------------
 
+    def __collect_tests__(self, tests, needs_daemons):
+        count = 0
+        for test in tests:
+            if 'ModuleImportFailure' in test.id():
+                if self.options.tests_filter and not \
+                        test._testMethodName.startswith(tuple(self.options.tests_filter)):
+                    # We're filtering the tests and it does not match
+                    continue
+                self.__testsuite__[test._testMethodName] = (test, needs_daemons)
+                count += 1
+                continue
+            if self.options.tests_filter and not test.id().startswith(tuple(self.options.tests_filter)):
+                # We're filtering the tests and it does not match
+                continue
+            self.__testsuite__[test.id()] = (test, needs_daemons)
+            count += 1
+        return count
+
     def __load_tests__(self, metadata, filename=None, name=None, start_dir=None):
         loader = TestLoader()
         if filename is not None:
@@ -1195,19 +2088,7 @@ class SaltRuntests(argparse.ArgumentParser):
             )
             if discovered_tests.countTestCases():
                 log.info('Found {0} tests'.format(discovered_tests.countTestCases()))
-                for test in self.__flatten_testsuite__(discovered_tests):
-                    if 'ModuleImportFailure' in test.id():
-                        if self.options.tests_filter and not \
-                                test._testMethodName.startswith(tuple(self.options.tests_filter)):
-                            # We're filtering the tests and it does not match
-                            continue
-
-                        self.__testsuite__[test._testMethodName] = (test, metadata.needs_daemons)
-                        continue
-                    if self.options.tests_filter and not test.id().startswith(tuple(self.options.tests_filter)):
-                        # We're filtering the tests and it does not match
-                        continue
-                    self.__testsuite__[test.id()] = (test, metadata.needs_daemons)
+                self.__collect_tests__(self.__flatten_testsuite__(discovered_tests), metadata.needs_daemons)
 
             self.__testsuite_searched_paths__.add(start_dir)
             return
@@ -1217,18 +2098,11 @@ class SaltRuntests(argparse.ArgumentParser):
             discovered_tests = loader.loadTestsFromName(name)
             if discovered_tests.countTestCases():
                 log.info('Found {0} tests'.format(discovered_tests.countTestCases()))
-                for test in self.__flatten_testsuite__(discovered_tests):
-                    if 'ModuleImportFailure' in test.id():
-                        if self.options.tests_filter and not \
-                                test._testMethodName.startswith(tuple(self.options.tests_filter)):
-                            # We're filtering the tests and it does not match
-                            continue
-                        self.__testsuite__[test._testMethodName] = (test, metadata.needs_daemons)
-                        continue
-                    if self.options.tests_filter and not test.id().startswith(tuple(self.options.tests_filter)):
-                        # We're filtering the tests and it does not match
-                        continue
-                    self.__testsuite__[test.id()] = (test, metadata.needs_daemons)
+                self.__collect_tests__(self.__flatten_testsuite__(discovered_tests), metadata.needs_daemons)
+            return
+
+        if self.__discovery_index__ is not None:
+            self.__load_indexed_tests__(metadata, start_dir)
             return
 
         try:
@@ -1240,18 +2114,7 @@ class SaltRuntests(argparse.ArgumentParser):
             )
             if discovered_tests.countTestCases():
                 log.info('Found {0} tests'.format(discovered_tests.countTestCases()))
-                for test in self.__flatten_testsuite__(discovered_tests):
-                    if 'ModuleImportFailure' in test.id():
-                        if self.options.tests_filter and not \
-                                test._testMethodName.startswith(tuple(self.options.tests_filter)):
-                            # We're filtering the tests and it does not match
-                            continue
-                        self.__testsuite__[test._testMethodName] = (test, metadata.needs_daemons)
-                        continue
-                    if self.options.tests_filter and not test.id().startswith(tuple(self.options.tests_filter)):
-                        # We're filtering the tests and it does not match
-                        continue
-                    self.__testsuite__[test.id()] = (test, metadata.needs_daemons)
+                self.__collect_tests__(self.__flatten_testsuite__(discovered_tests), metadata.needs_daemons)
             if start_dir != self.options.workspace:
                 self.__testsuite_searched_paths__.add(start_dir)
         except ImportError as exc:
@@ -1264,51 +2127,184 @@ class SaltRuntests(argparse.ArgumentParser):
             )
             self.exit(1)
 
-    def __flatten_testsuite__(self, tests):
-        if hasattr(tests, '_tests'):
-            for suite in tests._tests:
-                for test in self.__flatten_testsuite__(suite):
-                    yield test
-        else:
-            yield tests
+    def __load_indexed_tests__(self, metadata, start_dir):
+        '''
+        Load the tests from the test modules found directly under ``start_dir``. Modules which did not change since
+        they were last indexed are not imported, their tests are only loaded right before running them.
+        '''
+        if start_dir in self.__testsuite_indexed_paths__:
+            return
+        self.__testsuite_indexed_paths__.add(start_dir)
 
-    def __find_meta__(self, directory):
-        log.info('Finding meta in {0}'.format(directory))
-        for filename in fnmatch.filter(os.listdir(directory), '__salttest__.py*'):
-            log.info('Found meta in {0}'.format(directory))
-            return self.__load_metadata__(directory, filename)
-        parent = os.path.dirname(directory)
-        if self.options.workspace == directory:
-            log.debug(
-                'Reached originating CWD({0}), stop searching for meta in parent directories'.format(
-                    self.options.workspace
-                )
-            )
-            # Don't search parent directories above CWD
-            return argparse.Namespace(
-                needs_daemons=True,
-                test_module_pattern=self.options.test_module_pattern,
-                top_level_dir=directory
-            )
-        metadata = self.__find_meta__(parent)
-        if 'top_level_dir' not in metadata:
-            setattr(metadata, 'top_level_dir', directory)
+        top_level_dir = metadata.top_level_dir
+        if start_dir != top_level_dir and (
+                not start_dir.startswith(top_level_dir.rstrip(os.sep) + os.sep) or
+                not os.path.isfile(os.path.join(start_dir, '__init__.py'))):
+            # Just like unittest's discovery, the start directory needs to be importable
+            return
+
+        log.info('Loading tests from {0} using the discovery index. Meta: {1}'.format(start_dir, metadata))
+        for filename in sorted(fnmatch.filter(os.listdir(start_dir), metadata.test_module_pattern)):
+            path = os.path.join(start_dir, filename)
+            if not VALID_TEST_MODULE_NAME_RE.match(filename) or not os.path.isfile(path):
+                continue
+
+            module_name = os.path.splitext(os.path.relpath(path, top_level_dir))[0].replace(os.sep, '.')
+            entry = self.__discovery_index__.get(path, metadata)
+            if entry is not None:
+                for test_id in entry['tests']:
+                    if self.options.tests_filter and not test_id.startswith(tuple(self.options.tests_filter)):
+                        # We're filtering the tests and it does not match
+                        continue
+                    self.__testsuite__[test_id] = (None, entry['needs_daemons'])
+                    self.__testsuite_lazy_tests__[test_id] = (path, module_name, top_level_dir)
+                continue
+
+            tests, import_failed = self.__load_module_tests__(path, module_name, top_level_dir)
+            if not import_failed:
+                self.__discovery_index__.set(path, metadata, [test.id() for test in tests])
+            count = self.__collect_tests__(tests, metadata.needs_daemons)
+            if count:
+                log.info('Found {0} tests in {1}'.format(count, module_name))
+
+    def __load_module_tests__(self, path, module_name, top_level_dir):
+        '''
+        Load the tests from a single test module. Returns a tuple with the list of tests and a boolean which tells if
+        the module failed to import.
+        '''
+        loader = TestLoader()
+        if top_level_dir not in sys.path:
+            sys.path.insert(0, top_level_dir)
+        try:
+            tests = list(self.__flatten_testsuite__(loader.loadTestsFromName(module_name)))
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Failed to load tests from {0}: {1}'.format(module_name, exc))
+            tests = None
+        if tests is not None and not [test for test in tests if
+                                      'ModuleImportFailure' in test.id() or '_FailedTest' in test.id()]:
+            return tests, False
+
+        # Let unittest's discovery generate the tests which report the import failure
+        return list(self.__flatten_testsuite__(
+            loader.discover(os.path.dirname(path), pattern=os.path.basename(path), top_level_dir=top_level_dir)
+        )), True
+
+    def __load_lazy_tests__(self):
+        '''
+        Import the test modules of the selected tests which were found through the discovery index
+        '''
+        modules = {}
+        for test_id, (test, needs_daemons) in self.__testsuite__.items():
+            if test is not None or test_id not in self.__testsuite_lazy_tests__:
+                continue
+            modules.setdefault(self.__testsuite_lazy_tests__[test_id], []).append(test_id)
+
+        if not modules:
+            return
+
+        log.info('Importing {0} indexed test modules'.format(len(modules)))
+        for (path, module_name, top_level_dir), test_ids in sorted(modules.items()):
+            tests, import_failed = self.__load_module_tests__(path, module_name, top_level_dir)
+            if import_failed:
+                # Report the import failure instead of the previously indexed tests
+                self.__discovery_index__.invalidate(path)
+                for test_id in test_ids:
+                    needs_daemons = self.__testsuite__.pop(test_id)[1]
+                self.__collect_tests__(tests, needs_daemons)
+                continue
+            for test in tests:
+                if test.id() in self.__testsuite__ and self.__testsuite__[test.id()][0] is None:
+                    self.__testsuite__[test.id()] = (test, self.__testsuite__[test.id()][1])
+
+        for test_id, (test, needs_daemons) in list(self.__testsuite__.items()):
+            if test is None:
+                log.warning('The indexed test {0} was not found. Skipping it.'.format(test_id))
+                self.__testsuite__.pop(test_id)
+        self.__testsuite_lazy_tests__ = {}
+
+    def __flatten_testsuite__(self, tests):
+        if hasattr(tests, '_tests'):
+            for suite in tests._tests:
+                for test in self.__flatten_testsuite__(suite):
+                    yield test
+        else:
+            yield tests
+
+    def __find_meta__(self, directory):
+        if directory in self.__testsuite_metadata__:
+            # Each __salttest__.py is only loaded once per run, the resolved metadata is shared with all of the
+            # directories under it
+            self.__testsuite_metadata_cache_hits__ += 1
+            return self.__testsuite_metadata__[directory]
+
+        log.info('Finding meta in {0}'.format(directory))
+        for filename in fnmatch.filter(os.listdir(directory), '__salttest__.py*'):
+            log.info('Found meta in {0}'.format(directory))
+            metadata = self.__load_metadata__(directory, filename)
+            break
+        else:
+            parent = os.path.dirname(directory)
+            if self.options.workspace == directory or parent == directory:
+                log.debug(
+                    'Reached originating CWD({0}), stop searching for meta in parent directories'.format(
+                        self.options.workspace
+                    )
+                )
+                # Don't search parent directories above CWD
+                metadata = argparse.Namespace(
+                    needs_daemons=True,
+                    test_module_pattern=self.options.test_module_pattern,
+                    top_level_dir=directory
+                )
+            else:
+                metadata = self.__find_meta__(parent)
+                if 'top_level_dir' not in metadata:
+                    metadata = argparse.Namespace(top_level_dir=directory, **vars(metadata))
+        self.__testsuite_metadata__[directory] = metadata
         return metadata
 
-    def __discover_salttests__(self, start_discovery_in=None):
+    def __discover_salttests__(self, start_discovery_in=None, load_tests=True):
+        '''
+        Search for tests under ``start_discovery_in`` and the additional search paths.
+
+        If ``load_tests`` is ``False`` only the ``__salttest__.py`` metadata files are loaded, no test module is
+        imported.
+        '''
         if start_discovery_in is None:
             start_discovery_in = os.getcwd()
 
         for root in [start_discovery_in] + self.__search_paths__:
-            log.info('Searching for tests under {0}'.format(root))
+            log.info('Searching for {0} under {1}'.format(load_tests and 'tests' or 'metadata', root))
             for top_level_dir, start_dirs, filenames in os.walk(root):
                 if not fnmatch.filter(filenames, '*.py*'):
                     continue
+                metadata = self.__find_meta__(top_level_dir)
+                if load_tests is False:
+                    self.__ensure_in_syspath__(metadata.top_level_dir)
+                    continue
                 try:
-                    self.__load_tests__(self.__find_meta__(top_level_dir), start_dir=top_level_dir)
+                    self.__load_tests__(metadata, start_dir=top_level_dir)
                 except ImportError:
                     continue
 
+    def __ensure_in_syspath__(self, path):
+        '''
+        Make sure the tests top level directories are importable, just like unittest's discovery does
+        '''
+        if path and path not in sys.path:
+            sys.path.insert(0, path)
+
+    def __load_testfiles_metadata__(self, testfiles):
+        '''
+        Load only the metadata which applies to the passed test files and directories
+        '''
+        for testfile in testfiles:
+            abs_testfile = os.path.abspath(testfile)
+            if os.path.isdir(abs_testfile):
+                self.__discover_salttests__(abs_testfile, load_tests=False)
+            elif os.path.isfile(abs_testfile):
+                self.__ensure_in_syspath__(self.__find_meta__(os.path.dirname(abs_testfile)).top_level_dir)
+
     # ----- Coverage Support Methods --------------------------------------->
     def __start_coverage__(self):
         self.print_bulleted('Starting Code Coverage Tracking')
@@ -1319,7 +2315,22 @@ class SaltRuntests(argparse.ArgumentParser):
             'include': self.options.coverage_include,
             'omit': self.options.coverage_omit
         }
+        coverage_options = coverage_mode_options(
+            self.options.coverage_mode,
+            coverage_options,
+            omit_dirs=set([
+                os.path.dirname(path) for path in
+                [test_module_file(test) for (test, _) in self.__testsuite__.values()] if path is not None
+            ])
+        )
+        if self.options.coverage_mode == 'fast':
+            self.print_bulleted('Using The {0!r} Coverage Tracer'.format(select_fast_tracer()))
         if self.options.coverage_no_processes is False:
+            if self.options.coverage_combine_workers:
+                self.__coverage_combiner__ = IncrementalCoverageCombiner(
+                    '.coverage', coverage_options, processes=self.options.coverage_combine_workers
+                )
+                self.__coverage_combiner__.start()
             os.environ['COVERAGE_PROCESS_START'] = '1'
             coverage_options['data_suffix'] = True
 
@@ -1328,6 +2339,14 @@ class SaltRuntests(argparse.ArgumentParser):
         self.__coverage_instance__ = coverage.coverage(**coverage_options)
         self.__coverage_instance__.start()
 
+        if self.options.coverage_map:
+            # The code the tests needing the daemons exercise runs on the daemons, out of the recorded contexts
+            self.__coverage_recorder__ = CoverageContextRecorder(
+                self.__coverage_instance__,
+                needs_daemons=lambda test: self.__testsuite__.get(test.id(), (None, True))[1]
+            )
+            add_result_listener(self.__coverage_recorder__)
+
 
     def __stop_coverage__(self):
         # Clean up environment
@@ -1341,10 +2360,39 @@ class SaltRuntests(argparse.ArgumentParser):
         self.print_bulleted('Saving Coverage Data')
         self.__coverage_instance__.save()
 
+        if self.__coverage_combiner__ is not None:
+            self.print_bulleted('Waiting For The Coverage Files Being Combined')
+            combined = self.__coverage_combiner__.finish()
+            log.info('{0} coverage data files were combined while the tests ran'.format(combined))
+            self.__coverage_combiner__ = None
+
         if self.options.coverage_no_processes is False:
             self.print_bulleted('Combining Multiple Coverage Files')
             self.__coverage_instance__.combine()
 
+        if self.__coverage_recorder__ is not None:
+            self.print_bulleted('Updating The Coverage Map At {0!r}'.format(self.options.coverage_map_file))
+            root = git_toplevel(self.options.workspace) or self.options.workspace
+            coverage_map = CoverageMapStore(self.options.coverage_map_file)
+            coverage_map.update(
+                git_commit('HEAD', root),
+                self.__coverage_recorder__.tests,
+                coverage_contexts_map(self.__coverage_instance__.get_data(), root),
+                unmapped=self.__coverage_recorder__.unmapped
+            )
+            coverage_map.save()
+
+        if self.options.coverage_reports_in_background and \
+                (self.options.coverage_xml_output is not None or self.options.coverage_html_output is not None):
+            self.print_bulleted('Writing The Coverage Reports In The Background')
+            write_reports_in_background(
+                self.__coverage_instance__,
+                xml_output=self.options.coverage_xml_output,
+                html_output=self.options.coverage_html_output
+            )
+            print_header(u'', inline=True, width=self.options.output_columns)
+            return
+
         if self.options.coverage_xml_output is not None:
             self.print_bulleted(
                 'Writing XML Coverage Data At {0!r}'.format(self.options.coverage_xml_output)
@@ -1369,8 +2417,9 @@ class SaltRuntests(argparse.ArgumentParser):
 
     def parse_args(self, args=None, namespace=None):
         # We will ignore this parse_args result, we just need to trigger the
-        # tests discovery with the additional search paths
-        self.options = options = super(SaltRuntests, self).parse_args(args, namespace)
+        # metadata discovery with the additional search paths. Options added by
+        # the metadata files are still unknown at this stage.
+        self.options = options = super(SaltRuntests, self).parse_known_args(args, namespace)[0]
 
         # Let's now remove the bogus help handler added above and add the real
         # one just before parsing args again
@@ -1404,9 +2453,20 @@ class SaltRuntests(argparse.ArgumentParser):
                 'YELLOW'
             )
 
-        if not options.testfiles:
-            # Since we're not being passed test files, we can search for them
-            self.__discover_salttests__()
+        if options.no_discovery_cache is False:
+            self.__discovery_index__ = TestsDiscoveryIndex(
+                os.path.join(
+                    options.cache_dir,
+                    'discovery-index-py{0}.json'.format(sys.version_info[0])
+                )
+            )
+
+        # Only the __salttest__.py metadata files are loaded at this stage, they can extend the parser with
+        # additional options. Test modules are only imported once the tests selection is final.
+        if options.testfiles:
+            self.__load_testfiles_metadata__(options.testfiles)
+        else:
+            self.__discover_salttests__(load_tests=False)
 
         # Add the real help action argument
         self.add_argument(
@@ -1428,8 +2488,96 @@ class SaltRuntests(argparse.ArgumentParser):
             )
         if self.options.coverage_source is None:
             self.options.coverage_source = self.options.workspace
+        if self.options.coverage_map:
+            if not self.options.coverage:
+                self.error('\'--coverage-map\' requires \'--coverage\'')
+            if not hasattr(coverage.coverage, 'switch_context'):
+                self.error('\'--coverage-map\' requires coverage>=5.0')
+        if self.options.coverage_combine_workers < 0:
+            self.error('\'--coverage-combine-workers\' needs to be a positive number')
+        if self.options.coverage_map_file is None:
+            self.options.coverage_map_file = os.path.join(self.options.cache_dir, 'coverage-map.json')
+        if self.options.coverage_overhead_file is None:
+            self.options.coverage_overhead_file = os.path.join(self.options.cache_dir, 'coverage-overhead.json')
         # <---- Coverage Checks --------------------------------------------------------------------------------------
 
+        # ----- Tests Durations ------------------------------------------------------------------------------------->
+        if self.options.durations_file is None:
+            self.options.durations_file = os.path.join(self.options.cache_dir, 'test-durations.json')
+        self.__testsuite_durations__ = TestDurationsStore(self.options.durations_file)
+        if self.options.last_failed_file is None:
+            self.options.last_failed_file = os.path.join(self.options.cache_dir, 'last-failed.json')
+        self.__last_failed__ = LastFailedStore(self.options.last_failed_file)
+        if self.options.failfast_after < 0:
+            self.error('\'--failfast-after\' needs to be a positive number')
+        if self.options.failfast_after:
+            self.__failfast__ = FailFastListener(self.options.failfast_after)
+            add_result_listener(self.__failfast__)
+        # <---- Tests Durations --------------------------------------------------------------------------------------
+
+        # ----- Parallel Execution Checks --------------------------------------------------------------------------->
+        if self.options.workers < 0:
+            self.error('\'--workers\' needs to be a positive number')
+        if self.options.workers == 0:
+            self.options.workers = multiprocessing.cpu_count()
+        # <---- Parallel Execution Checks ----------------------------------------------------------------------------
+
+        if self.options.namespace == 'auto':
+            self.options.namespace = 'pid{0}'.format(os.getpid())
+        if self.options.namespace is not None:
+            if not NAMESPACE_RE.match(self.options.namespace):
+                self.error('\'--namespace\' can only contain letters, digits, \'_\' and \'-\'')
+            set_runtime_namespace(self.options.namespace)
+
+        if HAS_XMLRUNNER and self.options.xml_out_path is None:
+            # Each namespace writes its own reports
+            self.options.xml_out_path = os.path.join(RUNTIME_VARS.TMP, 'xml-test-reports')
+
+        # ----- Sharding Checks ------------------------------------------------------------------------------------->
+        if self.options.shard_count < 1:
+            self.error('\'--shard-count\' needs to be a positive number')
+        if self.options.shard_count > 1:
+            if self.options.shard_index is None:
+                self.error('\'--shard-count\' requires \'--shard-index\'')
+            if not 0 <= self.options.shard_index < self.options.shard_count:
+                self.error(
+                    '\'--shard-index\' needs to be between 0 and {0}'.format(self.options.shard_count - 1)
+                )
+            shard = shard_name(self.options.shard_index, self.options.shard_count)
+            # Each shard writes its own reports so that they can be merged afterwards
+            if HAS_XMLRUNNER:
+                self.options.xml_out_path = os.path.join(self.options.xml_out_path, shard)
+            if self.options.json_out_path is not None:
+                root, ext = os.path.splitext(self.options.json_out_path)
+                self.options.json_out_path = '{0}.{1}{2}'.format(root, shard, ext or '.json')
+        elif self.options.shard_index not in (None, 0):
+            self.error('\'--shard-index\' requires \'--shard-count\'')
+        # <---- Sharding Checks --------------------------------------------------------------------------------------
+
+        if self.options.reuse_daemons:
+            self.options.keep_daemons = True
+        if self.options.keep_old_runs < 0:
+            self.error('\'--keep-old-runs\' needs to be a positive number')
+
+        if self.options.json_lines_out is not None:
+            self.__json_lines_reporter__ = JSONLinesReporter(
+                self.options.json_lines_out,
+                shard=self.options.shard_count > 1 and shard_name(
+                    self.options.shard_index, self.options.shard_count
+                ) or None
+            )
+            add_result_listener(self.__json_lines_reporter__)
+
+        # ----- Profiling Checks ------------------------------------------------------------------------------------>
+        if self.options.profile_tests is not None:
+            try:
+                re.compile(self.options.profile_tests)
+            except re.error as exc:
+                self.error('\'--profile-tests\' is not a valid regular expression: {0}'.format(exc))
+        if self.options.profile_tests_top < 1:
+            self.error('\'--profile-tests-top\' needs to be a positive number')
+        # <---- Profiling Checks -------------------------------------------------------------------------------------
+
 
         # ----- Setup File Logging ---------------------------------------------------------------------------------->
         log.info('Logging tests on {0}'.format(options.tests_logfile))
@@ -1470,12 +2618,6 @@ class SaltRuntests(argparse.ArgumentParser):
                 self.__load_tests__(self.__find_meta__(start_dir), filename=abs_testfile, start_dir=start_dir)
 
         if options.name:
-            if not options.testfiles:
-                # We allowed self.__discover_salttests__() to be executed above in
-                # order for the import routine bellow to work, however, we will
-                # reset the self.__testsuite__ dictionary in order to only have the
-                # tests passed in options.name and options.testfiles loaded
-                self.__testsuite__ = {}
             for name in options.name:
                 log.info('Processing {0}'.format(name))
                 # Let's mimic TestLoader.loadTestsFromName behaviour of
@@ -1499,7 +2641,40 @@ class SaltRuntests(argparse.ArgumentParser):
                 except AttributeError:
                     self.error('Unable to load tests from {0!r}'.format(name))
 
+        if not options.testfiles and not options.name:
+            # Since we're not being passed test files or names, we can search for them
+            self.__discover_salttests__()
+
+        log.debug(
+            'The metadata cache avoided {0} metadata loads. {1} directories resolved.'.format(
+                self.__testsuite_metadata_cache_hits__, len(self.__testsuite_metadata__)
+            )
+        )
+
+        if self.options.changed_since is not None:
+            self.__select_changed_tests__()
+
+        if self.options.shard_count > 1:
+            self.__select_shard__()
+
+        # Now that the tests selection is final, import the indexed test modules
+        self.__load_lazy_tests__()
+        if self.__discovery_index__ is not None:
+            log.info(
+                'Tests discovery index: {0} hits, {1} misses'.format(
+                    self.__discovery_index__.hits, self.__discovery_index__.misses
+                )
+            )
+            try:
+                self.__discovery_index__.save()
+            except (IOError, OSError) as exc:
+                log.warning('Failed to save the tests discovery index: {0}'.format(exc))
+
         if self.__count_test_cases__() < 1:
+            if self.options.shard_count > 1:
+                # With more shards than tests, some of the shards are empty
+                self.print_bulleted('No tests were assigned to this shard', 'YELLOW')
+                self.exit(0)
             # No need to continue if no tests were discovered
             self.error('No tests were found')
 
@@ -1513,14 +2688,31 @@ class SaltRuntests(argparse.ArgumentParser):
         if os.getcwd() not in sys.path:
             sys.path.insert(0, os.getcwd())
 
-        if any([os.path.isdir(path) for (name, path) in RUNTIME_VARS]):
-            self.print_bulleted('Cleaning up previous execution temporary directories')
-            for name, path in RUNTIME_VARS:
-                if os.path.isdir(path):
-                    shutil.rmtree(path)
+        self.__daemons_state__ = KeptDaemonsState(
+            os.path.join(
+                options.cache_dir,
+                self.options.namespace and 'daemons-state-{0}.json'.format(self.options.namespace) or
+                'daemons-state.json'
+            )
+        )
+        self.__reuse_daemons__ = self.options.reuse_daemons and self.__daemons_state__.alive()
+        if self.__daemons_state__.pids and not self.__reuse_daemons__:
+            self.print_bulleted('Stopping the Salt daemons left running by a previous execution')
+            self.__daemons_state__.stop()
+
+        if not self.__reuse_daemons__:
+            self.__clean_previous_execution__()
 
         self.print_bulleted('Found {0} test cases'.format(self.__count_test_cases__()))
         self.__transplant_configs__()
+        if self.__reuse_daemons__ and self.__daemons_state__.data.get('fingerprint') != self.__configs_fingerprint__():
+            self.print_bulleted(
+                'The configuration changed, the Salt daemons left running can\'t be reused', 'YELLOW'
+            )
+            self.__daemons_state__.stop()
+            self.__reuse_daemons__ = False
+            self.__clean_previous_execution__()
+            self.__transplant_configs__()
         # Transplant Salt's integration files directory
         self.__transplant_salt_integration_files__()
 
@@ -1532,15 +2724,180 @@ class SaltRuntests(argparse.ArgumentParser):
         if self.options.coverage is True:
             self.__start_coverage__()
 
-        with TestDaemon(self, start_daemons=self.__testsuite_needs_daemons_running__()):
-            self.run_collected_tests()
+        if self.options.profile_tests is not None:
+            self.__profiles_since__ = prepare_profiles_dir(self.options.profile_tests_dir)
+            # Inherited by the Salt daemons processes, see run_salt_daemon()
+            os.environ[PROFILE_DAEMONS_DIR_ENV] = self.options.profile_tests_dir
 
-        if self.options.coverage is True:
-            self.__stop_coverage__()
+        try:
+            with TestDaemon(self, start_daemons=self.__testsuite_needs_daemons_running__()):
+                if self.options.profile_tests is not None:
+                    add_result_listener(TestsProfiler(self.options.profile_tests, self.options.profile_tests_dir))
+                if self.options.profile_resources:
+                    # The daemons left running are not children of the tests runner
+                    add_result_listener(
+                        ResourceProfiler(
+                            extra_pids=self.options.keep_daemons and self.__daemons_state__.pids.values() or ()
+                        )
+                    )
+                self.run_collected_tests()
+
+            if self.options.shard_count == 1:
+                # Each node would record different durations and, when shared, would split the shards differently
+                self.__testsuite_durations__.save()
+            self.__save_last_failed__()
+            self.__save_coverage_overhead__()
+
+            if self.options.json_out_path is not None:
+                write_json_report(
+                    self.options.json_out_path,
+                    self.__testsuite_results__,
+                    shard=self.options.shard_count > 1 and {
+                        'index': self.options.shard_index,
+                        'count': self.options.shard_count
+                    } or None
+                )
+                self.print_bulleted('JSON tests report written to {0}'.format(self.options.json_out_path))
+
+            if self.options.profile_resources:
+                write_resources_report(
+                    self.options.profile_resources_out, collect_test_resources(self.__testsuite_results__)
+                )
+                self.print_bulleted('Tests resources report written to {0}'.format(self.options.profile_resources_out))
+
+            if self.options.profile_tests is not None:
+                self.__print_profiles_report__()
 
-        if self.__testsuite_status__.count(False) > 0:
-            self.finalize(1)
-        self.finalize(0)
+            if self.options.coverage is True:
+                self.__stop_coverage__()
+
+            if self.__testsuite_status__.count(False) > 0:
+                self.finalize(1)
+            self.finalize(0)
+        finally:
+            # Only when the run was aborted, finalize() already finished it
+            self.__finish_json_lines_reporter__()
+
+    def __print_profiles_report__(self):
+        '''
+        Print the aggregated report of the tests, and Salt daemons, profiles
+        '''
+        for daemons, title in ((False, 'Tests'), (True, 'Salt Daemons')):
+            report = aggregate_profiles(
+                self.options.profile_tests_dir,
+                self.options.profile_tests_top,
+                daemons=daemons,
+                since=self.__profiles_since__
+            )
+            if report is None:
+                continue
+            print_header(
+                u'  {0} Profiles, Top {1} by Cumulative Time  '.format(title, self.options.profile_tests_top),
+                sep=u'-', inline=True, width=self.options.output_columns
+            )
+            print(report.rstrip())
+        if self.options.keep_daemons:
+            self.print_bulleted(
+                'The Salt daemons left running only write their profiles once they\'re stopped', 'YELLOW'
+            )
+        self.print_bulleted('Profiles written to {0}'.format(self.options.profile_tests_dir))
+
+    def __clean_previous_execution__(self):
+        # The transplanted configuration and integration files are kept, they're reused if still up to date
+        keep = (RUNTIME_VARS.TMP_CONF_DIR, RUNTIME_VARS.TMP_SALT_INTEGRATION_FILES)
+        paths = [
+            path for (name, path) in RUNTIME_VARS
+            if os.path.isdir(path) and not [item for item in keep if (path + os.sep).startswith(item + os.sep)]
+        ]
+        if paths:
+            self.print_bulleted('Cleaning up previous execution temporary directories')
+            for path in sorted(paths):
+                if os.path.isdir(path):
+                    discard_tree(path, keep)
+        remove_old_runs(self.options.keep_old_runs)
+
+    def __configs_fingerprint__(self):
+        '''
+        Return a fingerprint of the transplanted configuration files, the Salt version and transport in use
+        '''
+        # Late import
+        from salt.version import __saltstack_version__
+
+        fingerprint = hashlib.sha1()
+        fingerprint.update('{0}:{1}\n'.format(__saltstack_version__.string, self.options.transport).encode('utf-8'))
+        for root, dirs, files in os.walk(RUNTIME_VARS.TMP_CONF_DIR):
+            dirs.sort()
+            for fname in sorted(files):
+                fpath = os.path.join(root, fname)
+                fingerprint.update('{0}\n'.format(fpath).encode('utf-8'))
+                with open(fpath, 'rb') as rfh:
+                    fingerprint.update(rfh.read())
+        return fingerprint.hexdigest()
+
+    def __select_changed_tests__(self):
+        '''
+        Only keep the selected tests impacted by the changes since --changed-since
+        '''
+        root = git_toplevel(self.options.workspace)
+        changes = root and changed_lines(self.options.changed_since, root)
+        if changes is None:
+            self.print_bulleted(
+                'Unable to find the changes since {0!r}, running all the selected tests'.format(
+                    self.options.changed_since
+                ),
+                'YELLOW'
+            )
+            return
+
+        coverage_map = CoverageMapStore(self.options.coverage_map_file)
+        test_files = []
+        for test_id, (test, _) in self.__testsuite__.items():
+            if test is None and test_id in self.__testsuite_lazy_tests__:
+                test_files.append((test_id, self.__testsuite_lazy_tests__[test_id][0]))
+            elif test is not None:
+                test_files.append((test_id, test_module_file(test)))
+        # The recorded line numbers only match the changed lines when they were recorded on the same commit
+        selected = coverage_map.select(
+            self.__testsuite__,
+            changes,
+            test_modules_map(test_files, root),
+            commit=git_commit(self.options.changed_since, root)
+        )
+        if selected is None:
+            self.print_bulleted('Some of the changed files are not on the coverage map, running all the selected tests')
+            return
+
+        self.print_bulleted(
+            'Running {0} out of {1} tests, impacted by the changes to {2} files since {3!r}'.format(
+                len(selected), len(self.__testsuite__), len(changes), self.options.changed_since
+            )
+        )
+        for test_id in list(self.__testsuite__):
+            if test_id not in selected:
+                self.__testsuite__.pop(test_id)
+
+    def __select_shard__(self):
+        '''
+        Only keep the selected tests which belong to the shard being executed
+        '''
+        # The shards only depend on the tests ids and, optionally, on a durations file shared by all the nodes
+        durations = None
+        if self.options.shard_durations_file is not None:
+            durations = TestDurationsStore(self.options.shard_durations_file).data
+        selected = select_shard(
+            self.__testsuite__,
+            self.options.shard_index,
+            self.options.shard_count,
+            durations
+        )
+        log.info(
+            'Running shard {0} of {1}: {2} out of {3} tests'.format(
+                self.options.shard_index, self.options.shard_count, len(selected), len(self.__testsuite__)
+            )
+        )
+        for test_id in list(self.__testsuite__):
+            if test_id not in selected:
+                self.__testsuite__.pop(test_id)
 
     def __count_test_cases__(self):
         return len(self.__testsuite__)
@@ -1553,10 +2910,85 @@ class SaltRuntests(argparse.ArgumentParser):
                 return True
         return False
 
+    def __transplant_configs_key__(self):
+        '''
+        Return a hash of everything the transplanted configuration files are computed from
+        '''
+        key = hashlib.sha1()
+        for root, dirs, files in os.walk(CONF_DIR):
+            dirs.sort()
+            for fname in sorted(files):
+                fpath = os.path.join(root, fname)
+                key.update('{0}\n'.format(os.path.relpath(fpath, CONF_DIR)).encode('utf-8'))
+                with open(fpath, 'rb') as rfh:
+                    key.update(rfh.read())
+        key.update(
+            json.dumps(
+                [pwd.getpwuid(os.getuid()).pw_name,
+                 self.options.transport,
+                 RUNTIME_VARS.TMP,
+                 self.__file_roots__.to_dict(),
+                 self.__pillar_roots__.to_dict(),
+                 self.__ext_pillar__],
+                sort_keys=True,
+                default=repr
+            ).encode('utf-8')
+        )
+        return key.hexdigest()
+
+    def __transplanted_configs_files__(self):
+        '''
+        Return a dictionary mapping each of the files found on the transplanted configuration directory to the hash
+        of its contents
+        '''
+        hashes = {}
+        for root, dirs, files in os.walk(RUNTIME_VARS.TMP_CONF_DIR):
+            for fname in files:
+                fpath = os.path.join(root, fname)
+                if fpath == os.path.join(RUNTIME_VARS.TMP_CONF_DIR, CONFIGS_MANIFEST_NAME):
+                    continue
+                with open(fpath, 'rb') as rfh:
+                    hashes[os.path.relpath(fpath, RUNTIME_VARS.TMP_CONF_DIR)] = hashlib.sha1(rfh.read()).hexdigest()
+        return hashes
+
+    def __transplanted_configs_match__(self, key):
+        '''
+        Check if the configuration files transplanted by a previous execution were computed from the same data and
+        were not modified since. Returns the manifest of the transplanted configuration files, or ``None``.
+        '''
+        manifest_path = os.path.join(RUNTIME_VARS.TMP_CONF_DIR, CONFIGS_MANIFEST_NAME)
+        if not os.path.isfile(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r') as rfh:
+                manifest = json.load(rfh)
+        except (IOError, OSError, ValueError) as exc:
+            log.warning('Failed to load {0}: {1}'.format(manifest_path, exc))
+            return None
+        if manifest.get('key') != key or manifest.get('files') != self.__transplanted_configs_files__():
+            return None
+        return manifest
+
     def __transplant_configs__(self):
         # Late import
         import salt.config
 
+        if self.__ports__ is not None:
+            self.__ports__.release()
+        self.__ports__ = PortAllocator(PORTS_REGISTRY)
+        key = self.__transplant_configs_key__()
+        manifest = self.__transplanted_configs_match__(key)
+        # The ports the configuration files were written with need to be ours again, or the files are computed with
+        # new ports. The Salt daemons left running already use them.
+        if manifest is not None and self.__ports__.claim(manifest.get('ports', []), bind=not self.__reuse_daemons__):
+            self.print_bulleted(
+                'The configuration files on {0!r} are up to date'.format(RUNTIME_VARS.TMP_CONF_DIR)
+            )
+            return
+        if os.path.isdir(RUNTIME_VARS.TMP_CONF_DIR):
+            # Don't leave behind any stale configuration files, includes for example
+            shutil.rmtree(RUNTIME_VARS.TMP_CONF_DIR)
+
         for name, path in RUNTIME_VARS:
             if 'CONF' in name and not os.path.isdir(path):
                 os.makedirs(path)
@@ -1581,15 +3013,41 @@ class SaltRuntests(argparse.ArgumentParser):
         syndic_master_opts['user'] = running_tests_user
         syndic_master_opts['root_dir'] = os.path.join(RUNTIME_VARS.TMP, 'syndic-master-root')
 
+        # Every port is allocated, the fixed ports of the configuration files would clash with any other tests suite
+        # running on the system. The ports are held until the Salt daemons start, see TestDaemon.__real_enter__()
+        port_options = []
+        for opts in (master_opts, syndic_master_opts):
+            for optname in ('publish_port', 'ret_port', 'tcp_master_pub_port', 'tcp_master_pull_port',
+                            'tcp_master_publish_pull', 'tcp_master_workers'):
+                port_options.append((opts, optname))
+        for opts in (minion_opts, sub_minion_opts):
+            port_options.extend([(opts, 'tcp_pub_port'), (opts, 'tcp_pull_port')])
+        if self.options.transport == 'raet':
+            port_options.extend([(minion_opts, 'raet_port'), (sub_minion_opts, 'raet_port')])
+        for (opts, optname), port in zip(port_options, self.__ports__.allocate(len(port_options))):
+            opts[optname] = port
+
+        for opts in (minion_opts, sub_minion_opts):
+            opts['master_port'] = master_opts['ret_port']
+        syndic_opts['syndic_master_port'] = syndic_master_opts['ret_port']
+
         if self.options.transport == 'raet':
             master_opts['transport'] = 'raet'
-            master_opts['raet_port'] = 64506
+            master_opts['raet_port'] = master_opts['ret_port']
             minion_opts['transport'] = 'raet'
-            minion_opts['raet_port'] = 64510
             sub_minion_opts['transport'] = 'raet'
-            sub_minion_opts['raet_port'] = 64520
             #syndic_master_opts['transport'] = 'raet'
 
+        # The syndic uses the master's sockets directory, it includes its configuration
+        master_opts['sock_dir'] = os.path.join(RUNTIME_VARS.TMP_SOCK_DIR, 'master')
+        syndic_master_opts['sock_dir'] = os.path.join(RUNTIME_VARS.TMP_SOCK_DIR, 'syndic_master')
+        minion_opts['sock_dir'] = os.path.join(RUNTIME_VARS.TMP_SOCK_DIR, 'minion')
+        sub_minion_opts['sock_dir'] = os.path.join(RUNTIME_VARS.TMP_SOCK_DIR, 'sub_minion')
+
+        if self.options.namespace is not None:
+            # The minion ids are kept, each namespace has its own masters and the tests target the minions by name
+            master_opts['token_file'] = os.path.join(RUNTIME_VARS.TMP, os.path.basename(master_opts['token_file']))
+
         # Set up config options that require internal data
         master_opts['pillar_roots'] = self.__pillar_roots__.merge({
             'base': [
@@ -1622,7 +3080,7 @@ class SaltRuntests(argparse.ArgumentParser):
 
         # ----- Transcribe Configuration ---------------------------------------------------------------------------->
         for entry in os.listdir(CONF_DIR):
-            if entry in ('master', 'minion', 'sub_minion', 'syndic_master'):
+            if entry in ('master', 'minion', 'sub_minion', 'syndic', 'syndic_master'):
                 # These have runtime computed values and will be handled
                 # differently
                 continue
@@ -1635,13 +3093,21 @@ class SaltRuntests(argparse.ArgumentParser):
             elif os.path.isdir(entry_path):
                 recursive_copytree(entry_path, os.path.join(RUNTIME_VARS.TMP_CONF_DIR, entry))
 
-        for entry in ('master', 'minion', 'sub_minion', 'syndic_master'):
+        for entry in ('master', 'minion', 'sub_minion', 'syndic', 'syndic_master'):
             computed_config = deepcopy(locals()['{0}_opts'.format(entry)])
             open(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, entry), 'w').write(
                 yaml.dump(computed_config, default_flow_style=False)
             )
         # <---- Transcribe Configuration -----------------------------------------------------------------------------
 
+        with open(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, CONFIGS_MANIFEST_NAME), 'w') as wfh:
+            json.dump(
+                {'key': key, 'files': self.__transplanted_configs_files__(), 'ports': self.__ports__.ports},
+                wfh,
+                indent=1,
+                sort_keys=True
+            )
+
     def __transplant_salt_integration_files__(self):
         # Late import
         import salt
@@ -1663,22 +3129,157 @@ class SaltRuntests(argparse.ArgumentParser):
                 'to the directory where the salt code resides'
             )
 
-        shutil.copytree(salt_integration_files_dir,
-                        RUNTIME_VARS.TMP_SALT_INTEGRATION_FILES,
-                        symlinks=True)
+        kept = os.path.isdir(RUNTIME_VARS.TMP_SALT_INTEGRATION_FILES)
+        stats = transplant_tree(
+            salt_integration_files_dir,
+            RUNTIME_VARS.TMP_SALT_INTEGRATION_FILES,
+            mode=self.options.transplant_mode
+        )
+        self.print_bulleted(
+            'Transplanted integration files, using {mode}: {copied} copied, {reflinked} reflinked, {linked} linked, '
+            '{removed} removed, {skipped} unchanged. {copied_bytes} bytes copied'.format(**stats)
+        )
+        if kept and not stats['skipped'] and stats['copied'] + stats['reflinked'] + stats['linked']:
+            # The integration files of the previous execution were kept, yet none of them was reused
+            log.warning(
+                'None of the integration files kept under {0} was reused, were they removed since the previous '
+                'execution?'.format(RUNTIME_VARS.TMP_SALT_INTEGRATION_FILES)
+            )
 
     def run_collected_tests(self):
-        self.run_suite(
-            TestSuite(
-                sorted([test for (test, needs_daemon) in self.__testsuite__.values()],
-                       key=lambda x: x.id())
+        last_failed = self.options.failed_first and self.__last_failed__.failed or set()
+        if last_failed & set(self.__testsuite__):
+            # Give the signal as soon as possible, the tests which failed last time run first, on their own
+            self.print_bulleted('Running first the tests which failed on the previous runs')
+            self.__testsuite_status__.append(
+                self.run_suite(
+                    TestSuite(self.__sort_tests__(
+                        [test for (test_id, (test, _)) in self.__testsuite__.items() if test_id in last_failed]
+                    ))
+                )
             )
+            remaining = dict([
+                (test_id, entry) for (test_id, entry) in self.__testsuite__.items() if test_id not in last_failed
+            ])
+        else:
+            remaining = self.__testsuite__
+
+        if self.options.workers == 1:
+            self.__testsuite_status__.append(
+                self.run_suite(TestSuite(self.__sort_tests__([test for (test, _) in remaining.values()])))
+            )
+            return
+
+        # Tests which do not need the Salt daemons don't touch any of the shared TestDaemon state and can therefor be
+        # executed in parallel. The remaining tests are executed, serially, after them
+        parallel_tests = []
+        serial_tests = []
+        for test, needs_daemons in remaining.values():
+            if needs_daemons:
+                serial_tests.append(test)
+            else:
+                parallel_tests.append(test)
+
+        if parallel_tests:
+            self.__testsuite_status__.append(self.run_parallel_suite(parallel_tests))
+        if serial_tests:
+            self.__testsuite_status__.append(self.run_suite(TestSuite(self.__sort_tests__(serial_tests))))
+
+    def __sort_tests__(self, tests):
+        '''
+        Sort the tests according to the selected tests order
+        '''
+        if self.options.tests_order == 'duration':
+            return sort_by_duration(tests, self.__testsuite_durations__.estimate([test.id() for test in tests]))
+        return sorted(tests, key=lambda x: x.id())
+
+    def run_parallel_suite(self, tests):
+        '''
+        Execute the tests on a pool of worker processes. The tests are grouped by test case class so that class
+        fixtures, ``setUpClass`` and ``tearDownClass``, still run once per group.
+        '''
+        groups = {}
+        for test in tests:
+            groups.setdefault(
+                '{0}.{1}'.format(test.__class__.__module__, test.__class__.__name__), []
+            ).append(test)
+
+        # Hand the longest groups to the workers first, it keeps the workers busy until the end of the run
+        durations = self.__testsuite_durations__.estimate([test.id() for test in tests])
+        groups_durations = dict([
+            (name, sum([durations[test.id()] for test in group_tests])) for (name, group_tests) in groups.items()
+        ])
+        PARALLEL_TESTS_CONTEXT.clear()
+        PARALLEL_TESTS_CONTEXT.update(
+            groups=[
+                sorted(groups[name], key=lambda x: x.id()) for name in
+                sort_by_duration(groups, groups_durations, key=lambda name: name)
+            ],
+            verbosity=self.options.verbosity,
+            xml_out_path=self.options.xml_out_path if HAS_XMLRUNNER and self.options.xml_out else None,
+            failfast=self.__failfast__
+        )
+        workers = min(self.options.workers, len(groups))
+        self.print_bulleted(
+            'Running {0} tests, in {1} groups, using {2} workers'.format(len(tests), len(groups), workers)
         )
+        self.__emit_suite_event__('suite-start', tests=len(tests), workers=workers)
+        known_tests = dict([(test.id(), test) for test in tests])
+        results = TestResult()
+        results.test_durations = {}
+        results.test_resources = {}
+        combiner = self.__coverage_combiner__
+        pool = multiprocessing.Pool(processes=workers)
+        try:
+            summaries = pool.imap_unordered(run_parallel_tests_group, range(len(PARALLEL_TESTS_CONTEXT['groups'])))
+            while True:
+                try:
+                    # The coverage data files are combined from here, the listener does nothing on the workers
+                    summary = summaries.next(timeout=combiner is not None and combiner.interval or None)
+                except multiprocessing.TimeoutError:
+                    combiner.maybe_poll()
+                    continue
+                except StopIteration:
+                    break
+                if combiner is not None:
+                    combiner.maybe_poll()
+                log.debug(
+                    'Worker {0} finished running tests group {1}'.format(summary['worker'], summary['group'])
+                )
+                sys.stdout.write(summary['output'])
+                sys.stdout.flush()
+                merge_parallel_tests_results(results, summary, known_tests)
+            pool.close()
+        except BaseException:
+            # Interrupted, or a worker crashed, don't wait for the remaining groups
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            PARALLEL_TESTS_CONTEXT.clear()
+
+        if self.__failfast__ is not None and self.__failfast__.reached():
+            self.print_bulleted(
+                'The tests run was aborted after {0} failures'.format(self.__failfast__.failures), 'YELLOW'
+            )
+
+        self.__testsuite_results__.append(results)
+        self.__testsuite_durations__.update(results.test_durations)
+        self.__emit_suite_event__('suite-stop', tests=results.testsRun, successful=results.wasSuccessful())
+        return results.wasSuccessful()
 
     def run_suite(self, suite):
         '''
         Execute a unit test suite
         '''
+        if self.__failfast__ is not None and self.__failfast__.reached():
+            self.print_bulleted(
+                'Not running {0} tests, the tests run was aborted after {1} failures'.format(
+                    suite.countTestCases(), self.__failfast__.failures
+                ),
+                'YELLOW'
+            )
+            return False
 
         if HAS_XMLRUNNER and self.options.xml_out:
             runner = XMLTestRunner(
@@ -1690,10 +3291,51 @@ class SaltRuntests(argparse.ArgumentParser):
             runner = TextTestRunner(
                 stream=sys.stdout,
                 verbosity=self.options.verbosity)
+        self.__emit_suite_event__('suite-start', tests=suite.countTestCases(), workers=1)
         results = runner.run(suite)
         self.__testsuite_results__.append(results)
+        self.__testsuite_durations__.update(getattr(results, 'test_durations', {}))
+        self.__emit_suite_event__('suite-stop', tests=results.testsRun, successful=results.wasSuccessful())
         return results.wasSuccessful()
 
+    def __save_last_failed__(self):
+        '''
+        Record the tests which failed, or errored, to run them first next time, see --failed-first
+        '''
+        ran = set()
+        failed = set()
+        for results in self.__testsuite_results__:
+            ran.update(getattr(results, 'test_durations', {}))
+            failed.update([test.id() for (test, _) in results.failures + results.errors])
+        self.__last_failed__.update(ran | failed, failed)
+        self.__last_failed__.save()
+
+    def __save_coverage_overhead__(self):
+        '''
+        Record the tests durations measured with the current coverage mode and log the overhead of each mode
+        '''
+        durations = {}
+        for results in self.__testsuite_results__:
+            durations.update(getattr(results, 'test_durations', {}))
+        store = CoverageOverheadStore(self.options.coverage_overhead_file)
+        store.update(self.options.coverage and self.options.coverage_mode or 'none', durations)
+        store.save()
+        for line in store.summary():
+            log.info(line)
+            if self.options.coverage:
+                self.print_bulleted(line)
+
+    def __emit_suite_event__(self, event, **fields):
+        if self.__json_lines_reporter__ is not None:
+            self.__json_lines_reporter__.emit(event, **fields)
+
+    def __finish_json_lines_reporter__(self, exit_code=None):
+        if self.__json_lines_reporter__ is None:
+            return
+        remove_result_listener(self.__json_lines_reporter__)
+        self.__json_lines_reporter__.finish(self.__testsuite_results__, exit_code)
+        self.__json_lines_reporter__ = None
+
     def print_overall_testsuite_report(self):
         '''
         Print a nicely formatted report about the test suite results
@@ -1770,6 +3412,19 @@ class SaltRuntests(argparse.ArgumentParser):
                 print_header(u' ', sep='-', inline=True,
                              width=self.options.output_columns)
 
+        heaviest = heaviest_tests(collect_test_resources(self.__testsuite_results__))
+        if heaviest:
+            print_header(
+                u' --------  Top {0} Heaviest Tests  '.format(len(heaviest)), sep='-', inline=True,
+                width=self.options.output_columns
+            )
+            maxlen = len(max([test_id for (test_id, measurements) in heaviest], key=len))
+            fmt = u'   -> {0: <{maxlen}}  ->  {1}'
+            for test_id, measurements in heaviest:
+                print(fmt.format(test_id, format_resources(measurements), maxlen=maxlen))
+            print_header(u' ', sep='-', inline=True,
+                         width=self.options.output_columns)
+
         if no_problems_found:
             print_header(
                 u'***  No Problems Found While Running Tests  ',
@@ -1798,11 +3453,14 @@ class SaltRuntests(argparse.ArgumentParser):
         '''
         Run the finalization procedures. Show report, clean-up file-system, etc
         '''
-        for func in self.__post_test_daemon_exit__:
-            func(self, start_daemons=self.__testsuite_needs_daemons_running__())
+        try:
+            for func in self.__post_test_daemon_exit__:
+                func(self, start_daemons=self.__testsuite_needs_daemons_running__())
 
-        if self.options.no_report is False:
-            self.print_overall_testsuite_report()
+            if self.options.no_report is False:
+                self.print_overall_testsuite_report()
+        finally:
+            self.__finish_json_lines_reporter__(exit_code)
         log.info(
             'Test suite execution finalized with exit code: {0}'.format(
                 exit_code
@@ -1811,12 +3469,127 @@ class SaltRuntests(argparse.ArgumentParser):
         self.exit(exit_code)
 
 
+# ----- Salt Daemons Processes -------------------------------------------------------------------------------------->
+# Kinds of extension modules which the minions sync with saltutil.sync_<kind>
+SYNCABLE_MODULES_KINDS = ('modules', 'states', 'grains', 'renderers', 'returners', 'outputters', 'utils')
+
+
+def run_salt_daemon(daemon_class, opts, method):
+    '''
+    Instantiate and run a Salt daemon.
+
+    This is the target of the daemons processes. The daemon is instantiated on the child process because, for
+    example, a minion authenticates against its master while being instantiated, which would otherwise serialize the
+    startup of all daemons.
+    '''
+    module_name, class_name = daemon_class.rsplit('.', 1)
+    module = __import__(module_name, globals(), locals(), [class_name])
+    daemon = getattr(module, class_name)(opts)
+    # The daemon is profiled when the tests are, see --profile-tests
+    run_profiled('{0}-{1}'.format(class_name.lower(), opts.get('id', 'master')), getattr(daemon, method))
+
+
+def wait_for_paths(paths, timeout):
+    '''
+    Wait at most ``timeout`` seconds for all of the passed paths, for example, the daemons socket files, to exist.
+    Returns the list of the paths still missing.
+    '''
+    missing = list(paths)
+    expire = time.time() + timeout
+    while missing:
+        missing = [path for path in missing if not os.path.exists(path)]
+        if not missing or time.time() > expire:
+            break
+        time.sleep(0.05)
+    return missing
+
+
+def start_detached_salt_daemon(daemon_class, opts, method):
+    '''
+    Start a Salt daemon detached from the current process, it keeps running once the tests suite exits and it's not
+    terminated along with the tests suite child processes. Returns the daemon PID.
+    '''
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Double fork so that the daemon gets re-parented to init
+        exit_code = 0
+        try:
+            os.close(rfd)
+            os.setsid()
+            daemon_pid = os.fork()
+            if daemon_pid == 0:
+                os.close(wfd)
+                devnull = os.open(os.devnull, os.O_RDWR)
+                for fd in (0, 1, 2):
+                    os.dup2(devnull, fd)
+                try:
+                    run_salt_daemon(daemon_class, opts, method)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception('The detached {0} daemon failed'.format(daemon_class))
+                    exit_code = 1
+            else:
+                os.write(wfd, str(daemon_pid).encode())
+        finally:
+            os._exit(exit_code)  # pylint: disable=protected-access
+    os.close(wfd)
+    daemon_pid = int(os.read(rfd, 32) or 0)
+    os.close(rfd)
+    os.waitpid(pid, 0)
+    return daemon_pid
+
+
+def process_create_time(pid):
+    '''
+    Return the creation time of the process with the passed PID, ``None`` if it's not running
+    '''
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+class KeptDaemonsState(JSONFileStore):
+    '''
+    State of the Salt daemons left running by ``--keep-daemons``. It holds their PIDs, the fingerprint of the
+    configuration they were started with and the fingerprints of the extension modules they have synced.
+    '''
+
+    @property
+    def pids(self):
+        return self.data.get('pids', {})
+
+    def set_pids(self, pids):
+        self.data['pids'] = pids
+        # The PIDs could be reused by other processes once the daemons are gone
+        self.data['create_times'] = dict([(name, process_create_time(pid)) for (name, pid) in pids.items()])
+
+    def is_running(self, name):
+        create_time = process_create_time(self.pids[name])
+        return create_time is not None and create_time == self.data.get('create_times', {}).get(name)
+
+    def alive(self):
+        return bool(self.pids) and all([self.is_running(name) for name in self.pids])
+
+    def stop(self):
+        for name, pid in sorted(self.pids.items()):
+            if not self.is_running(name):
+                continue
+            log.info('Terminating the {0} daemon left running, PID {1}'.format(name, pid))
+            helpers.terminate_process_pid(pid)
+        self.data = {}
+        if os.path.isfile(self.path):
+            os.unlink(self.path)
+# <---- Salt Daemons Processes ---------------------------------------------------------------------------------------
+
+
 # ----- Salt Tests Daemons Context Manager -------------------------------------------------------------------------->
 class TestDaemon(object):
     '''
     Set up the master and minion daemons, and run related cases
     '''
     MINIONS_CONNECT_TIMEOUT = MINIONS_SYNC_TIMEOUT = 120
+    MASTERS_START_TIMEOUT = 30
 
     def __init__(self, parser, start_daemons=True):
         # Late import
@@ -1840,7 +3613,6 @@ class TestDaemon(object):
         Start a master and minion
         '''
         # Late import
-        import salt.config
         from salt.utils.verify import verify_env
         try:
             from salt.utils.process import ProcessManager  # pylint: disable=no-name-in-module
@@ -1852,16 +3624,17 @@ class TestDaemon(object):
         print_header(u'', inline=True, width=self.parser.options.output_columns)
 
         running_tests_user = pwd.getpwuid(os.getuid()).pw_name
-        self.master_opts = salt.config.master_config(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'master'))
+        self.master_opts = get_salt_config(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'master'))
         minion_config_path = os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'minion')
-        self.minion_opts = salt.config.minion_config(minion_config_path)
+        self.minion_opts = get_salt_config(minion_config_path, 'minion')
 
-        self.syndic_opts = salt.config.syndic_config(
+        self.syndic_opts = get_salt_config(
             os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'syndic'),
+            'syndic',
             minion_config_path
         )
-        self.sub_minion_opts = salt.config.minion_config(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'sub_minion'))
-        self.syndic_master_opts = salt.config.master_config(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'syndic_master'))
+        self.sub_minion_opts = get_salt_config(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'sub_minion'), 'minion')
+        self.syndic_master_opts = get_salt_config(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'syndic_master'))
 
         verify_env_entries = [
             os.path.join(self.master_opts['pki_dir'], 'minions'),
@@ -1925,20 +3698,47 @@ class TestDaemon(object):
                         extension_module_source, extension_modules_dest
                     )
                 )
-                recursive_copytree(extension_module_source, extension_modules_dest)
+                stats = transplant_tree(
+                    extension_module_source,
+                    extension_modules_dest,
+                    mode=self.parser.options.transplant_mode
+                )
+                log.info(
+                    'Transplanted extension modules, using {mode}: {copied} copied, {reflinked} reflinked, '
+                    '{linked} linked, {skipped} unchanged. {copied_bytes} bytes copied'.format(**stats)
+                )
 
         # Set up PATH to mockbin
         self._enter_mockbin()
 
         if self.start_daemons:
-            if self.parser.options.transport == 'raet':
-                self.start_raet_daemons()
-            else:
-                self.start_zeromq_daemons()
-
             self.minion_targets = set(['minion', 'sub_minion'])
-            self.pre_setup_minions()
-            self.setup_minions()
+            self.daemons_pids = {}
+            if self.parser.__reuse_daemons__:
+                self.parser.print_bulleted('Reusing the Salt daemons left running by a previous execution')
+                self.pre_setup_minions()
+                self.sync_changed_extension_modules()
+            else:
+                if self.parser.__ports__ is not None:
+                    # Hand the allocated ports over to the daemons
+                    self.parser.__ports__.release()
+                start = time.time()
+                if self.parser.options.transport == 'raet':
+                    self.start_raet_daemons()
+                else:
+                    self.start_zeromq_daemons()
+                log.info('Salt daemons processes started in {0:.2f} seconds'.format(time.time() - start))
+
+                self.pre_setup_minions()
+                self.setup_minions()
+                if self.parser.options.keep_daemons:
+                    self.parser.__daemons_state__.data = {
+                        'fingerprint': self.parser.__configs_fingerprint__(),
+                        'extension_modules': self.extension_modules_fingerprints(),
+                    }
+                    self.parser.__daemons_state__.set_pids(self.daemons_pids)
+            if self.parser.options.keep_daemons:
+                self.parser.__daemons_state__.save()
 
         for func in self.parser.__test_daemon_enter__:
             func(self)
@@ -1990,74 +3790,65 @@ class TestDaemon(object):
             if self.start_daemons:
                 self.post_setup_minions()
 
-    def start_zeromq_daemons(self):
-        # Late import Salt
-        import salt.master
-        import salt.minion
-
-        master = salt.master.Master(self.master_opts)
-        if self.process_manager:
-            self.process_manager.add_process(master.start)
-        else:
-            self.master_process = multiprocessing.Process(target=master.start)
-            self.master_process.start()
-
-        minion = salt.minion.Minion(self.minion_opts)
-        if self.process_manager:
-            self.process_manager.add_process(minion.tune_in)
+    def start_daemon(self, name, daemon_class, opts, method):
+        '''
+        Start a Salt daemon on its own process. ``daemon_class`` is the dotted path to the daemon class, which is
+        instantiated on the new process, and ``method`` the name of the method which runs the daemon.
+        '''
+        if self.parser.options.keep_daemons:
+            self.daemons_pids[name] = start_detached_salt_daemon(daemon_class, opts, method)
+        elif self.process_manager:
+            self.process_manager.add_process(run_salt_daemon, args=(daemon_class, opts, method))
         else:
-            self.minion_process = multiprocessing.Process(target=minion.tune_in)
-            self.minion_process.start()
+            process = multiprocessing.Process(target=run_salt_daemon, args=(daemon_class, opts, method))
+            process.start()
+            setattr(self, '{0}_process'.format(name), process)
 
-        sub_minion = salt.minion.Minion(self.sub_minion_opts)
-        if self.process_manager:
-            self.process_manager.add_process(sub_minion.tune_in)
-        else:
-            self.sub_minion_process = multiprocessing.Process(
-                target=sub_minion.tune_in
+    def listen_to_master_events(self):
+        '''
+        Subscribe to the master event bus. This needs to happen before the minions are started in order not to miss
+        their start events.
+        '''
+        # Late import
+        import salt.utils.event
+        try:
+            self.master_event = salt.utils.event.get_event(
+                'master',
+                sock_dir=self.master_opts['sock_dir'],
+                transport=self.master_opts['transport'],
+                opts=self.master_opts,
+                listen=True
             )
-            self.sub_minion_process.start()
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to listen to the master events: {0}'.format(exc))
+            self.master_event = None
 
-        smaster = salt.master.Master(self.syndic_master_opts)
-        if self.process_manager:
-            self.process_manager.add_process(smaster.start)
-        else:
-            self.smaster_process = multiprocessing.Process(target=smaster.start)
-            self.smaster_process.start()
+    def start_zeromq_daemons(self):
+        # The masters do not depend on each other, start them both at once
+        self.start_daemon('master', 'salt.master.Master', self.master_opts, 'start')
+        self.start_daemon('smaster', 'salt.master.Master', self.syndic_master_opts, 'start')
+
+        # Wait for the masters events publisher before subscribing to it
+        missing = wait_for_paths(
+            [os.path.join(self.master_opts['sock_dir'], 'master_event_pub.ipc'),
+             os.path.join(self.syndic_master_opts['sock_dir'], 'master_event_pub.ipc')],
+            self.MASTERS_START_TIMEOUT
+        )
+        if missing:
+            log.warning('The masters did not create {0} in time'.format(', '.join(missing)))
+        self.listen_to_master_events()
 
-        syndic = salt.minion.Syndic(self.syndic_opts)
-        if self.process_manager:
-            self.process_manager.add_process(syndic.tune_in)
-        else:
-            self.syndic_process = multiprocessing.Process(target=syndic.tune_in)
-            self.syndic_process.start()
+        # The minions, and the syndic, retry authenticating until their master accepts them
+        self.start_daemon('minion', 'salt.minion.Minion', self.minion_opts, 'tune_in')
+        self.start_daemon('sub_minion', 'salt.minion.Minion', self.sub_minion_opts, 'tune_in')
+        self.start_daemon('syndic', 'salt.minion.Syndic', self.syndic_opts, 'tune_in')
 
     def start_raet_daemons(self):
-        import salt.daemons.flo
-        master = salt.daemons.flo.IofloMaster(self.master_opts)
-        if self.process_manager:
-            self.process_manager.add_process(master.start)
-        else:
-            self.master_process = multiprocessing.Process(target=master.start)
-            self.master_process.start()
-
-        minion = salt.daemons.flo.IofloMinion(self.minion_opts)
-        if self.process_manager:
-            self.process_manager.add_process(minion.tune_in)
-        else:
-            self.minion_process = multiprocessing.Process(target=minion.tune_in)
-            self.minion_process.start()
-
-        sub_minion = salt.daemons.flo.IofloMinion(self.sub_minion_opts)
-        if self.process_manager:
-            self.process_manager.add_process(sub_minion.tune_in)
-        else:
-            self.sub_minion_process = multiprocessing.Process(
-                target=sub_minion.tune_in
-            )
-            self.sub_minion_process.start()
-        # Wait for the daemons to all spin up
-        time.sleep(5)
+        self.start_daemon('master', 'salt.daemons.flo.IofloMaster', self.master_opts, 'start')
+        self.listen_to_master_events()
+        self.start_daemon('minion', 'salt.daemons.flo.IofloMinion', self.minion_opts, 'tune_in')
+        self.start_daemon('sub_minion', 'salt.daemons.flo.IofloMinion', self.sub_minion_opts, 'tune_in')
+        # There's no need to wait for the daemons to spin up, setup_minions waits for the minions start events
 
         #smaster = salt.daemons.flo.IofloMaster(self.syndic_master_opts)
         #self.smaster_process = multiprocessing.Process(target=smaster.start)
@@ -2114,10 +3905,10 @@ class TestDaemon(object):
         This client is defined as a class attribute because its creation needs
         to be deferred to a latter stage. If created it on `__enter__` like it
         previously was, it would not receive the master events.
+
+        The client is shared with the tests, see :func:`get_local_client`.
         '''
-        # Late import
-        import salt.client
-        return salt.client.LocalClient(mopts=self.master_opts)
+        return get_local_client(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'master'))
 
     def __exit__(self, type, value, traceback):
         '''
@@ -2127,7 +3918,23 @@ class TestDaemon(object):
         import salt.master
 
         if self.start_daemons:
-            if self.process_manager:
+            daemons_processes = []
+            if self.parser.options.profile_tests is not None and not self.parser.options.keep_daemons:
+                # The daemons write their profiles, see --profile-tests, when they exit
+                daemons_processes = psutil.Process(os.getpid()).children(recursive=True)
+            close_local_clients()
+            if SALT_CLIENTS_STATS['created']:
+                self.parser.print_bulleted(
+                    'Salt clients: {created} created, {reused} reused, {reconnected} created again after the master '
+                    'restarted or the configuration changed'.format(**SALT_CLIENTS_STATS)
+                )
+            if getattr(self, 'master_event', None) is not None and hasattr(self.master_event, 'destroy'):
+                self.master_event.destroy()
+            if self.parser.options.keep_daemons:
+                self.parser.print_bulleted(
+                    'The Salt daemons were left running, pass \'--reuse-daemons\' to reuse them'
+                )
+            elif self.process_manager:
                 self.process_manager.kill_children()
             else:
                 salt.master.clean_proc(self.sub_minion_process, wait_for_kill=50)
@@ -2143,6 +3950,8 @@ class TestDaemon(object):
                     salt.master.clean_proc(self.smaster_process, wait_for_kill=50)
                     self.smaster_process.join()
 
+            psutil.wait_procs(daemons_processes, timeout=30)
+
         self._exit_mockbin()
         for func in self.parser.__test_daemon_exit__:
             func(self)
@@ -2155,14 +3964,9 @@ class TestDaemon(object):
 
     def setup_minions(self):
         # Wait for minions to connect back
-        wait_minion_connections = multiprocessing.Process(
-            target=self.wait_for_minion_connections,
-            args=(self.minion_targets, self.MINIONS_CONNECT_TIMEOUT)
-        )
-        wait_minion_connections.start()
-        wait_minion_connections.join()
-        wait_minion_connections.terminate()
-        if wait_minion_connections.exitcode > 0:
+        try:
+            self.wait_for_minion_connections(self.minion_targets, self.MINIONS_CONNECT_TIMEOUT)
+        except SystemExit:
             print(
                 '\n {RED_BOLD}*{ENDC} ERROR: Minions failed to connect'.format(
                 **self.colors
@@ -2170,23 +3974,8 @@ class TestDaemon(object):
             )
             return False
 
-        del wait_minion_connections
-
-        # Wait for minions to "sync_all"
-        for target in [self.sync_minion_modules,
-                       self.sync_minion_states]:
-            sync_minions = multiprocessing.Process(
-                target=target,
-                args=(self.minion_targets, self.MINIONS_SYNC_TIMEOUT)
-            )
-            sync_minions.start()
-            sync_minions.join()
-            if sync_minions.exitcode > 0:
-                return False
-            sync_minions.terminate()
-            del sync_minions
-
-        return True
+        # Sync the modules and the states at once
+        return self.sync_minions(self.minion_targets, ('modules', 'states'), self.MINIONS_SYNC_TIMEOUT)
 
     def post_setup_minions(self):
         '''
@@ -2215,59 +4004,157 @@ class TestDaemon(object):
         '''
         Clean out the tmp files
         '''
-        if self.parser.options.no_clean:
+        if self.parser.options.no_clean or self.parser.options.keep_daemons:
+            # The daemons left running still need their files
             return
-        if os.path.isdir(self.sub_minion_opts['root_dir']):
-            shutil.rmtree(self.sub_minion_opts['root_dir'])
-        if os.path.isdir(self.master_opts['root_dir']):
-            shutil.rmtree(self.master_opts['root_dir'])
-        if os.path.isdir(self.syndic_master_opts['root_dir']):
-            shutil.rmtree(self.syndic_master_opts['root_dir'])
-
-        for dirname in (RUNTIME_VARS.TMP,
-                        RUNTIME_VARS.TMP_BASEENV_STATE_TREE,
-                        RUNTIME_VARS.TMP_PRODENV_STATE_TREE,
-                        RUNTIME_VARS.TMP_SALT_INTEGRATION_FILES):
+        # The directories are moved out of the way at once and removed in the background. The state trees are
+        # under the integration files, which are synchronized again on the next execution.
+        for dirname in (self.sub_minion_opts['root_dir'],
+                        self.master_opts['root_dir'],
+                        self.syndic_master_opts['root_dir'],
+                        RUNTIME_VARS.TMP,
+                        RUNTIME_VARS.TMP_SOCK_DIR):
             if os.path.isdir(dirname):
-                shutil.rmtree(dirname)
+                # Keep the transplanted configuration and integration files for the next execution
+                discard_tree(dirname, (RUNTIME_VARS.TMP_CONF_DIR, RUNTIME_VARS.TMP_SALT_INTEGRATION_FILES))
+        remove_old_runs(self.parser.options.keep_old_runs)
+
+    def extension_modules_fingerprints(self):
+        '''
+        Return a dictionary mapping each kind of extension modules, ``modules``, ``states``, etc, to a fingerprint
+        of the files providing them
+        '''
+        paths = []
+        for source in set(self.parser.__extension_modules__):
+            if os.path.isdir(source):
+                paths.extend([(kind, os.path.join(source, kind)) for kind in os.listdir(source)])
+        for kind in SYNCABLE_MODULES_KINDS:
+            paths.append((kind, os.path.join(RUNTIME_VARS.TMP_BASEENV_STATE_TREE, '_{0}'.format(kind))))
+
+        fingerprints = {}
+        for kind, path in sorted(paths):
+            if kind not in SYNCABLE_MODULES_KINDS:
+                continue
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for fname in sorted(files):
+                    fpath = os.path.join(root, fname)
+                    fstat = os.stat(fpath)
+                    fingerprints.setdefault(kind, hashlib.sha1()).update(
+                        '{0}:{1}:{2}\n'.format(fpath, fstat.st_size, fstat.st_mtime).encode('utf-8')
+                    )
+        return dict([(kind, fingerprint.hexdigest()) for (kind, fingerprint) in fingerprints.items()])
+
+    def sync_changed_extension_modules(self):
+        '''
+        Only sync the kinds of extension modules which changed since the daemons were last synced
+        '''
+        previous = self.parser.__daemons_state__.data.get('extension_modules', {})
+        current = self.extension_modules_fingerprints()
+        changed = sorted([
+            kind for kind in set(previous).union(current) if previous.get(kind) != current.get(kind)
+        ])
+        if not changed:
+            self.parser.print_bulleted('No extension modules changed since the last sync')
+        elif self.sync_minions(self.minion_targets, changed, self.MINIONS_SYNC_TIMEOUT) is False:
+            # Try again on the next execution
+            return
+        self.parser.__daemons_state__.data['extension_modules'] = current
+
+    def __parse_master_event__(self, tag, data):
+        '''
+        Return a ``(kind, jid, minion_id)`` tuple out of a master event. ``kind`` is ``'start'`` for the minions start
+        events, ``'ret'`` for the jobs returns and ``None`` for any other event.
+        '''
+        parts = tag.split('/')
+        if tag == 'minion_start':
+            return 'start', None, data.get('id')
+        if len(parts) == 4 and parts[:2] == ['salt', 'minion'] and parts[3] == 'start':
+            return 'start', None, parts[2]
+        if len(parts) == 5 and parts[:2] == ['salt', 'job'] and parts[3] == 'ret':
+            return 'ret', parts[2], parts[4]
+        if tag.isdigit() and 'id' in data:
+            # Old style job return tags
+            return 'ret', tag, data['id']
+        return None, None, None
+
+    def __wait_for_condition__(self, expire, on_event, poll):
+        '''
+        Wait, at most until ``expire``, for a condition to be met. ``on_event`` is called with the tag and data of
+        each master event. ``poll`` checks the condition actively, it's called with an exponential backoff and it's
+        the only mechanism used when the master events are not available. Both return ``True`` once the condition
+        is met.
+        '''
+        use_events = getattr(self, 'master_event', None) is not None
+        # When listening to the events, polling is just a safety net
+        delay = use_events and 2.0 or 0.25
+        next_poll = time.time() + delay
+        while time.time() < expire:
+            if use_events:
+                event = self.master_event.get_event(wait=max(min(next_poll, expire) - time.time(), 0.05), full=True)
+                if event and on_event(event.get('tag', ''), event.get('data') or {}):
+                    return True
+            else:
+                time.sleep(max(min(next_poll, expire) - time.time(), 0))
+            if time.time() >= next_poll:
+                if poll():
+                    return True
+                delay = min(delay * 2, 5)
+                next_poll = time.time() + delay
+        return False
 
     def wait_for_jid(self, targets, jid, timeout=120):
-        time.sleep(1)  # Allow some time for minions to accept jobs
-        now = datetime.now()
-        expire = now + timedelta(seconds=timeout)
-        job_finished = False
-        while now <= expire:
-            running = self.__client_job_running(targets, jid)
+        start = time.time()
+        expire = start + timeout
+        pending = set(targets)
+        # Let's not have false positives, when polling, the job needs to be seen not running twice in a row
+        job_finished = [False]
+
+        def on_event(tag, data):
+            kind, event_jid, minion_id = self.__parse_master_event__(tag, data)
+            if kind == 'ret' and event_jid == str(jid):
+                pending.discard(minion_id)
+            return not pending
+
+        def poll():
+            running = self.__client_job_running(pending, jid)
             sys.stdout.write(
                 '\r{0}\r'.format(
                     ' ' * getattr(self.parser.options, 'output_columns', SCREEN_COLS)
                 )
             )
-            if not running and job_finished is False:
-                # Let's not have false positives and wait one more seconds
-                job_finished = True
-            elif not running and job_finished is True:
-                return True
-            elif running and job_finished is True:
-                job_finished = False
-
-            if job_finished is False:
-                sys.stdout.write(
-                    '   * {YELLOW}[Quit in {0}]{ENDC} Waiting for {1}'.format(
-                        '{0}'.format(expire - now).rsplit('.', 1)[0],
-                        ', '.join(running),
-                        **self.colors
-                    )
+            if not running:
+                if job_finished[0] is True:
+                    return True
+                job_finished[0] = True
+                return False
+            job_finished[0] = False
+            sys.stdout.write(
+                '   * {YELLOW}[Quit in {0}]{ENDC} Waiting for {1}'.format(
+                    '{0}'.format(timedelta(seconds=expire - time.time())).rsplit('.', 1)[0],
+                    ', '.join(running),
+                    **self.colors
                 )
-                sys.stdout.flush()
-            time.sleep(1)
-            now = datetime.now()
-        else:  # pylint: disable=W0120
+            )
+            sys.stdout.flush()
+            return False
+
+        if self.__wait_for_condition__(expire, on_event, poll):
             sys.stdout.write(
-                '\n {RED_BOLD}*{ENDC} ERROR: Failed to get information '
-                'back\n'.format(**self.colors)
+                '\r{0}\r'.format(
+                    ' ' * getattr(self.parser.options, 'output_columns', SCREEN_COLS)
+                )
             )
             sys.stdout.flush()
+            log.info('Waited {0:.2f} seconds for the job {1} to finish'.format(time.time() - start, jid))
+            return True
+
+        sys.stdout.write(
+            '\n {RED_BOLD}*{ENDC} ERROR: Failed to get information '
+            'back\n'.format(**self.colors)
+        )
+        sys.stdout.flush()
+        log.info('Waited {0:.2f} seconds for the job {1} to finish, giving up'.format(time.time() - start, jid))
         return False
 
     def __client_job_running(self, targets, jid):
@@ -2291,9 +4178,41 @@ class TestDaemon(object):
         )
         sys.stdout.flush()
         expected_connections = set(targets)
-        now = datetime.now()
-        expire = now + timedelta(seconds=timeout)
-        while now <= expire:
+        start = time.time()
+        expire = start + timeout
+
+        if getattr(self, 'master_event', None) is None:
+            self.listen_to_master_events()
+        # The minions already connected answer this ping, the others fire their start event once they connect
+        ping_jid = None
+        if self.master_event is not None:
+            try:
+                ping_jid = str(self.client.run_job(list(expected_connections), 'test.ping', expr_form='list')['jid'])
+            except Exception as exc:  # pylint: disable=broad-except
+                log.warning('Failed to publish the minions ping job: {0}'.format(exc))
+
+        def connected(target):
+            expected_connections.remove(target)
+            sys.stdout.write(
+                '\r{0}\r'.format(
+                    ' ' * getattr(self.parser.options, 'output_columns',
+                                  SCREEN_COLS)
+                )
+            )
+            sys.stdout.write(
+                '   {LIGHT_GREEN}*{ENDC} {0} connected after {1:.2f} secs.\n'.format(
+                    target, time.time() - start, **self.colors
+                )
+            )
+            sys.stdout.flush()
+
+        def on_event(tag, data):
+            kind, jid, minion_id = self.__parse_master_event__(tag, data)
+            if minion_id in expected_connections and (kind == 'start' or (kind == 'ret' and jid == ping_jid)):
+                connected(minion_id)
+            return not expected_connections
+
+        def poll():
             sys.stdout.write(
                 '\r{0}\r'.format(
                     ' ' * getattr(self.parser.options, 'output_columns', SCREEN_COLS)
@@ -2301,7 +4220,7 @@ class TestDaemon(object):
             )
             sys.stdout.write(
                 ' * {YELLOW}[Quit in {0}]{ENDC} Waiting for {1}'.format(
-                    '{0}'.format(expire - now).rsplit('.', 1)[0],
+                    '{0}'.format(timedelta(seconds=expire - time.time())).rsplit('.', 1)[0],
                     ', '.join(expected_connections),
                     **self.colors
                 )
@@ -2315,113 +4234,154 @@ class TestDaemon(object):
                 if target not in expected_connections:
                     # Someone(minion) else "listening"?
                     continue
-                expected_connections.remove(target)
-                sys.stdout.write(
-                    '\r{0}\r'.format(
-                        ' ' * getattr(self.parser.options, 'output_columns',
-                                      SCREEN_COLS)
-                    )
-                )
-                sys.stdout.write(
-                    '   {LIGHT_GREEN}*{ENDC} {0} connected.\n'.format(
-                        target, **self.colors
-                    )
-                )
-                sys.stdout.flush()
+                connected(target)
+            return not expected_connections
 
-            if not expected_connections:
-                return
+        if self.__wait_for_condition__(expire, on_event, poll):
+            log.info(
+                'Waited {0:.2f} seconds for the minions({1}) to connect'.format(
+                    time.time() - start, ', '.join(sorted(targets))
+                )
+            )
+            return
 
-            time.sleep(1)
-            now = datetime.now()
-        else:  # pylint: disable=W0120
-            print(
-                '\n {RED_BOLD}*{ENDC} WARNING: Minions failed to connect '
-                'back. Tests requiring them WILL fail'.format(**self.colors)
+        log.info(
+            'Waited {0:.2f} seconds for the minions({1}) to connect, giving up'.format(
+                time.time() - start, ', '.join(sorted(targets))
             )
-            try:
-                print_header(
-                    '=', sep='=', inline=True,
-                    width=getattr(self.parser.options, 'output_columns', SCREEN_COLS)
+        )
+        print(
+            '\n {RED_BOLD}*{ENDC} WARNING: Minions failed to connect '
+            'back. Tests requiring them WILL fail'.format(**self.colors)
+        )
+        try:
+            print_header(
+                '=', sep='=', inline=True,
+                width=getattr(self.parser.options, 'output_columns', SCREEN_COLS)
 
-                )
-            except TypeError:
-                print_header('=', sep='=', inline=True)
-            raise SystemExit()
+            )
+        except TypeError:
+            print_header('=', sep='=', inline=True)
+        raise SystemExit()
 
-    def sync_minion_modules_(self, modules_kind, targets, timeout=None):
+    def sync_minions(self, targets, kinds=('modules', 'states'), timeout=None):
+        '''
+        Sync the passed kinds of extension modules on the targeted minions. One ``saltutil.sync_<kind>`` job per kind
+        is published to all the minions at once, each kind is synced to its own extension modules directory. The
+        returns are collected from the master event bus, polling the job cache for the returns which were not seen,
+        and each kind is timed until its last return. Returns ``False`` if any of the syncs failed.
+        '''
         if not timeout:
             timeout = 120
-        # Let's sync all connected minions
         print(
-            ' {LIGHT_BLUE}*{ENDC} Syncing minion\'s {1} '
-            '(saltutil.sync_{1})'.format(
-                ', '.join(targets),
-                modules_kind,
+            ' {LIGHT_BLUE}*{ENDC} Syncing minion\'s {0} ({1})'.format(
+                ', '.join(kinds),
+                ', '.join(['saltutil.sync_{0}'.format(kind) for kind in kinds]),
                 **self.colors
             )
         )
-        syncing = set(targets)
-        jid_info = self.client.run_job(
-            list(targets), 'saltutil.sync_{0}'.format(modules_kind),
-            expr_form='list',
-            timeout=9999999999999999,
-        )
+        if getattr(self, 'master_event', None) is None:
+            self.listen_to_master_events()
+
+        client = self.client
+        start = time.time()
+        expire = start + timeout
+        jobs = {}
+        for modules_kind in kinds:
+            jid = client.run_job(
+                list(targets), 'saltutil.sync_{0}'.format(modules_kind),
+                expr_form='list',
+                timeout=9999999999999999,
+            )['jid']
+            jobs[str(jid)] = modules_kind
+        # The functions available on the minions are about to change
+        helpers.invalidate_salt_functions_index()
+        pending = dict([(jid, set(targets)) for jid in jobs])
+        timings = {}
+        synced = True
+
+        def handle_return(jid, minion_id, ret):
+            pending[jid].discard(minion_id)
+            if not pending[jid]:
+                timings[jobs[jid]] = time.time() - start
+            return self.__handle_sync_return__(minion_id, jobs[jid], ret)
+
+        while self.master_event is not None and any(pending.values()) and time.time() < expire:
+            event = self.master_event.get_event(wait=1, full=True)
+            if not event:
+                continue
+            data = event.get('data') or {}
+            kind, ret_jid, minion_id = self.__parse_master_event__(event.get('tag', ''), data)
+            if kind == 'ret' and ret_jid in pending and minion_id in pending[ret_jid]:
+                synced = handle_return(ret_jid, minion_id, data.get('return')) and synced
 
-        if self.wait_for_jid(targets, jid_info['jid'], timeout) is False:
-            print(
-                ' {RED_BOLD}*{ENDC} WARNING: Minions failed to sync {0}. '
-                'Tests requiring these {0} WILL fail'.format(
-                    modules_kind, **self.colors)
+        for jid, minions in sorted(pending.items()):
+            if not minions:
+                continue
+            log.info(
+                'The {0} sync returns of {1} were not seen on the event bus, polling them'.format(
+                    jobs[jid], ', '.join(sorted(minions))
+                )
+            )
+            if self.wait_for_jid(minions, jid, max(expire - time.time(), 1)) is False:
+                print(
+                    ' {RED_BOLD}*{ENDC} WARNING: Minions failed to sync {0}. '
+                    'Tests requiring these {0} WILL fail'.format(jobs[jid], **self.colors)
+                )
+                synced = False
+                continue
+            for minion_id, output in client.get_full_returns(jid, list(minions), 1).items():
+                synced = handle_return(jid, minion_id, output['ret']) and synced
+
+        for modules_kind in kinds:
+            if modules_kind in timings:
+                log.info('Synced the minions {0} in {1:.2f} seconds'.format(modules_kind, timings[modules_kind]))
+        self.parser.print_bulleted(
+            'Synced {0}'.format(
+                ', '.join([
+                    '{0} in {1:.2f} secs'.format(kind, timings[kind]) for kind in kinds if kind in timings
+                ]) or 'nothing'
             )
-            raise SystemExit()
+        )
+        return synced and not any(pending.values())
 
+    def __handle_sync_return__(self, minion_id, modules_kind, ret):
         # Late import
         import salt._compat
 
-        while syncing:
-            rdata = self.client.get_full_returns(jid_info['jid'], syncing, 1)
-            if rdata:
-                for name, output in rdata.iteritems():
-                    if not output['ret']:
-                        # Already synced!?
-                        syncing.remove(name)
-                        continue
+        if not ret:
+            # Already synced!?
+            return True
 
-                    if isinstance(output['ret'], salt._compat.string_types):
-                        # An errors has occurred
-                        print(
-                            ' {RED_BOLD}*{ENDC} {0} Failed so sync {2}: '
-                            '{1}'.format(
-                                name, output['ret'],
-                                modules_kind,
-                                **self.colors)
-                        )
-                        return False
-
-                    print(
-                        '   {LIGHT_GREEN}*{ENDC} Synced {0} {2}: '
-                        '{1}'.format(
-                            name,
-                            ', '.join(output['ret']),
-                            modules_kind, **self.colors
-                        )
-                    )
-                    # Synced!
-                    try:
-                        syncing.remove(name)
-                    except KeyError:
-                        print(
-                            ' {RED_BOLD}*{ENDC} {0} already synced??? '
-                            '{1}'.format(name, output, **self.colors)
-                        )
+        if isinstance(ret, salt._compat.string_types):
+            # An errors has occurred
+            print(
+                ' {RED_BOLD}*{ENDC} {0} Failed so sync {2}: '
+                '{1}'.format(
+                    minion_id, ret,
+                    modules_kind,
+                    **self.colors)
+            )
+            return False
+
+        print(
+            '   {LIGHT_GREEN}*{ENDC} Synced {0} {2}: '
+            '{1}'.format(
+                minion_id,
+                ', '.join(ret),
+                modules_kind, **self.colors
+            )
+        )
         return True
 
+    def sync_minion_modules_(self, modules_kind, targets, timeout=None):
+        return self.sync_minions(targets, (modules_kind,), timeout=timeout)
+
     def sync_minion_states(self, targets, timeout=None):
-        self.sync_minion_modules_('states', targets, timeout=timeout)
+        return self.sync_minion_modules_('states', targets, timeout=timeout)
 
     def sync_minion_modules(self, targets, timeout=None):
-        self.sync_minion_modules_('modules', targets, timeout=timeout)
+        return self.sync_minion_modules_('modules', targets, timeout=timeout)
 # <---- Salt Tests Daemons Context Manager ---------------------------------------------------------------------------
 
 
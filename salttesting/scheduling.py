@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+'''
+    :copyright: © 2014 by the SaltStack Team, see AUTHORS for more details.
+    :license: Apache 2.0, see LICENSE for more details.
+
+
+    salttesting.scheduling
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests execution history and scheduling helpers
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import json
+import zlib
+import logging
+import multiprocessing
+
+log = logging.getLogger(__name__)
+
+
+class JSONFileStore(object):
+    '''
+    Simple dictionary like store persisted as a JSON file
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'r') as rfh:
+                data = json.load(rfh)
+        except (IOError, OSError, ValueError) as exc:
+            log.warning('Failed to load {0}: {1}'.format(self.path, exc))
+            return
+        if isinstance(data, dict):
+            self.data = data
+
+    def save(self):
+        dirname = os.path.dirname(self.path)
+        # Write to a temporary file and then rename it so that concurrent runs never read a partially written file
+        tmp_path = '{0}.{1}'.format(self.path, os.getpid())
+        try:
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with open(tmp_path, 'w') as wfh:
+                json.dump(self.data, wfh, indent=1, sort_keys=True)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as exc:
+            log.warning('Failed to save {0}: {1}'.format(self.path, exc))
+
+
+class TestDurationsStore(JSONFileStore):
+    '''
+    Persistent store of the wall time, in seconds, each test took the last time it ran
+    '''
+
+    def get(self, test_id, default=None):
+        return self.data.get(test_id, default)
+
+    def update(self, durations):
+        '''
+        Record the durations of a test run. ``durations`` maps test ids to seconds.
+        '''
+        for test_id, duration in durations.items():
+            self.data[test_id] = round(duration, 4)
+
+    def estimate(self, test_ids):
+        '''
+        Return a dictionary with the estimated duration of each of the passed test ids. Tests without a recorded
+        duration are estimated with the median of the known durations.
+        '''
+        known = sorted([self.data[test_id] for test_id in test_ids if test_id in self.data])
+        default = known and known[len(known) // 2] or 0.0
+        return dict([(test_id, self.data.get(test_id, default)) for test_id in test_ids])
+
+
+class LastFailedStore(JSONFileStore):
+    '''
+    Persistent store of the tests which failed, or errored, the last time they ran
+    '''
+
+    @property
+    def failed(self):
+        return set(self.data.get('failed', []))
+
+    def update(self, ran, failed):
+        '''
+        Record the outcome of a test run. ``ran`` are the ids of the tests which ran and ``failed`` the ids of those
+        which failed or errored. The tests which did not run keep their previous status.
+        '''
+        self.data['failed'] = sorted((self.failed - set(ran)) | set(failed))
+
+
+class FailFastListener(object):
+    '''
+    Tests results listener, see :func:`salttesting.unit.add_result_listener`, which stops the tests run once
+    ``limit`` tests failed or errored. The count is shared with the processes forked after the listener is created,
+    the parallel tests workers for example.
+    '''
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._failures = multiprocessing.Value('i', 0)
+
+    @property
+    def failures(self):
+        return self._failures.value
+
+    def reached(self):
+        return self._failures.value >= self.limit
+
+    def startTest(self, result, test):
+        # Too late to stop the run, the test is already running
+        pass
+
+    def stopTest(self, result, test, outcome, message):
+        if outcome in ('failure', 'error'):
+            with self._failures.get_lock():
+                self._failures.value += 1
+        # Checked after every test, another worker might have reached the limit, so that the run stops before the
+        # next test starts
+        if self.reached():
+            result.stop()
+
+
+def sort_by_duration(items, durations, key=None):
+    '''
+    Sort ``items`` by their duration, longest first, falling back to the item id to get a stable order.
+
+    ``durations`` maps ids to seconds and ``key`` returns the id of an item, by default, its ``id()``.
+    '''
+    if key is None:
+        key = lambda item: item.id()  # pylint: disable=unnecessary-lambda
+    return sorted(items, key=lambda item: (-durations.get(key(item), 0.0), key(item)))
+
+
+def stable_hash(value):
+    '''
+    Return a hash of ``value`` which, unlike ``hash()``, is the same across processes, interpreters and machines
+    '''
+    if not isinstance(value, bytes):
+        value = value.encode('utf-8')
+    return zlib.crc32(value) & 0xffffffff
+
+
+def shard_name(shard_index, shard_count):
+    '''
+    Return the name used to tell the reports of each shard apart
+    '''
+    return 'shard-{0}-of-{1}'.format(shard_index, shard_count)
+
+
+def split_in_shards(test_ids, shard_count, durations=None):
+    '''
+    Split ``test_ids`` in ``shard_count`` balanced shards.
+
+    Tests with a recorded duration are assigned, longest first, to the shard with the smallest total duration. The
+    remaining tests are assigned by a stable hash of their id. The result only depends on the passed ids and
+    durations, so every node needs to pass the same durations, or none, to compute the same shards.
+    '''
+    if durations is None:
+        durations = {}
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    test_ids = sorted(set(test_ids))
+    timed = [test_id for test_id in test_ids if durations.get(test_id) is not None]
+    for test_id in sort_by_duration(timed, durations, key=lambda test_id: test_id):
+        shard_index = loads.index(min(loads))
+        shards[shard_index].append(test_id)
+        loads[shard_index] += durations[test_id]
+    for test_id in test_ids:
+        if durations.get(test_id) is None:
+            shards[stable_hash(test_id) % shard_count].append(test_id)
+    return [sorted(shard) for shard in shards]
+
+
+def select_shard(test_ids, shard_index, shard_count, durations=None):
+    '''
+    Return the set of test ids, out of ``test_ids``, which belong to the shard ``shard_index``
+    '''
+    return set(split_in_shards(test_ids, shard_count, durations)[shard_index])
+
+
+def flatten_testsuite(suite):
+    '''
+    Yield each of the test cases found in ``suite``, recursing into the nested suites
+    '''
+    if hasattr(suite, '_tests'):
+        for child in suite._tests:  # pylint: disable=protected-access
+            for test in flatten_testsuite(child):
+                yield test
+    else:
+        yield suite
@@ -24,17 +24,8 @@
 from __future__ import absolute_import
 import sys
 import copy
+import time
 import logging
-try:
-    import psutil
-    HAS_PSUTIL = True
-except ImportError:
-    HAS_PSUTIL = False
-
-# Set SHOW_PROC to True to show
-# process details when running in verbose mode
-# i.e. [CPU:15.1%|MEM:48.3%|Z:0]
-SHOW_PROC = False
 
 # support python < 2.7 via unittest2
 if sys.version_info < (2, 7):
@@ -120,25 +111,6 @@ class TestCase(_TestCase):
 #                    'on tearDown() to {0}\n'.format(cls._cwd))
 #            cls._chdir_counter += 1
 
-    def shortDescription(self):
-        desc = _TestCase.shortDescription(self)
-        if HAS_PSUTIL and SHOW_PROC:
-            proc_info = ''
-            found_zombies = 0
-            try:
-                for proc in psutil.process_iter():
-                    if proc.status == psutil.STATUS_ZOMBIE:
-                        found_zombies += 1
-                proc_info = '[CPU:{0}%|MEM:{1}%|Z:{2}] {short_desc}'.format(psutil.cpu_percent(),
-                                                                            psutil.virtual_memory().percent,
-                                                                            found_zombies,
-                                                                            short_desc=desc if desc else '')
-            except Exception:
-                pass
-            return proc_info
-        else:
-            return _TestCase.shortDescription(self)
-
     #def runTest(self):
     #    pass
 
@@ -209,21 +181,104 @@ class TestCase(_TestCase):
         return _TestCase.failIfAlmostEqual(self, *args, **kwargs)
 
 
+# Objects notified by the test results of each test start and stop, see
+# add_result_listener()
+RESULT_LISTENERS = []
+
+# The test results attributes where each of the tests outcomes are stored
+_OUTCOMES_ATTRIBUTES = (
+    ('failure', 'failures'),
+    ('error', 'errors'),
+    ('skipped', 'skipped'),
+    ('expected-failure', 'expectedFailures'),
+    ('unexpected-success', 'unexpectedSuccesses')
+)
+
+
+def add_result_listener(listener):
+    '''
+    Register a tests results listener. Listeners implement
+    ``startTest(result, test)`` and ``stopTest(result, test, outcome, message)``
+    where ``outcome`` is one of ``passed``, ``failure``, ``error``,
+    ``skipped``, ``expected-failure`` or ``unexpected-success`` and
+    ``message`` is the formatted traceback or the skip reason.
+    '''
+    if listener not in RESULT_LISTENERS:
+        RESULT_LISTENERS.append(listener)
+
+
+def remove_result_listener(listener):
+    if listener in RESULT_LISTENERS:
+        RESULT_LISTENERS.remove(listener)
+
+
+def _notify_listeners(method, *args):
+    for listener in RESULT_LISTENERS:
+        try:
+            getattr(listener, method)(*args)
+        except Exception:  # pylint: disable=broad-except
+            logging.getLogger(__name__).exception(
+                'The tests results listener {0!r} failed'.format(listener)
+            )
+
+
+def track_test_start(result, test):
+    '''
+    Record the start of a test. Called by the test results ``startTest``.
+    '''
+    result._test_start_times[test.id()] = (
+        time.time(),
+        dict([(outcome, len(getattr(result, attr, ())))
+              for (outcome, attr) in _OUTCOMES_ATTRIBUTES])
+    )
+    _notify_listeners('startTest', result, test)
+
+
+def track_test_stop(result, test):
+    '''
+    Record how long a test took to run and its outcome. Called by the test
+    results ``stopTest``.
+    '''
+    started = result._test_start_times.pop(test.id(), None)
+    if started is None:
+        return
+    start_time, counts = started
+    result.test_durations[test.id()] = time.time() - start_time
+    outcome, message = 'passed', None
+    for name, attr in _OUTCOMES_ATTRIBUTES:
+        entries = getattr(result, attr, ())
+        if len(entries) > counts[name]:
+            outcome = name
+            if isinstance(entries[-1], tuple):
+                message = entries[-1][1]
+            break
+    _notify_listeners('stopTest', result, test, outcome, message)
+
+
 class TextTestResult(_TextTestResult):
     '''
-    Custom TestResult class whith logs the start and the end of a test
+    Custom TestResult class whith logs the start and the end of a test and
+    records how long each test took to run
     '''
 
+    def __init__(self, *args, **kwargs):
+        super(TextTestResult, self).__init__(*args, **kwargs)
+        # Wall time, in seconds, of each test, keyed by the test id
+        self.test_durations = {}
+        self._test_start_times = {}
+
     def startTest(self, test):
         logging.getLogger(__name__).debug(
             '>>>>> START >>>>> {0}'.format(test.id())
         )
+        track_test_start(self, test)
         return super(TextTestResult, self).startTest(test)
 
     def stopTest(self, test):
         logging.getLogger(__name__).debug(
             '<<<<< END <<<<<<< {0}'.format(test.id())
         )
+        track_test_stop(self, test)
         return super(TextTestResult, self).stopTest(test)
 
 
@@ -16,6 +16,9 @@ from __future__ import absolute_import
 import sys
 import logging
 
+# Import Salt Testing libs
+from salttesting.unit import track_test_start, track_test_stop
+
 # Import 3rd-party libs
 import six
 from six import StringIO
@@ -51,10 +54,18 @@ try:
                 return getattr(self.delegate, attr)
 
     class _XMLTestResult(xmlrunner.result._XMLTestResult):
+        def __init__(self, *args, **kwargs):
+            # xmlrunner classes are NOT new-style classes
+            xmlrunner.result._XMLTestResult.__init__(self, *args, **kwargs)
+            # Wall time, in seconds, of each test, keyed by the test id
+            self.test_durations = {}
+            self._test_start_times = {}
+
         def startTest(self, test):
             logging.getLogger(__name__).debug(
                 '>>>>> START >>>>> {0}'.format(test.id())
             )
+            track_test_start(self, test)
             # xmlrunner classes are NOT new-style classes
             xmlrunner.result._XMLTestResult.startTest(self, test)
             if self.buffer:
@@ -69,6 +80,7 @@ try:
             logging.getLogger(__name__).debug(
                 '<<<<< END <<<<<<< {0}'.format(test.id())
             )
+            track_test_stop(self, test)
             # xmlrunner classes are NOT new-style classes
             return xmlrunner.result._XMLTestResult.stopTest(self, test)
 